@@ -0,0 +1,7 @@
+from .rate_limit import RateLimitMiddleware, create_backend as create_rate_limit_backend
+from .concurrency import AdaptiveConcurrencyLimiter, ConcurrencyLimitMiddleware
+from .metrics import PrometheusMiddleware, metrics_response, register_stats
+from .sql_profiler import SQLProfilerMiddleware
+from .compression import CompressionMiddleware
+from .response_cache import ResponseCache, ResponseCacheMiddleware
+from .view_counter import ViewCounter, ViewCounterMiddleware
@@ -0,0 +1,184 @@
+import gzip
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript")
+
+
+def supported_encodings() -> tuple:
+    # In order of preference, Brotli only when the package is installed
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    :param accept_encoding: Accept-Encoding request header
+    :return: Preferred supported encoding, or None for identity
+
+    Picks the encoding with the highest q-value, Brotli winning ties.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith(
+        ("+json", "+xml", "/xml")
+    )
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5):
+    """
+    :param body: Bytes to compress
+    :param encoding: "gzip" or "br"
+    :param gzip_level: gzip compression level, 1 to 9
+    :param brotli_quality: Brotli quality, 0 to 11
+    :return: Compressed bytes
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with Brotli or gzip depending on Accept-Encoding.
+
+    Responses below `minimum_size`, of binary content types, or already
+    encoded (such as precompressed cache entries) are sent unchanged.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+    ):
+        """
+        :param app: ASGI application
+        :param minimum_size: Smallest body in bytes worth compressing
+        :param gzip_level: gzip compression level, 1 to 9
+        :param brotli_quality: Brotli quality, 0 to 11, 4 to 6 suit dynamic content
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        responder = CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    """
+    Holds back the response start until the first body chunk shows whether
+    the response is worth compressing
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start_message: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message: Message):
+        if self.passthrough:
+            return await self.downstream(message)
+
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if "content-encoding" in headers or not is_compressible(
+                headers.get("content-type", "")
+            ):
+                self.passthrough = True
+                return await self.downstream(message)
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            return await self.downstream(message)
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not more_body:
+                # The whole body in one message, the common case
+                if len(body) < self.middleware.minimum_size:
+                    await self.downstream(self.start_message)
+                    return await self.downstream(message)
+                body = compress(
+                    body,
+                    self.encoding,
+                    self.middleware.gzip_level,
+                    self.middleware.brotli_quality,
+                )
+                headers["Content-Encoding"] = self.encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                await self.downstream(self.start_message)
+                return await self.downstream(
+                    {"type": "http.response.body", "body": body}
+                )
+
+            # Streaming response, compress chunk by chunk
+            if self.encoding == "br":
+                self.compressor = brotli.Compressor(
+                    quality=self.middleware.brotli_quality
+                )
+            else:
+                self.compressor = zlib.compressobj(
+                    self.middleware.gzip_level, zlib.DEFLATED, 31
+                )
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self.downstream(self.start_message)
+
+        if self.encoding == "br":
+            chunk = self.compressor.process(body)
+            if not more_body:
+                chunk += self.compressor.finish()
+        else:
+            chunk = self.compressor.compress(body)
+            if not more_body:
+                chunk += self.compressor.flush()
+        await self.downstream(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
@@ -0,0 +1,199 @@
+import math
+import re
+import time
+from typing import Iterable, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def compile_routes(routes: Iterable[str]):
+    """
+    :param routes: Routes such as "GET /blogs/posts/{slug}"
+    :return: Set of static (method, path) pairs and list of (method, regex) pairs
+
+    Compiles route templates for fast matching against request paths.
+    """
+    static, dynamic = set(), []
+    for route in routes:
+        method, _, path = route.partition(" ")
+        if "{" not in path:
+            static.add((method.upper(), path))
+            continue
+        parts = re.split(r"\{[^}]+\}", path)
+        pattern = "[^/]+".join(re.escape(part) for part in parts)
+        dynamic.append((method.upper(), re.compile(f"^{pattern}$")))
+    return static, dynamic
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency limit that follows the latency gradient of completed requests.
+
+    The limit grows while recent latency stays close to the long term
+    baseline and shrinks as soon as requests start queueing (latency rises)
+    or failing, so a slow database sheds load instead of piling it up.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 4,
+        max_limit: int = 200,
+        expensive_share: float = 0.75,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        backoff: float = 0.9,
+        baseline_window: float = 300.0,
+    ):
+        """
+        :param initial_limit: Concurrency limit before any latency is observed
+        :param min_limit: Lowest allowed limit
+        :param max_limit: Highest allowed limit
+        :param expensive_share: Share of the limit expensive routes may use
+        :param tolerance: Latency increase over the baseline treated as normal
+        :param smoothing: Weight of each new limit estimate
+        :param backoff: Multiplicative decrease applied on server errors
+        :param baseline_window: Seconds a latency baseline is remembered for
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.expensive_share = expensive_share
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.baseline_window = baseline_window
+
+        self.in_flight = 0
+        self.short_rtt: Optional[float] = None
+        self.baseline_rtt: Optional[float] = None
+        self._window_start = time.monotonic()
+        self._window_min = self._previous_min = math.inf
+        self.completed = 0
+        self.failed = 0
+        self.shed = {"expensive": 0, "cheap": 0}
+
+    def try_acquire(self, expensive: bool) -> bool:
+        """
+        :param expensive: Whether the request is for an expensive route
+        :return: True when the request may proceed
+
+        Reserves a slot for a request.
+        """
+        limit = self.limit * self.expensive_share if expensive else self.limit
+        if self.in_flight >= limit:
+            self.shed["expensive" if expensive else "cheap"] += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float, failed: bool = False):
+        """
+        :param latency: Request latency in seconds
+        :param failed: Whether the request failed with a server error
+
+        Frees a slot and updates the limit from the observed latency.
+        """
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        self.completed += 1
+        if failed:
+            self.failed += 1
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            return
+
+        if self.short_rtt is None:
+            self.short_rtt = latency
+        self.short_rtt += (latency - self.short_rtt) * 0.1
+
+        # The baseline is the lowest smoothed latency of the last two windows,
+        # so a sustained slowdown only becomes the new normal after a while
+        now = time.monotonic()
+        if now - self._window_start > self.baseline_window:
+            self._previous_min, self._window_min = self._window_min, math.inf
+            self._window_start = now
+        self._window_min = min(self._window_min, self.short_rtt)
+        self.baseline_rtt = min(self._window_min, self._previous_min)
+
+        gradient = max(
+            0.5, min(1.0, self.tolerance * self.baseline_rtt / self.short_rtt)
+        )
+        if gradient == 1.0 and in_flight < self.limit / 2:
+            # Not enough traffic to tell whether a higher limit is safe
+            return
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        new_limit = self.limit * (1 - self.smoothing) + new_limit * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, new_limit))
+
+    def stats(self) -> dict:
+        """
+        :return: Current limiter state
+        """
+        return {
+            "limit": round(self.limit, 2),
+            "expensive_limit": round(self.limit * self.expensive_share, 2),
+            "in_flight": self.in_flight,
+            "short_rtt_ms": round((self.short_rtt or 0) * 1000, 3),
+            "baseline_rtt_ms": round((self.baseline_rtt or 0) * 1000, 3),
+            "completed": self.completed,
+            "failed": self.failed,
+            "shed": dict(self.shed),
+        }
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Rejects requests with a 503 once the adaptive concurrency limit is reached,
+    shedding expensive routes first
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: AdaptiveConcurrencyLimiter,
+        expensive_routes: Iterable[str] = (),
+    ):
+        """
+        :param app: ASGI application
+        :param limiter: Shared limiter instance
+        :param expensive_routes: Routes such as "GET /blogs/posts/{slug}" to shed first
+        """
+        self.app = app
+        self.limiter = limiter
+        self.static_routes, self.dynamic_routes = compile_routes(expensive_routes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if not self.limiter.try_acquire(self.is_expensive(scope)):
+            response = JSONResponse(
+                {"detail": "Server is overloaded, try again later"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            return await response(scope, receive, send)
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.limiter.release(time.perf_counter() - start, status_code >= 500)
+
+    def is_expensive(self, scope: Scope) -> bool:
+        method, path = scope["method"], scope["path"]
+        if (method, path) in self.static_routes:
+            return True
+        for route_method, pattern in self.dynamic_routes:
+            if route_method == method and pattern.match(path):
+                return True
+        return False
@@ -0,0 +1,157 @@
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from starlette.responses import Response
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route",
+    ["route", "method", "status"],
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Response body size by route",
+    ["route", "method", "status"],
+    buckets=(128, 512, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being served",
+    multiprocess_mode="livesum",
+)
+
+
+class StatsCollector:
+    """
+    Exposes the dict returned by a subsystem's stats function as gauges
+    """
+
+    def __init__(self, prefix: str, documentation: str, stats: Callable[[], dict]):
+        """
+        :param prefix: Metric name prefix such as "db_pool"
+        :param documentation: Help text shared by the gauges
+        :param stats: Function returning a dict of numbers or dicts of numbers
+        """
+        self.prefix = prefix
+        self.documentation = documentation
+        self.stats = stats
+
+    def collect(self):
+        for key, value in self.stats().items():
+            name = f"{self.prefix}_{key}"
+            if isinstance(value, dict):
+                family = GaugeMetricFamily(name, self.documentation, labels=["kind"])
+                for kind, amount in value.items():
+                    family.add_metric([kind], amount)
+                yield family
+            elif isinstance(value, (int, float)):
+                yield GaugeMetricFamily(name, self.documentation, value=value)
+
+
+stats_collectors: List[StatsCollector] = []
+
+
+def register_stats(prefix: str, documentation: str, stats: Callable[[], dict]):
+    """
+    :param prefix: Metric name prefix such as "db_pool"
+    :param documentation: Help text shared by the gauges
+    :param stats: Function returning a dict of numbers or dicts of numbers
+
+    Registers a subsystem's stats function to be collected on every scrape.
+    """
+    collector = StatsCollector(prefix, documentation, stats)
+    stats_collectors.append(collector)
+    REGISTRY.register(collector)
+
+
+def metrics_response() -> Response:
+    """
+    :return: Response with all metrics in the Prometheus text format
+
+    Under serve.py with several workers, PROMETHEUS_MULTIPROC_DIR is set and
+    the request metrics are aggregated over every worker. Subsystem stats are
+    those of the worker answering the scrape.
+    """
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in stats_collectors:
+            registry.register(collector)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+class PrometheusMiddleware:
+    """
+    Records latency, response size and in-flight requests per route id
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.route_ids: Dict[Callable, str] = {}
+        self.children: Dict[Tuple[str, str, int], tuple] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+        size = 0
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            latency, size_histogram = self.get_children(scope, status_code)
+            latency.observe(time.perf_counter() - start)
+            size_histogram.observe(size)
+
+    def get_children(self, scope: Scope, status_code: int) -> tuple:
+        # The router stores the matched endpoint in the shared scope
+        route = self.get_route_id(scope.get("endpoint"), scope)
+        key = (route, scope["method"], status_code)
+        children = self.children.get(key)
+        if children is None:
+            labels = (route, scope["method"], str(status_code))
+            children = (
+                REQUEST_LATENCY.labels(*labels),
+                RESPONSE_SIZE.labels(*labels),
+            )
+            self.children[key] = children
+        return children
+
+    def get_route_id(self, endpoint, scope: Scope) -> str:
+        if endpoint is None:
+            return "unmatched"
+        route_id = self.route_ids.get(endpoint)
+        if route_id is None:
+            route: BaseRoute
+            for route in scope["app"].routes:
+                if hasattr(route, "endpoint"):
+                    route_id = getattr(route, "unique_id", None) or route.name
+                    self.route_ids[route.endpoint] = route_id
+            route_id = self.route_ids.get(endpoint, "unmatched")
+        return route_id
@@ -0,0 +1,257 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / refill_rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / refill_rate * 1000))
+return tostring(retry_after)
+"""
+
+
+def parse_rate(rate: str) -> Tuple[float, float]:
+    """
+    :param rate: Rate such as "5/minute"
+    :return: Bucket capacity and refill rate in tokens per second
+
+    Parses a rate limit string.
+    """
+    amount, _, period = rate.partition("/")
+    if period not in PERIODS or not amount.isdigit() or int(amount) < 1:
+        raise ValueError(f"Invalid rate limit: {rate!r}")
+    capacity = float(amount)
+    return capacity, capacity / PERIODS[period]
+
+
+def take_token(
+    bucket: Optional[Tuple[float, float]],
+    capacity: float,
+    refill_rate: float,
+    now: float,
+) -> Tuple[Tuple[float, float], float]:
+    """
+    :param bucket: Stored (tokens, timestamp) pair or None for a new bucket
+    :param capacity: Maximum number of tokens in the bucket
+    :param refill_rate: Tokens added per second
+    :param now: Current time in seconds
+    :return: New bucket state and seconds to wait (0 when allowed)
+
+    Takes one token from a bucket.
+    """
+    if bucket is None:
+        tokens = capacity
+    else:
+        tokens = min(capacity, bucket[0] + max(0.0, now - bucket[1]) * refill_rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0.0
+    return (tokens, now), (1 - tokens) / refill_rate
+
+
+class MemoryBackend:
+    """
+    Token buckets kept in process memory, for single node deployments
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        """
+        :param max_keys: Maximum number of buckets kept, least recently used
+            first out once exceeded
+        """
+        self.max_keys = max_keys
+        # Key to bucket state and the time it will have refilled completely,
+        # least recently used first
+        self._buckets: "OrderedDict[str, Tuple[Tuple[float, float], float]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    async def acquire(self, key: str, capacity: float, refill_rate: float) -> float:
+        """
+        :param key: Bucket key
+        :param capacity: Maximum number of tokens in the bucket
+        :param refill_rate: Tokens added per second
+        :return: Seconds to wait before retrying, 0 when the request is allowed
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._buckets.pop(key, None)
+            bucket, retry_after = take_token(
+                entry[0] if entry else None, capacity, refill_rate, now
+            )
+            self._buckets[key] = (bucket, now + (capacity - bucket[0]) / refill_rate)
+            if len(self._buckets) > self.max_keys:
+                self._evict(now)
+        return retry_after
+
+    def _evict(self, now: float):
+        # A bucket that has refilled completely is the same as no bucket, each
+        # is dropped by its own deadline so a fast route can't reset a slow one
+        for key in [
+            key for key, (_, full_at) in self._buckets.items() if full_at <= now
+        ]:
+            del self._buckets[key]
+        # Still full of active buckets, the least recently used go, leaving
+        # room so the sweep above doesn't run on every request
+        while len(self._buckets) > self.max_keys * 0.9:
+            self._buckets.popitem(last=False)
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the subset of the redis client used by RedisBackend
+    """
+
+    def __init__(self):
+        self._hashes: Dict[str, Tuple[Tuple[float, float], float]] = {}
+        self._lock = threading.Lock()
+
+    async def script_load(self, script: str) -> str:
+        return "token-bucket"
+
+    async def evalsha(self, sha: str, numkeys: int, key: str, capacity, refill_rate):
+        now = time.time()
+        capacity, refill_rate = float(capacity), float(refill_rate)
+        with self._lock:
+            bucket, expires_at = self._hashes.get(key, (None, now))
+            if expires_at < now:
+                bucket = None
+            bucket, retry_after = take_token(bucket, capacity, refill_rate, now)
+            self._hashes[key] = (bucket, now + capacity / refill_rate)
+        return str(retry_after)
+
+
+class RedisBackend:
+    """
+    Token buckets shared between nodes through redis
+    """
+
+    def __init__(self, client, prefix: str = "rate-limit"):
+        self.client = client
+        self.prefix = prefix
+        self._sha: Optional[str] = None
+
+    async def acquire(self, key: str, capacity: float, refill_rate: float) -> float:
+        """
+        :param key: Bucket key
+        :param capacity: Maximum number of tokens in the bucket
+        :param refill_rate: Tokens added per second
+        :return: Seconds to wait before retrying, 0 when the request is allowed
+        """
+        if self._sha is None:
+            self._sha = await self.client.script_load(TOKEN_BUCKET_SCRIPT)
+        retry_after = await self.client.evalsha(
+            self._sha, 1, f"{self.prefix}:{key}", capacity, refill_rate
+        )
+        return float(retry_after)
+
+
+def create_backend(name: str, redis_url: Optional[str] = None):
+    """
+    :param name: Backend name, "memory" or "redis"
+    :param redis_url: URL of the shared redis server
+    :return: Rate limit backend
+
+    Creates the rate limit backend. The redis backend falls back to an
+    in-process stand-in when no URL is configured.
+    """
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        if not redis_url:
+            return RedisBackend(LocalRedis())
+        try:
+            from redis import asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("The redis rate limit backend requires `redis>=4.2`")
+        return RedisBackend(aioredis.from_url(redis_url))
+    raise ValueError(f"Unknown rate limit backend: {name!r}")
+
+
+class RateLimitMiddleware:
+    """
+    Per client token bucket rate limiting for the routes in `limits`
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limits: Dict[str, str],
+        backend=None,
+        trust_forwarded: bool = False,
+        forwarded_hops: int = 1,
+    ):
+        """
+        :param app: ASGI application
+        :param limits: Mapping of "METHOD /path" to a rate such as "5/minute"
+        :param backend: Rate limit backend, defaults to MemoryBackend
+        :param trust_forwarded: Identify clients by the X-Forwarded-For header,
+            only safe behind proxies that append to it
+        :param forwarded_hops: Number of trusted proxies appending to
+            X-Forwarded-For, the client is the address the outermost appended
+        """
+        self.app = app
+        self.backend = backend or MemoryBackend()
+        self.trust_forwarded = trust_forwarded
+        self.forwarded_hops = max(1, forwarded_hops)
+        self.limits = {}
+        for route, rate in limits.items():
+            method, _, path = route.partition(" ")
+            self.limits[(method.upper(), path)] = (route,) + parse_rate(rate)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        limit = self.limits.get((scope["method"], scope["path"]))
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        route, capacity, refill_rate = limit
+        retry_after = await self.backend.acquire(
+            f"{route}:{self.get_client(scope)}", capacity, refill_rate
+        )
+        if retry_after:
+            response = JSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+            return await response(scope, receive, send)
+
+        await self.app(scope, receive, send)
+
+    def get_client(self, scope: Scope) -> str:
+        if self.trust_forwarded:
+            # Entries left of those the trusted proxies appended are whatever
+            # the client sent
+            addresses = [
+                address.strip()
+                for name, value in scope["headers"]
+                if name == b"x-forwarded-for"
+                for address in value.decode("latin-1").split(",")
+            ]
+            if len(addresses) >= self.forwarded_hops:
+                return addresses[-self.forwarded_hops]
+        client = scope.get("client")
+        return client[0] if client else "anonymous"
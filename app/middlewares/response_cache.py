@@ -0,0 +1,243 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.middlewares.compression import compress, negotiate_encoding
+from app.middlewares.concurrency import compile_routes
+
+# Not stored, they describe the request that produced the entry
+SKIPPED_HEADERS = {"content-length", "server-timing"}
+
+
+class CacheEntry:
+    __slots__ = ("status", "headers", "body", "variants", "expires")
+
+    def __init__(
+        self,
+        status: int,
+        headers: List[Tuple[bytes, bytes]],
+        body: bytes,
+        expires: float,
+    ):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.variants: Dict[str, bytes] = {}
+        self.expires = expires
+
+
+class ResponseCache:
+    """
+    LRU cache of response bodies with their compressed variants.
+
+    Each variant is compressed on first request for that encoding and kept
+    until the entry expires or is invalidated, so a response is compressed
+    once per content version rather than once per request.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 10.0,
+        max_entries: int = 1000,
+        minimum_size: int = 500,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+    ):
+        """
+        :param ttl: Seconds an entry is served for
+        :param max_entries: Entries kept before the least recently used is evicted
+        :param minimum_size: Smallest body in bytes worth compressing
+        :param gzip_level: gzip compression level, 1 to 9
+        :param brotli_quality: Brotli quality, 0 to 11
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.entries: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.compressions = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires < time.monotonic():
+            del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: tuple, status: int, headers: list, body: bytes) -> CacheEntry:
+        entry = CacheEntry(status, headers, body, time.monotonic() + self.ttl)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def invalidate(self):
+        self.entries.clear()
+        self.invalidations += 1
+
+    def body_for(
+        self, entry: CacheEntry, encoding: Optional[str]
+    ) -> Tuple[bytes, Optional[str]]:
+        """
+        :param entry: Cache entry
+        :param encoding: Negotiated encoding, or None for identity
+        :return: Body to send and its content encoding
+        """
+        if encoding is None or len(entry.body) < self.minimum_size:
+            return entry.body, None
+        body = entry.variants.get(encoding)
+        if body is None:
+            body = compress(entry.body, encoding, self.gzip_level, self.brotli_quality)
+            entry.variants[encoding] = body
+            self.compressions += 1
+        return body, encoding
+
+    def stats(self) -> dict:
+        """
+        :return: Size and effectiveness of the cache
+        """
+        # Copied first, the event loop changes them while this runs in the
+        # threadpool
+        entries = list(self.entries.values())
+        raw = sum(len(entry.body) for entry in entries)
+        compressed = sum(
+            len(body) for entry in entries for body in list(entry.variants.values())
+        )
+        return {
+            "entries": len(entries),
+            "bytes": {"raw": raw, "compressed": compressed},
+            "requests": {"hit": self.hits, "miss": self.misses},
+            "compressions": self.compressions,
+            "invalidations": self.invalidations,
+        }
+
+
+class ResponseCacheMiddleware:
+    """
+    Serves anonymous GET requests to the given routes from a ResponseCache and
+    empties it after any successful write under `invalidate_prefix`
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache: ResponseCache,
+        routes: Iterable[str] = (),
+        invalidate_prefix: str = "/blogs",
+    ):
+        """
+        :param app: ASGI application
+        :param cache: Shared cache instance
+        :param routes: Routes such as "GET /blogs/posts/{slug}" to cache
+        :param invalidate_prefix: Path prefix of writes that change cached content
+        """
+        self.app = app
+        self.cache = cache
+        self.static_routes, self.dynamic_routes = compile_routes(routes)
+        self.invalidate_prefix = invalidate_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        if method in ("GET", "HEAD", "OPTIONS"):
+            headers = Headers(scope=scope)
+            if (
+                method == "GET"
+                and "authorization" not in headers
+                and self.is_cached(scope)
+            ):
+                return await self.serve(scope, receive, send, headers)
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if status_code < 400 and scope["path"].startswith(self.invalidate_prefix):
+                self.cache.invalidate()
+
+    def is_cached(self, scope: Scope) -> bool:
+        path = scope["path"]
+        if ("GET", path) in self.static_routes:
+            return True
+        for _, pattern in self.dynamic_routes:
+            if pattern.match(path):
+                return True
+        return False
+
+    async def serve(self, scope: Scope, receive: Receive, send: Send, headers: Headers):
+        key = (scope["path"], scope["query_string"])
+        entry = self.cache.get(key)
+        hit = entry is not None
+        # Headers that describe this request only, such as Server-Timing
+        extra_headers = []
+        if not hit:
+            start: Optional[Message] = None
+            chunks = []
+
+            async def capture(message: Message):
+                nonlocal start
+                if message["type"] == "http.response.start":
+                    start = message
+                elif message["type"] == "http.response.body":
+                    chunks.append(message.get("body", b""))
+
+            await self.app(scope, receive, capture)
+            response_headers = Headers(raw=start["headers"])
+            body = b"".join(chunks)
+            if (
+                start["status"] != 200
+                or "set-cookie" in response_headers
+                or "content-encoding" in response_headers
+                or "no-store" in response_headers.get("cache-control", "")
+            ):
+                await send(start)
+                return await send({"type": "http.response.body", "body": body})
+
+            stored = []
+            for name, value in start["headers"]:
+                if name.decode("latin-1").lower() not in SKIPPED_HEADERS:
+                    stored.append((name, value))
+                elif name.lower() != b"content-length":
+                    extra_headers.append((name, value))
+            entry = self.cache.put(key, start["status"], stored, body)
+
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+        body, encoding = self.cache.body_for(entry, encoding)
+        response_headers = MutableHeaders(raw=entry.headers + extra_headers)
+        response_headers["Content-Length"] = str(len(body))
+        response_headers["X-Cache"] = "HIT" if hit else "MISS"
+        response_headers.add_vary_header("Accept-Encoding")
+        if encoding is not None:
+            response_headers["Content-Encoding"] = encoding
+        await send(
+            {
+                "type": "http.response.start",
+                "status": entry.status,
+                "headers": response_headers.raw,
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
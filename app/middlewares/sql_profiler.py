@@ -0,0 +1,69 @@
+import logging
+import random
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from database.profiler import current_profile, start_profile
+
+logger = logging.getLogger(__name__)
+
+
+class SQLProfilerMiddleware:
+    """
+    Counts and times the SQL statements of a sample of requests, reports them
+    in a Server-Timing header and logs likely N+1 query patterns
+    """
+
+    def __init__(
+        self, app: ASGIApp, sample_rate: float = 1.0, n_plus_one_threshold: int = 5
+    ):
+        """
+        :param app: ASGI application
+        :param sample_rate: Share of requests to profile, between 0 and 1
+        :param n_plus_one_threshold: Executions of one statement shape per request
+            above which an N+1 warning is logged
+        """
+        self.app = app
+        self.sample_rate = sample_rate
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            return await self.app(scope, receive, send)
+
+        profile = start_profile()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={profile.duration * 1000:.2f};desc="{profile.count} queries"',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.set(None)
+            self.report(scope, profile)
+
+    def report(self, scope: Scope, profile):
+        method, path = scope["method"], scope["path"]
+        logger.info(
+            "%s %s: %d queries in %.2fms",
+            method,
+            path,
+            profile.count,
+            profile.duration * 1000,
+        )
+        for shape, count, duration in profile.repeated(self.n_plus_one_threshold):
+            logger.warning(
+                "Possible N+1 on %s %s: %d executions (%.2fms) of %s",
+                method,
+                path,
+                count,
+                duration * 1000,
+                shape,
+            )
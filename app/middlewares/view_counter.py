@@ -0,0 +1,230 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from database.models import Post, PostStats, PostViewsHourly
+
+logger = logging.getLogger(__name__)
+
+# Set by handlers on responses that count as a view of the post
+VIEW_HEADER = "X-View-Post-Id"
+# Rows per statement, three parameters each at most
+UPSERT_BATCH = 5000
+
+INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def upsert_views(
+    connection: Connection, views: Dict[int, int], hour: Optional[datetime] = None
+):
+    """
+    :param connection: Connection in a transaction
+    :param views: Views to add by post ID
+    :param hour: Hour the views are counted in, the current one by default
+
+    Adds the views to post_stats and to the post's bucket for the hour in
+    post_views_hourly, with multi-row INSERT ... ON CONFLICT DO UPDATE
+    statements. Rows are written in post ID order so concurrent flushes from
+    several workers lock them in the same order.
+    """
+    if hour is None:
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    insert = INSERTS[connection.dialect.name]
+    rows = [
+        {"post_id": post_id, "views": count} for post_id, count in sorted(views.items())
+    ]
+    for start in range(0, len(rows), UPSERT_BATCH):
+        batch = rows[start : start + UPSERT_BATCH]
+        statement = insert(PostStats.__table__).values(batch)
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=[PostStats.post_id],
+                set_={
+                    "views": PostStats.views + statement.excluded.views,
+                    "updated_at": func.now(),
+                },
+            )
+        )
+        statement = insert(PostViewsHourly.__table__).values(
+            [dict(row, hour=hour) for row in batch]
+        )
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=[PostViewsHourly.post_id, PostViewsHourly.hour],
+                set_={"views": PostViewsHourly.views + statement.excluded.views},
+            )
+        )
+
+
+class ViewCounter:
+    """
+    Aggregates post views in memory and adds them to post_stats in batches
+    from a background thread, so reading a post never writes to it.
+
+    A failed flush keeps its views for the next one and stop() flushes what
+    is left, only a killed process loses the views of its last interval.
+    """
+
+    def __init__(
+        self, engine: Engine, flush_interval: float = 5.0, max_pending: int = 10000
+    ):
+        """
+        :param engine: Engine to write to
+        :param flush_interval: Seconds between flushes
+        :param max_pending: Number of posts with pending views that triggers an
+            early flush
+        """
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending: Dict[int, int] = {}
+        self.views = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self.last_flush_ms = 0.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def increment(self, post_id: int, amount: int = 1):
+        with self._lock:
+            self.pending[post_id] = self.pending.get(post_id, 0) + amount
+            self.views += amount
+            full = len(self.pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """
+        :return: Number of views written
+
+        Writes the pending views, putting them back if the write fails.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self.pending = self.pending, {}
+            if not pending:
+                return 0
+            start = time.perf_counter()
+            try:
+                try:
+                    with self.engine.begin() as connection:
+                        upsert_views(connection, pending)
+                except IntegrityError:
+                    # Posts deleted since they were viewed
+                    with self.engine.begin() as connection:
+                        existing = set(
+                            connection.execute(
+                                select(Post.id).where(Post.id.in_(list(pending)))
+                            ).scalars()
+                        )
+                        pending = {
+                            post_id: count
+                            for post_id, count in pending.items()
+                            if post_id in existing
+                        }
+                        if pending:
+                            upsert_views(connection, pending)
+            except Exception:
+                self.failures += 1
+                with self._lock:
+                    for post_id, count in pending.items():
+                        self.pending[post_id] = self.pending.get(post_id, 0) + count
+                raise
+            self.flushes += 1
+            self.flushed += sum(pending.values())
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+            return sum(pending.values())
+
+    def start(self):
+        """
+        Starts the flushing thread, call it in each worker process
+        """
+        if self._worker is None:
+            self._stop.clear()
+            self._worker = threading.Thread(
+                target=self._run, name="view-counter", daemon=True
+            )
+            self._worker.start()
+
+    def stop(self):
+        """
+        Stops the flushing thread and writes the remaining views, logging a
+        failure so the rest of the shutdown still runs
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not flush post views")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not flush post views")
+
+    def stats(self) -> dict:
+        """
+        :return: Views counted, pending and written, and flush outcomes
+        """
+        with self._lock:
+            pending_posts = len(self.pending)
+            pending_views = sum(self.pending.values())
+        return {
+            "views": {
+                "counted": self.views,
+                "pending": pending_views,
+                "flushed": self.flushed,
+            },
+            "pending_posts": pending_posts,
+            "flushes": {"ok": self.flushes, "failed": self.failures},
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+class ViewCounterMiddleware:
+    """
+    Counts a view for each successful GET response carrying VIEW_HEADER and
+    removes the header. Added outside the response cache, whose entries keep
+    the header, so views served from the cache are counted too.
+    """
+
+    def __init__(self, app: ASGIApp, counter: ViewCounter):
+        self.app = app
+        self.counter = counter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                post_id = headers.get(VIEW_HEADER)
+                if post_id is not None:
+                    del headers[VIEW_HEADER]
+                    if message["status"] == 200:
+                        self.counter.increment(int(post_id))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,3 +1,9 @@
 from .user_repository import UserRepository
 from .auth_repository import AuthRepository
 from .blog_repository import TagRepository, PostRepository, CommentRepository
+from .feed_repository import FeedRepository
+from .trending_repository import TrendingRepository
+from .related_repository import RelatedRepository
+from .timeline_repository import TimelineRepository
+from .notification_repository import NotificationRepository
+from .image_repository import ImageRepository, UploadRepository
@@ -1,12 +1,63 @@
 from datetime import datetime
 from typing import List, Optional, Union
 from fastapi import Depends, HTTPException, status
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, undefer
+from sqlalchemy.orm.attributes import set_committed_value
 from app.schemas.blog_schemas import CommentCreate
 
 from database.models import Tag, Post, Comment
 from database.session import Session, get_db
-from app.schemas import TagCreate, TagUpdate, PostCreate, PostUpdate
+from app.repositories.feed_repository import FeedRepository
+from app.repositories.notification_repository import NotificationRepository
+from app.repositories.related_repository import RelatedRepository
+from app.repositories.rows import POST_COLUMNS, TAG_COLUMNS, PostRow, load_post_rows
+from app.repositories.timeline_repository import TimelineRepository
+from app.schemas import (
+    NotificationKind,
+    TagCreate,
+    TagUpdate,
+    PostCreate,
+    PostUpdate,
+    PostStatus,
+)
+from app.utils.feeds import feed_store
+from app.utils.profiles import profile_cache
+from app.utils.timelines import timeline_fanout
+from app.utils.trending import trending_store
+from config.settings import settings
+
+
+def post_relations() -> tuple:
+    """
+    :return: Loader options for the author and comments of posts
+
+    A function because `Post.comments` is a backref that only exists once the
+    mappers are configured.
+    """
+    return (
+        selectinload(Post.author),
+        selectinload(Post.comments).selectinload(Comment.author),
+    )
+
+
+def attach_comment_children(posts: List[Post]) -> List[Post]:
+    """
+    :param posts: Posts with their comments loaded
+    :return: The same posts
+
+    Fills the children of every comment from its post's loaded comments, so
+    serializing comment trees doesn't lazy load one query per comment.
+    """
+    for post in posts:
+        children = {}
+        for comment in post.comments:
+            children.setdefault(comment.parent_id, []).append(comment)
+        for comment in post.comments:
+            set_committed_value(comment, "children", children.get(comment.id, []))
+    return posts
 
 
 class TagRepository:
@@ -18,20 +69,20 @@ class TagRepository:
         skip: Optional[int] = 0,
         limit: Optional[int] = 100,
         search: Optional[str] = None,
-    ) -> List[Tag]:
+    ) -> List[Row]:
         """
         :param skip: Number of items to skip
         :param limit: Max number of items to return
         :param search: Search term
-        :return: List of tags
+        :return: List of read-only tag rows
 
-        Returns all tags.
+        Returns all tags, selected with Core rather than loaded as ORM objects.
         """
-        query = self.db.query(Tag).order_by(desc(Tag.created_at))
+        query = select(*TAG_COLUMNS).order_by(desc(Tag.created_at))
         if search:
-            query = query.filter(Tag.title.like(f"%{search}%"))
+            query = query.where(Tag.title.like(f"%{search}%"))
         query = query.offset(skip).limit(limit)
-        return query.all()
+        return self.db.execute(query).all()
 
     def get(self, tag_id: int) -> Tag:
         """
@@ -62,13 +113,21 @@ class TagRepository:
         :param slug: Slug of tag to return
         :return: Tag object
 
-        Returns a tag by slug.
+        Returns a tag by slug with its published posts, their authors and
+        comments loaded.
         """
-        tag = self.db.query(Tag).filter(Tag.slug == slug).first()
+        posts = selectinload(Tag.posts.and_(Post.is_published == True))
+        tag = (
+            self.db.query(Tag)
+            .options(*(posts.options(option) for option in post_relations()))
+            .filter(Tag.slug == slug)
+            .first()
+        )
         if tag is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found"
             )
+        attach_comment_children(tag.posts)
         return tag
 
     def get_by_slug_or_none(self, slug: str) -> Union[Tag, None]:
@@ -108,6 +167,9 @@ class TagRepository:
         tag_in_db.updated_at = datetime.utcnow()
         self.db.commit()
         self.db.refresh(tag_in_db)
+        # Tag titles are part of every entry of the tag's posts
+        feed_store.clear()
+        profile_cache.clear()
         return tag_in_db
 
     def delete(self, tag_id: int):
@@ -119,6 +181,8 @@ class TagRepository:
         tag = self.get(tag_id)
         self.db.delete(tag)
         self.db.commit()
+        feed_store.clear()
+        profile_cache.clear()
         return {"message": "Tag deleted"}
 
 
@@ -136,20 +200,55 @@ class PostRepository:
         skip: Optional[int] = 0,
         limit: Optional[int] = 100,
         search: Optional[str] = None,
-    ) -> List[Post]:
+    ) -> List[PostRow]:
         """
         :param skip: Number of items to skip
         :param limit: Max number of items to return
         :param search: Search term
-        :return: List of posts
+        :return: List of read-only posts
 
-        Returns all posts.
+        Returns published posts with their authors and comments, selected
+        with Core rather than loaded as ORM objects. The order matches the
+        partial index of published posts.
         """
-        query = self.db.query(Post).order_by(desc(Post.updated_at))
+        query = (
+            select(*POST_COLUMNS)
+            .where(Post.is_published == True)
+            .order_by(desc(Post.updated_at), desc(Post.id))
+        )
         if search:
-            query = query.filter(Post.title.ilike(f"%{search}%"))
+            query = query.where(Post.title.ilike(f"%{search}%"))
         query = query.offset(skip).limit(limit)
-        return query.all()
+        return load_post_rows(self.db, self.db.execute(query).all())
+
+    def get_by_author(
+        self,
+        author_id: int,
+        status: PostStatus = PostStatus.all,
+        skip: Optional[int] = 0,
+        limit: Optional[int] = 100,
+    ) -> List[PostRow]:
+        """
+        :param author_id: ID of the author
+        :param status: Only drafts, only published posts, or all
+        :param skip: Number of items to skip
+        :param limit: Max number of items to return
+        :return: List of read-only posts
+
+        Returns an author's posts, drafts included, read through the
+        (author_id, updated_at) index.
+        """
+        query = (
+            select(*POST_COLUMNS)
+            .where(Post.author_id == author_id)
+            .order_by(desc(Post.updated_at), desc(Post.id))
+        )
+        if status == PostStatus.draft:
+            query = query.where(Post.is_published.isnot(True))
+        elif status == PostStatus.published:
+            query = query.where(Post.is_published == True)
+        query = query.offset(skip).limit(limit)
+        return load_post_rows(self.db, self.db.execute(query).all())
 
     def get(self, post_id: int) -> Post:
         """
@@ -180,13 +279,23 @@ class PostRepository:
         :param slug: Slug of post to return
         :return: Post object
 
-        Returns a post by slug.
+        Returns a post by slug with its author, tags, comments, views and
+        related posts loaded.
         """
-        post = self.db.query(Post).filter(Post.slug == slug).first()
+        post = (
+            self.db.query(Post)
+            .options(*post_relations(), selectinload(Post.tags), undefer(Post.views))
+            .filter(Post.slug == slug)
+            .first()
+        )
         if post is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
             )
+        attach_comment_children([post])
+        post.related = RelatedRepository(self.db).get_related(
+            post.id, settings.RELATED_SIZE
+        )
         return post
 
     def get_by_slug_or_none(self, slug: str) -> Union[Post, None]:
@@ -219,8 +328,15 @@ class PostRepository:
             post_in_db.tags.append(tag)
 
         self.db.add(post_in_db)
+        if post_in_db.is_published:
+            self.db.flush()
+            self.assign_position(post_in_db.id)
         self.db.commit()
         self.db.refresh(post_in_db)
+        self.refresh_feeds(post_in_db.id)
+        profile_cache.invalidate(author_id)
+        if post_in_db.is_published:
+            self.fan_out(post_in_db.id)
         return post_in_db
 
     def update(self, post: PostUpdate, post_id: int) -> Post:
@@ -231,6 +347,7 @@ class PostRepository:
         Updates a post.
         """
         post_in_db: Post = self.get(post_id)
+        was_published = post_in_db.is_published
         for key, value in post.dict(exclude_unset=True, exclude={"tags"}).items():
             setattr(post_in_db, key, value)
 
@@ -246,8 +363,19 @@ class PostRepository:
                 post_in_db.tags.append(tag)
 
         post_in_db.updated_at = datetime.utcnow()
+        if post_in_db.is_published and not was_published:
+            self.db.flush()
+            self.assign_position(post_id)
         self.db.commit()
         self.db.refresh(post_in_db)
+        self.refresh_feeds(post_id)
+        if not post_in_db.is_published:
+            trending_store.discard(post_id)
+        profile_cache.invalidate(post_in_db.author_id)
+        if post_in_db.is_published and not was_published:
+            self.fan_out(post_id)
+        elif was_published and not post_in_db.is_published:
+            TimelineRepository(self.db).remove_post(post_id)
         return post_in_db
 
     def delete(self, post_id: int):
@@ -257,10 +385,71 @@ class PostRepository:
         Deletes a post.
         """
         post = self.get(post_id)
+        author_id = post.author_id
         self.db.delete(post)
         self.db.commit()
+        self.refresh_feeds(post_id)
+        trending_store.discard(post_id)
+        profile_cache.invalidate(author_id)
         return {"message": "Post deleted"}
 
+    def assign_position(self, post_id: int, attempts: int = 5):
+        """
+        :param post_id: ID of the post being published
+        :param attempts: Tries before giving up on concurrent publications
+
+        Gives the post the next published_position, one above the highest, in
+        the transaction publishing it, so the posts published last come first
+        in timelines. Concurrent publications can read the same highest
+        position, the unique index rejects all but one and the others try
+        again in a savepoint.
+        """
+        latest = Post.__table__.alias()
+        for attempt in range(attempts):
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(
+                        update(Post)
+                        .where(Post.id == post_id)
+                        .values(
+                            published_position=select(
+                                func.coalesce(func.max(latest.c.published_position), 0)
+                                + 1
+                            ).scalar_subquery()
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                return
+            except IntegrityError:
+                if attempt == attempts - 1:
+                    raise
+
+    def refresh_feeds(self, post_id: int):
+        """
+        :param post_id: ID of the post created, updated or deleted
+
+        Updates the feeds held in memory with the post's current state.
+        """
+        feed_store.post_changed(
+            post_id, lambda: FeedRepository(self.db).get_posts(post_id=post_id)
+        )
+
+    def fan_out(self, post_id: int):
+        """
+        :param post_id: ID of the post published
+
+        Adds the post to its followers' timelines, in the background when the
+        fan-out thread is running.
+        """
+        timeline_fanout.submit(
+            lambda db: TimelineRepository(db).fan_out(
+                post_id,
+                settings.TIMELINE_FANOUT_BATCH_SIZE,
+                settings.TIMELINE_TAG_FANOUT_MAX_FOLLOWERS,
+            ),
+            self.db,
+        )
+
 
 class CommentRepository:
     def __init__(
@@ -340,8 +529,10 @@ class CommentRepository:
         :param author_id: ID of author to associate with comment
         :return: Comment object
 
-        Creates a new comment.
+        Creates a new comment, notifying the author of the comment replied to
+        and the author of the post in the same transaction.
         """
+        recipients = {}
         if comment.parent_id:
             parent = self.get_or_none(comment.parent_id)
             if parent is None:
@@ -349,12 +540,18 @@ class CommentRepository:
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Parent comment not found",
                 )
-        post = self.post_repository.get(comment.post_id)
+            recipients[parent.author_id] = NotificationKind.reply
+        post_author_id = self.post_repository.get(comment.post_id).author_id
+        recipients.setdefault(post_author_id, NotificationKind.comment)
+        recipients.pop(author_id, None)
         comment_in_db = Comment(**comment.dict())
         comment_in_db.author_id = author_id
         self.db.add(comment_in_db)
+        self.db.flush()
+        NotificationRepository(self.db).add(comment_in_db.id, recipients)
         self.db.commit()
         self.db.refresh(comment_in_db)
+        profile_cache.invalidate(post_author_id)
         return comment_in_db
 
     def delete(self, comment_id: int):
@@ -364,6 +561,8 @@ class CommentRepository:
         Deletes a comment.
         """
         comment = self.get(comment_id)
+        post_author_id = comment.post.author_id
         self.db.delete(comment)
         self.db.commit()
+        profile_cache.invalidate(post_author_id)
         return {"message": "Comment deleted"}
@@ -0,0 +1,110 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi import Depends
+from sqlalchemy import desc, func, select
+from sqlalchemy.engine import Row
+
+from database.models import Post, Tag, TagPost, User
+from database.session import Session, get_db
+
+FEED_COLUMNS = (
+    Post.id,
+    Post.title,
+    Post.slug,
+    Post.excerpt,
+    Post.content,
+    Post.created_at,
+    Post.updated_at,
+    User.username,
+)
+
+
+class FeedRepository:
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+
+    def get_posts(
+        self,
+        tag_id: Optional[int] = None,
+        post_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[Row, List[Row]]]:
+        """
+        :param tag_id: Only posts with this tag
+        :param post_id: Only this post
+        :param limit: Max number of posts to return
+        :return: Published posts, newest first, with their tags
+
+        Reads the columns feeds show with their author's username, and the
+        tags of all posts in a second query.
+        """
+        query = (
+            select(*FEED_COLUMNS)
+            .join(User, User.id == Post.author_id)
+            .where(Post.is_published == True)
+            .order_by(desc(Post.created_at), desc(Post.id))
+        )
+        if tag_id is not None:
+            query = query.join(TagPost, TagPost.c.post_id == Post.id).where(
+                TagPost.c.tag_id == tag_id
+            )
+        if post_id is not None:
+            query = query.where(Post.id == post_id)
+        if limit is not None:
+            query = query.limit(limit)
+        rows = self.db.execute(query).all()
+
+        tags: Dict[int, List[Row]] = {row.id: [] for row in rows}
+        if tags:
+            for tag in self.db.execute(
+                select(TagPost.c.post_id, Tag.id, Tag.title, Tag.slug)
+                .join(Tag, Tag.id == TagPost.c.tag_id)
+                .where(TagPost.c.post_id.in_(tags))
+                .order_by(Tag.title)
+            ):
+                tags[tag.post_id].append(tag)
+        return [(row, tags[row.id]) for row in rows]
+
+    def get_tag_by_slug(self, slug: str) -> Optional[Row]:
+        """
+        :param slug: Slug of tag to return
+        :return: Tag row with its ID, title and slug, or None
+        """
+        return self.db.execute(
+            select(Tag.id, Tag.title, Tag.slug).where(Tag.slug == slug)
+        ).first()
+
+    def get_max_post_id(self) -> int:
+        """
+        :return: Highest post ID, 0 without posts
+
+        Read from the primary key index, whatever the number of posts.
+        """
+        return self.db.execute(select(func.max(Post.id))).scalar() or 0
+
+    def iter_published_posts(self, first_id: int, last_id: int) -> Iterator[Row]:
+        """
+        :param first_id: Lowest post ID to include
+        :param last_id: Highest post ID to include
+        :return: Slug and update time of the published posts in the ID range
+
+        Rows are fetched in batches as the iterator is consumed.
+        """
+        query = (
+            select(Post.slug, Post.updated_at)
+            .where(Post.id.between(first_id, last_id), Post.is_published == True)
+            .order_by(Post.id)
+            .execution_options(yield_per=1000)
+        )
+        return iter(self.db.execute(query))
+
+    def iter_tags(self) -> Iterator[Row]:
+        """
+        :return: Slug and update time of every tag, fetched in batches
+        """
+        query = (
+            select(Tag.slug, Tag.updated_at)
+            .order_by(Tag.id)
+            .execution_options(yield_per=1000)
+        )
+        return iter(self.db.execute(query))
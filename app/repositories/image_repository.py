@@ -0,0 +1,86 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import Depends
+from sqlalchemy import delete, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.utils.images import ImageInfo
+from database.models import Image, Upload
+from database.session import get_db
+
+
+class ImageRepository:
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+
+    def get_by_hash_or_none(self, hash: str) -> Optional[Image]:
+        return self.db.query(Image).filter(Image.hash == hash).first()
+
+    def create(self, hash: str, info: ImageInfo, size: int, uploader_id: int) -> Image:
+        """
+        :param hash: SHA-256 of the original
+        :param info: Format and size of the original
+        :param size: Bytes of the original
+        :param uploader_id: ID of the user uploading it
+        :return: The image, or the one with the same hash uploaded
+            concurrently
+        """
+        db_image = Image(
+            hash=hash,
+            uploader_id=uploader_id,
+            format=info.format,
+            width=info.width,
+            height=info.height,
+            size=size,
+        )
+        self.db.add(db_image)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            return self.get_by_hash_or_none(hash)
+        self.db.refresh(db_image)
+        return db_image
+
+    def mark_processed(self, image_id: int):
+        self.db.execute(
+            update(Image)
+            .where(Image.id == image_id)
+            .values(processed_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+
+
+class UploadRepository:
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+
+    def create(self, upload_id: str, user_id: int, size: int) -> Upload:
+        db_upload = Upload(id=upload_id, user_id=user_id, size=size)
+        self.db.add(db_upload)
+        self.db.commit()
+        self.db.refresh(db_upload)
+        return db_upload
+
+    def get_or_none(self, upload_id: str) -> Optional[Row]:
+        row = self.db.execute(
+            select(Upload.id, Upload.user_id, Upload.size).where(Upload.id == upload_id)
+        ).first()
+        # Returns the connection to the pool, request bodies are streamed
+        # without holding one
+        self.db.rollback()
+        return row
+
+    def delete(self, upload_ids: List[str]):
+        if not upload_ids:
+            return
+        self.db.execute(
+            delete(Upload)
+            .where(Upload.id.in_(upload_ids))
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
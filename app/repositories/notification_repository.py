@@ -0,0 +1,182 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import Depends
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import aliased
+
+from app.schemas import NotificationKind
+from database.models import Comment, Notification, Post, User
+from database.session import Session, get_db
+
+# Characters of the comment shown in notifications and digests
+EXCERPT_LENGTH = 200
+
+Actor = aliased(User)
+NOTIFICATION_COLUMNS = (
+    Notification.id,
+    Notification.kind,
+    Notification.comment_id,
+    func.substr(Comment.content, 1, EXCERPT_LENGTH).label("comment_excerpt"),
+    Post.id.label("post_id"),
+    Post.title.label("post_title"),
+    Post.slug.label("post_slug"),
+    Actor.id.label("actor_id"),
+    Actor.username.label("actor_username"),
+    Notification.created_at,
+    Notification.read_at,
+)
+
+
+def notification_query(*columns):
+    # Notifications of comments whose post or author is gone aren't listed,
+    # nor counted
+    return (
+        select(*(columns or NOTIFICATION_COLUMNS))
+        .select_from(Notification)
+        .join(Comment, Comment.id == Notification.comment_id)
+        .join(Post, Post.id == Comment.post_id)
+        .join(Actor, Actor.id == Comment.author_id)
+    )
+
+
+class NotificationRepository:
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+
+    def add(self, comment_id: int, recipients: Dict[int, NotificationKind]):
+        """
+        :param comment_id: ID of the comment the users are notified of
+        :param recipients: Kind of notification by user ID
+
+        Adds the notifications to the session's transaction, committed with
+        the comment.
+        """
+        if recipients:
+            self.db.execute(
+                insert(Notification),
+                [
+                    {"user_id": user_id, "comment_id": comment_id, "kind": kind.value}
+                    for user_id, kind in recipients.items()
+                ],
+            )
+
+    def get_by_user(
+        self,
+        user_id: int,
+        before: Optional[int] = None,
+        limit: int = 20,
+        unread: bool = False,
+    ) -> List[Row]:
+        """
+        :param user_id: ID of the user notified
+        :param before: Only notifications with a lower ID, the first page if
+            None
+        :param limit: Max number of notifications to return
+        :param unread: Only unread notifications
+        :return: The user's notifications, newest first
+        """
+        query = (
+            notification_query()
+            .where(Notification.user_id == user_id)
+            .order_by(Notification.id.desc())
+            .limit(limit)
+        )
+        if before is not None:
+            query = query.where(Notification.id < before)
+        if unread:
+            query = query.where(Notification.read_at.is_(None))
+        return self.db.execute(query).all()
+
+    def count_unread(self, user_id: int) -> int:
+        query = notification_query(func.count()).where(
+            Notification.user_id == user_id, Notification.read_at.is_(None)
+        )
+        return self.db.execute(query).scalar()
+
+    def mark_read(self, user_id: int, until: Optional[int] = None) -> int:
+        """
+        :param user_id: ID of the user notified
+        :param until: Only notifications up to this ID, all of them if None
+        :return: Number of notifications marked as read
+        """
+        query = (
+            update(Notification)
+            .where(Notification.user_id == user_id, Notification.read_at.is_(None))
+            .values(read_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if until is not None:
+            query = query.where(Notification.id <= until)
+        result = self.db.execute(query)
+        self.db.commit()
+        return result.rowcount
+
+    def get_last_id(self) -> int:
+        return self.db.execute(select(func.max(Notification.id))).scalar() or 0
+
+    def get_digest_users(self, after: int, until: int, limit: int) -> List[Row]:
+        """
+        :param after: Only users with a higher ID
+        :param until: Only notifications up to this ID
+        :param limit: Max number of users to return
+        :return: Users with notifications not emailed yet, by ID
+        """
+        pending = (
+            select(Notification.user_id)
+            .where(
+                Notification.emailed_at.is_(None),
+                Notification.id <= until,
+                Notification.user_id > after,
+            )
+            .distinct()
+            .order_by(Notification.user_id)
+            .limit(limit)
+            .subquery()
+        )
+        query = (
+            select(User.id, User.username, User.email, User.is_active, User.is_verified)
+            .join(pending, pending.c.user_id == User.id)
+            .order_by(User.id)
+        )
+        return self.db.execute(query).all()
+
+    def get_digest_notifications(self, user_ids: List[int], until: int) -> List[Row]:
+        """
+        :param user_ids: IDs of the users notified
+        :param until: Only notifications up to this ID
+        :return: The users' unread notifications not emailed yet, by user and
+            newest first
+        """
+        query = (
+            notification_query()
+            .add_columns(Notification.user_id)
+            .where(
+                Notification.user_id.in_(user_ids),
+                Notification.emailed_at.is_(None),
+                Notification.read_at.is_(None),
+                Notification.id <= until,
+            )
+            .order_by(Notification.user_id, Notification.id.desc())
+        )
+        return self.db.execute(query).all()
+
+    def mark_emailed(self, user_ids: List[int], until: int):
+        """
+        :param user_ids: IDs of the users whose digest was sent or skipped
+        :param until: Only notifications up to this ID
+        """
+        if not user_ids:
+            return
+        self.db.execute(
+            update(Notification)
+            .where(
+                Notification.user_id.in_(user_ids),
+                Notification.emailed_at.is_(None),
+                Notification.id <= until,
+            )
+            .values(emailed_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
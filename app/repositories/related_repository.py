@@ -0,0 +1,127 @@
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List
+
+from fastapi import Depends
+from sqlalchemy import delete, desc, insert, select
+from sqlalchemy.engine import Row
+
+from database.models import Post, PostRelated, TagPost
+from database.session import Session, get_db
+
+RELATED_COLUMNS = (
+    Post.id,
+    Post.title,
+    Post.slug,
+    Post.excerpt,
+    Post.featured_image,
+    PostRelated.score,
+)
+
+
+class RelatedRepository:
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+
+    def get_related(self, post_id: int, limit: int) -> List[Row]:
+        """
+        :param post_id: ID of the post
+        :param limit: Max number of posts to return
+        :return: The published posts most similar to the post, best first
+        """
+        query = (
+            select(*RELATED_COLUMNS)
+            .join(Post, Post.id == PostRelated.related_post_id)
+            .where(PostRelated.post_id == post_id, Post.is_published == True)
+            .order_by(desc(PostRelated.score))
+            .limit(limit)
+        )
+        return self.db.execute(query).all()
+
+    def iter_posts(self, post_ids: Iterable[int] = None) -> Iterator[Row]:
+        """
+        :param post_ids: Only these posts, all of them by default
+        :return: ID, title, excerpt and content of published posts, streamed
+        """
+        query = select(Post.id, Post.title, Post.excerpt, Post.content).where(
+            Post.is_published == True
+        )
+        if post_ids is not None:
+            query = query.where(Post.id.in_(list(post_ids)))
+        return self.db.execute(query.execution_options(yield_per=1000))
+
+    def get_post_tags(self, post_ids: Iterable[int] = None) -> List[Row]:
+        """
+        :param post_ids: Only these posts, all of them by default
+        :return: Post and tag IDs of the tags of published posts
+        """
+        query = (
+            select(TagPost.c.post_id, TagPost.c.tag_id)
+            .join(Post, Post.id == TagPost.c.post_id)
+            .where(Post.is_published == True)
+        )
+        if post_ids is not None:
+            query = query.where(TagPost.c.post_id.in_(list(post_ids)))
+        return self.db.execute(query).all()
+
+    def get_published_ids(self) -> List[int]:
+        return (
+            self.db.execute(select(Post.id).where(Post.is_published == True))
+            .scalars()
+            .all()
+        )
+
+    def get_changed_ids(self, since: datetime) -> List[int]:
+        """
+        :param since: Oldest update time to read
+        :return: IDs of the published posts created or updated since then
+        """
+        query = select(Post.id).where(
+            Post.is_published == True, Post.updated_at >= since
+        )
+        return self.db.execute(query).scalars().all()
+
+    def replace(self, related: Dict[int, List[tuple]]):
+        """
+        :param related: Related post IDs and scores by post ID
+
+        Replaces the related posts of the posts in one transaction.
+        """
+        if not related:
+            return
+        computed_at = datetime.utcnow()
+        self.db.execute(
+            delete(PostRelated)
+            .where(PostRelated.post_id.in_(list(related)))
+            .execution_options(synchronize_session=False)
+        )
+        rows = [
+            {
+                "post_id": post_id,
+                "related_post_id": related_post_id,
+                "score": score,
+                "computed_at": computed_at,
+            }
+            for post_id, neighbours in related.items()
+            for related_post_id, score in neighbours
+        ]
+        if rows:
+            self.db.execute(insert(PostRelated), rows)
+        self.db.commit()
+
+    def delete_unpublished(self) -> int:
+        """
+        :return: Number of rows deleted
+
+        Deletes the related posts of posts that are no longer published.
+        """
+        result = self.db.execute(
+            delete(PostRelated)
+            .where(
+                PostRelated.post_id.notin_(
+                    select(Post.id).where(Post.is_published == True)
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return result.rowcount
@@ -0,0 +1,152 @@
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from database.models import Comment, Post, Tag, User
+
+# Only the columns the read schemas expose, users' password hashes are never
+# selected
+USER_COLUMNS = (
+    User.id,
+    User.username,
+    User.email,
+    User.is_active,
+    User.is_verified,
+    User.is_admin,
+    User.created_at,
+    User.updated_at,
+)
+TAG_COLUMNS = (
+    Tag.id,
+    Tag.title,
+    Tag.slug,
+    Tag.excerpt,
+    Tag.description,
+    Tag.cover_image,
+    Tag.created_at,
+    Tag.updated_at,
+)
+POST_COLUMNS = (
+    Post.id,
+    Post.title,
+    Post.slug,
+    Post.excerpt,
+    Post.content,
+    Post.featured_image,
+    Post.is_published,
+    Post.is_featured,
+    Post.published_position,
+    Post.author_id,
+    Post.created_at,
+    Post.updated_at,
+)
+COMMENT_COLUMNS = (
+    Comment.id,
+    Comment.post_id,
+    Comment.author_id,
+    Comment.parent_id,
+    Comment.content,
+    Comment.created_at,
+    Comment.updated_at,
+)
+
+
+class PostRow:
+    """
+    Read-only post with its author and comments, built from Core rows
+    """
+
+    __slots__ = tuple(column.key for column in POST_COLUMNS) + ("author", "comments")
+
+    def __init__(self, row: Row, author: Row, comments: List["CommentRow"]):
+        (
+            self.id,
+            self.title,
+            self.slug,
+            self.excerpt,
+            self.content,
+            self.featured_image,
+            self.is_published,
+            self.is_featured,
+            self.published_position,
+            self.author_id,
+            self.created_at,
+            self.updated_at,
+        ) = row
+        self.author = author
+        self.comments = comments
+
+
+class CommentRow:
+    """
+    Read-only comment with its author and replies, built from Core rows
+    """
+
+    __slots__ = tuple(column.key for column in COMMENT_COLUMNS) + (
+        "author",
+        "children",
+    )
+
+    def __init__(self, row: Row, author: Row):
+        (
+            self.id,
+            self.post_id,
+            self.author_id,
+            self.parent_id,
+            self.content,
+            self.created_at,
+            self.updated_at,
+        ) = row
+        self.author = author
+        self.children = []
+
+
+def load_users(db: Session, user_ids: Iterable[int]) -> Dict[int, Row]:
+    """
+    :param db: Session
+    :param user_ids: IDs of the users to load
+    :return: User rows by ID
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    rows = db.execute(select(*USER_COLUMNS).where(User.id.in_(user_ids)))
+    return {row.id: row for row in rows}
+
+
+def load_post_rows(db: Session, rows: List[Row]) -> List[PostRow]:
+    """
+    :param db: Session
+    :param rows: Rows of POST_COLUMNS
+    :return: Posts with their authors and comment trees
+
+    Loads every comment of the posts, then the authors of posts and comments,
+    in two queries whatever the number of posts.
+    """
+    post_ids = [row.id for row in rows]
+    comment_rows = []
+    if post_ids:
+        comment_rows = db.execute(
+            select(*COMMENT_COLUMNS)
+            .where(Comment.post_id.in_(post_ids))
+            .order_by(Comment.id)
+        ).all()
+    users = load_users(
+        db,
+        [row.author_id for row in rows] + [row.author_id for row in comment_rows],
+    )
+
+    comments: Dict[int, List[CommentRow]] = {post_id: [] for post_id in post_ids}
+    by_id: Dict[int, CommentRow] = {}
+    for row in comment_rows:
+        comment = CommentRow(row, users.get(row.author_id))
+        comments[comment.post_id].append(comment)
+        by_id[comment.id] = comment
+    for comment in by_id.values():
+        parent = by_id.get(comment.parent_id)
+        if parent is not None:
+            parent.children.append(comment)
+
+    return [PostRow(row, users.get(row.author_id), comments[row.id]) for row in rows]
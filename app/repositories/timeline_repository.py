@@ -0,0 +1,342 @@
+from typing import List, Optional
+
+from fastapi import Depends
+from sqlalchemy import delete, desc, exists, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql import Select
+
+from app.repositories.rows import POST_COLUMNS, PostRow, load_post_rows
+from database.models import AuthorFollow, Post, Tag, TagFollow, TagPost, TimelineEntry
+from database.session import Session, get_db
+
+INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class TimelineRepository:
+    """
+    Follows of authors and tags, and the timelines they fill. A timeline
+    holds the IDs of the posts of the followed authors and tags, written when
+    a post is published, and is read latest published first by the post's
+    published_position.
+    """
+
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+
+    def insert(self, table):
+        return INSERTS[self.db.get_bind().dialect.name](table)
+
+    def follow_author(self, follower_id: int, author_id: int, backfill: int) -> bool:
+        """
+        :param follower_id: ID of the user following
+        :param author_id: ID of the author to follow
+        :param backfill: Number of the author's latest posts to add to the
+            follower's timeline
+        :return: Whether the user wasn't following the author yet
+        """
+        result = self.db.execute(
+            self.insert(AuthorFollow)
+            .values(follower_id=follower_id, author_id=author_id)
+            .on_conflict_do_nothing()
+        )
+        if result.rowcount:
+            self.backfill(
+                follower_id,
+                select(literal(follower_id), Post.id, Post.published_position)
+                .where(
+                    Post.author_id == author_id,
+                    Post.is_published == True,
+                    Post.published_position.isnot(None),
+                )
+                .order_by(desc(Post.published_position))
+                .limit(backfill),
+            )
+        self.db.commit()
+        return bool(result.rowcount)
+
+    def unfollow_author(self, follower_id: int, author_id: int) -> bool:
+        """
+        :param follower_id: ID of the user following
+        :param author_id: ID of the author to unfollow
+        :return: Whether the user was following the author
+        """
+        result = self.db.execute(
+            delete(AuthorFollow).where(
+                AuthorFollow.follower_id == follower_id,
+                AuthorFollow.author_id == author_id,
+            )
+        )
+        if result.rowcount:
+            self.prune(follower_id, select(Post.id).where(Post.author_id == author_id))
+        self.db.commit()
+        return bool(result.rowcount)
+
+    def follow_tag(
+        self, follower_id: int, tag_id: int, backfill: int, max_followers: int
+    ) -> bool:
+        """
+        :param follower_id: ID of the user following
+        :param tag_id: ID of the tag to follow
+        :param backfill: Number of the tag's latest posts to add to the
+            follower's timeline
+        :param max_followers: Tags with more followers are pulled on reads and
+            not backfilled
+        :return: Whether the user wasn't following the tag yet
+        """
+        result = self.db.execute(
+            self.insert(TagFollow)
+            .values(follower_id=follower_id, tag_id=tag_id)
+            .on_conflict_do_nothing()
+        )
+        if result.rowcount:
+            self.db.execute(
+                update(Tag)
+                .where(Tag.id == tag_id)
+                .values(follower_count=Tag.follower_count + 1)
+            )
+            followers = self.db.execute(
+                select(Tag.follower_count).where(Tag.id == tag_id)
+            ).scalar()
+            if followers <= max_followers:
+                self.backfill(
+                    follower_id,
+                    select(literal(follower_id), Post.id, Post.published_position)
+                    .join(TagPost, TagPost.c.post_id == Post.id)
+                    .where(
+                        TagPost.c.tag_id == tag_id,
+                        Post.is_published == True,
+                        Post.published_position.isnot(None),
+                    )
+                    .order_by(desc(Post.published_position))
+                    .limit(backfill),
+                )
+        self.db.commit()
+        return bool(result.rowcount)
+
+    def unfollow_tag(self, follower_id: int, tag_id: int) -> bool:
+        """
+        :param follower_id: ID of the user following
+        :param tag_id: ID of the tag to unfollow
+        :return: Whether the user was following the tag
+        """
+        result = self.db.execute(
+            delete(TagFollow).where(
+                TagFollow.follower_id == follower_id, TagFollow.tag_id == tag_id
+            )
+        )
+        if result.rowcount:
+            self.db.execute(
+                update(Tag)
+                .where(Tag.id == tag_id)
+                .values(follower_count=Tag.follower_count - 1)
+            )
+            self.prune(
+                follower_id,
+                select(TagPost.c.post_id).where(TagPost.c.tag_id == tag_id),
+            )
+        self.db.commit()
+        return bool(result.rowcount)
+
+    def backfill(self, user_id: int, posts: Select):
+        """
+        :param user_id: ID of the timeline's user
+        :param posts: Select of the user ID, and the IDs and positions of the
+            posts to add
+        """
+        # The WHERE clause of `posts` keeps SQLite from reading ON CONFLICT as
+        # a join constraint
+        self.db.execute(
+            self.insert(TimelineEntry)
+            .from_select(["user_id", "post_id", "position"], posts)
+            .on_conflict_do_nothing()
+        )
+
+    def prune(self, user_id: int, post_ids: Select):
+        """
+        :param user_id: ID of the timeline's user
+        :param post_ids: Select of the IDs of the posts to remove
+
+        Removes the posts from the user's timeline, except those whose author
+        or one of whose tags the user still follows.
+        """
+        followed_author = exists().where(
+            Post.id == TimelineEntry.post_id,
+            AuthorFollow.follower_id == user_id,
+            AuthorFollow.author_id == Post.author_id,
+        )
+        followed_tag = exists().where(
+            TagPost.c.post_id == TimelineEntry.post_id,
+            TagFollow.follower_id == user_id,
+            TagFollow.tag_id == TagPost.c.tag_id,
+        )
+        self.db.execute(
+            delete(TimelineEntry)
+            .where(
+                TimelineEntry.user_id == user_id,
+                TimelineEntry.post_id.in_(post_ids),
+                ~followed_author,
+                ~followed_tag,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def get_timeline(
+        self,
+        user_id: int,
+        before: Optional[int],
+        limit: int,
+        max_tag_followers: int,
+    ) -> List[PostRow]:
+        """
+        :param user_id: ID of the timeline's user
+        :param before: Only posts with a lower published_position, the first
+            page if None
+        :param limit: Max number of posts to return
+        :param max_tag_followers: Posts of followed tags with more followers
+            aren't in timelines and are read from the tags
+        :return: Published posts of the user's timeline, latest published
+            first
+
+        Reads the timeline with a range scan of its (user_id, position)
+        index, merged with the latest posts of the followed tags that aren't
+        fanned out.
+        """
+        query = (
+            select(*POST_COLUMNS)
+            .select_from(TimelineEntry)
+            .join(Post, Post.id == TimelineEntry.post_id)
+            .where(TimelineEntry.user_id == user_id, Post.is_published == True)
+            .order_by(desc(TimelineEntry.position))
+            .limit(limit)
+        )
+        if before is not None:
+            query = query.where(TimelineEntry.position < before)
+        rows = self.db.execute(query).all()
+
+        pulled_tags = (
+            select(TagFollow.tag_id)
+            .join(Tag, Tag.id == TagFollow.tag_id)
+            .where(
+                TagFollow.follower_id == user_id,
+                Tag.follower_count > max_tag_followers,
+            )
+        )
+        tag_ids = self.db.execute(pulled_tags).scalars().all()
+        if tag_ids:
+            query = (
+                select(*POST_COLUMNS)
+                .where(
+                    Post.id.in_(
+                        select(TagPost.c.post_id).where(TagPost.c.tag_id.in_(tag_ids))
+                    ),
+                    Post.is_published == True,
+                    Post.published_position.isnot(None),
+                )
+                .order_by(desc(Post.published_position))
+                .limit(limit)
+            )
+            if before is not None:
+                query = query.where(Post.published_position < before)
+            merged = {row.id: row for row in rows}
+            merged.update((row.id, row) for row in self.db.execute(query))
+            rows = sorted(
+                merged.values(), key=lambda row: row.published_position, reverse=True
+            )
+            rows = rows[:limit]
+        return load_post_rows(self.db, rows)
+
+    def fan_out(self, post_id: int, batch_size: int, max_tag_followers: int) -> int:
+        """
+        :param post_id: ID of the post published
+        :param batch_size: Followers per statement and transaction
+        :param max_tag_followers: Followers of tags with more are skipped, see
+            get_timeline()
+        :return: Number of timeline entries written
+
+        Adds the post to the timelines of the followers of its author and of
+        its tags at its published_position, reading each source's followers in
+        follower ID order so every batch is an index range scan.
+        """
+        post = self.db.execute(
+            select(Post.author_id, Post.published_position).where(
+                Post.id == post_id, Post.is_published == True
+            )
+        ).first()
+        if post is None or post.published_position is None:
+            return 0
+        author_id, position = post
+        tag_ids = (
+            self.db.execute(
+                select(TagPost.c.tag_id)
+                .join(Tag, Tag.id == TagPost.c.tag_id)
+                .where(
+                    TagPost.c.post_id == post_id,
+                    Tag.follower_count > 0,
+                    Tag.follower_count <= max_tag_followers,
+                )
+            )
+            .scalars()
+            .all()
+        )
+        sources = [(AuthorFollow.follower_id, AuthorFollow.author_id == author_id)]
+        sources.extend(
+            (TagFollow.follower_id, TagFollow.tag_id == tag_id) for tag_id in tag_ids
+        )
+
+        written = 0
+        for follower_id, source in sources:
+            after = 0
+            while True:
+                user_ids = (
+                    self.db.execute(
+                        select(follower_id)
+                        .where(source, follower_id > after)
+                        .order_by(follower_id)
+                        .limit(batch_size)
+                    )
+                    .scalars()
+                    .all()
+                )
+                if user_ids:
+                    statement = self.insert(TimelineEntry).values(
+                        [
+                            {
+                                "user_id": user_id,
+                                "post_id": post_id,
+                                "position": position,
+                            }
+                            for user_id in user_ids
+                        ]
+                    )
+                    # Followers of both the author and a tag are skipped the
+                    # second time, entries backfilled before the position was
+                    # assigned are moved to it
+                    written += self.db.execute(
+                        statement.on_conflict_do_update(
+                            index_elements=[
+                                TimelineEntry.user_id,
+                                TimelineEntry.post_id,
+                            ],
+                            set_={"position": statement.excluded.position},
+                            where=TimelineEntry.position != statement.excluded.position,
+                        )
+                    ).rowcount
+                    self.db.commit()
+                if len(user_ids) < batch_size:
+                    break
+                after = user_ids[-1]
+        return written
+
+    def remove_post(self, post_id: int):
+        """
+        :param post_id: ID of the post unpublished
+
+        Removes the post from every timeline, deleted posts are removed by
+        the foreign key.
+        """
+        self.db.execute(
+            delete(TimelineEntry)
+            .where(TimelineEntry.post_id == post_id)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from fastapi import Depends
+from sqlalchemy import delete, desc, insert, select
+from sqlalchemy.engine import Row
+
+from database.models import Comment, Post, PostViewsHourly, TrendingPost
+from database.session import Session, get_db
+from app.repositories.rows import POST_COLUMNS, PostRow, load_post_rows
+
+
+class TrendingRepository:
+    def __init__(self, db: Session = Depends(get_db)):
+        self.db = db
+
+    def get_view_buckets(self, since: datetime) -> List[Tuple[int, datetime, int]]:
+        """
+        :param since: Start of the oldest hour to read
+        :return: Post ID, hour and views of the hourly view buckets
+
+        Only buckets of published posts are returned.
+        """
+        query = (
+            select(PostViewsHourly.post_id, PostViewsHourly.hour, PostViewsHourly.views)
+            .join(Post, Post.id == PostViewsHourly.post_id)
+            .where(PostViewsHourly.hour >= since, Post.is_published == True)
+        )
+        return self.db.execute(query).all()
+
+    def get_comment_times(self, since: datetime) -> List[Tuple[int, datetime]]:
+        """
+        :param since: Oldest creation time to read
+        :return: Post ID and creation time of the comments
+
+        Only comments on published posts are returned.
+        """
+        query = (
+            select(Comment.post_id, Comment.created_at)
+            .join(Post, Post.id == Comment.post_id)
+            .where(Comment.created_at >= since, Post.is_published == True)
+        )
+        return self.db.execute(query).all()
+
+    def get_posts(self, post_ids: List[int]) -> List[PostRow]:
+        """
+        :param post_ids: IDs of the posts to return
+        :return: List of read-only published posts, in the order of `post_ids`
+        """
+        rows = self.db.execute(
+            select(*POST_COLUMNS).where(
+                Post.id.in_(post_ids), Post.is_published == True
+            )
+        ).all()
+        order = {post_id: index for index, post_id in enumerate(post_ids)}
+        rows.sort(key=lambda row: order[row.id])
+        return load_post_rows(self.db, rows)
+
+    def get_trending(self) -> List[Row]:
+        """
+        :return: Post ID, score and computation time of the trending posts
+            still published, best first
+        """
+        query = (
+            select(TrendingPost.post_id, TrendingPost.score, TrendingPost.computed_at)
+            .join(Post, Post.id == TrendingPost.post_id)
+            .where(Post.is_published == True)
+            .order_by(desc(TrendingPost.score), desc(TrendingPost.post_id))
+        )
+        return self.db.execute(query).all()
+
+    def replace_trending(self, scores: Dict[int, float], computed_at: datetime):
+        """
+        :param scores: Scores of the trending posts by post ID
+        :param computed_at: Time the scores were computed for
+
+        Replaces the trending posts in one transaction, readers see the
+        previous ones until it commits.
+        """
+        self.db.execute(delete(TrendingPost))
+        if scores:
+            self.db.execute(
+                insert(TrendingPost),
+                [
+                    {"post_id": post_id, "score": score, "computed_at": computed_at}
+                    for post_id, score in scores.items()
+                ],
+            )
+        self.db.commit()
+
+    def prune_view_buckets(self, before: datetime) -> int:
+        """
+        :param before: Buckets of earlier hours are deleted
+        :return: Number of buckets deleted
+        """
+        result = self.db.execute(
+            delete(PostViewsHourly).where(PostViewsHourly.hour < before)
+        )
+        self.db.commit()
+        return result.rowcount
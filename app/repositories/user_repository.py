@@ -1,13 +1,27 @@
 from typing import List, Optional
 from fastapi import HTTPException, status, Depends
+from sqlalchemy import and_, desc, func, select, update
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
+from app.repositories.rows import USER_COLUMNS
 from app.schemas import UserCreate
 from app.schemas.user_schemas import UserUpdate
 from app.utils.database_utils import sanitize_sqlalchemy_or_pydantic
-from database.models import User
+from app.utils.profiles import profile_cache
+from database.models import Comment, Post, PostStats, Tag, TagFollow, TagPost, User
 from database.session import get_db
 
+PROFILE_POST_COLUMNS = (
+    Post.id,
+    Post.title,
+    Post.slug,
+    Post.excerpt,
+    Post.featured_image,
+    Post.created_at,
+    Post.updated_at,
+)
+
 
 class UserRepository:
     def __init__(self, db: Session = Depends(get_db)):
@@ -63,13 +77,79 @@ class UserRepository:
         skip: Optional[int] = 0,
         limit: Optional[int] = 100,
         search: Optional[str] = None,
-    ) -> List[User]:
-        query = self.db.query(User)
+    ) -> List[Row]:
+        query = select(*USER_COLUMNS)
         if search:
-            query = query.filter(User.username.contains(search))
+            query = query.where(User.username.contains(search))
         query = query.limit(limit).offset(skip)
 
-        return query.all()
+        return self.db.execute(query).all()
+
+    def get_profile(self, username: str) -> Optional[Row]:
+        """
+        :param username: Username of the author
+        :return: The author's ID, username and creation time with the number
+            of published posts, the comments and views they received
+
+        Computes the counts with correlated subqueries in the same statement,
+        each reading the author's posts through the (author_id, updated_at)
+        index.
+        """
+        published = and_(Post.author_id == User.id, Post.is_published == True)
+        post_count = select(func.count(Post.id)).where(published)
+        comments_received = (
+            select(func.count(Comment.id))
+            .join(Post, Post.id == Comment.post_id)
+            .where(published)
+        )
+        views = (
+            select(func.coalesce(func.sum(PostStats.views), 0))
+            .join(Post, Post.id == PostStats.post_id)
+            .where(published)
+        )
+        query = select(
+            User.id,
+            User.username,
+            User.created_at,
+            post_count.scalar_subquery().label("post_count"),
+            comments_received.scalar_subquery().label("comments_received"),
+            views.scalar_subquery().label("views"),
+        ).where(User.username == username, User.is_active == True)
+        return self.db.execute(query).first()
+
+    def get_top_tags(self, author_id: int, limit: int) -> List[Row]:
+        """
+        :param author_id: ID of the author
+        :param limit: Max number of tags to return
+        :return: Tags of the author's published posts with their number of
+            posts, most used first
+        """
+        posts = func.count().label("posts")
+        query = (
+            select(Tag.id, Tag.title, Tag.slug, posts)
+            .select_from(TagPost)
+            .join(Post, Post.id == TagPost.c.post_id)
+            .join(Tag, Tag.id == TagPost.c.tag_id)
+            .where(Post.author_id == author_id, Post.is_published == True)
+            .group_by(Tag.id, Tag.title, Tag.slug)
+            .order_by(desc(posts), Tag.id)
+            .limit(limit)
+        )
+        return self.db.execute(query).all()
+
+    def get_latest_posts(self, author_id: int, limit: int) -> List[Row]:
+        """
+        :param author_id: ID of the author
+        :param limit: Max number of posts to return
+        :return: The author's last updated published posts
+        """
+        query = (
+            select(*PROFILE_POST_COLUMNS)
+            .where(Post.author_id == author_id, Post.is_published == True)
+            .order_by(desc(Post.updated_at))
+            .limit(limit)
+        )
+        return self.db.execute(query).all()
 
     def update(self, user_id: int, user: UserUpdate) -> User:
 
@@ -79,9 +159,22 @@ class UserRepository:
             setattr(db_user, key, value)
         self.db.commit()
         self.db.refresh(db_user)
+        profile_cache.invalidate(user_id)
         return db_user
 
     def delete(self, user_id: int) -> None:
         db_user = self.get(user_id)
+        # The user's tag follows go with it, their counts in the same transaction
+        self.db.execute(
+            update(Tag)
+            .where(
+                Tag.id.in_(
+                    select(TagFollow.tag_id).where(TagFollow.follower_id == user_id)
+                )
+            )
+            .values(follower_count=Tag.follower_count - 1)
+            .execution_options(synchronize_session=False)
+        )
         self.db.delete(db_user)
         self.db.commit()
+        profile_cache.invalidate(user_id)
@@ -3,9 +3,15 @@ from fastapi import APIRouter
 from .auth_router import auth_router
 from .user_routers import user_router
 from .blog_routers import blog_router
+from .admin_router import admin_router
+from .feed_routers import feed_router
+from .image_routers import image_router
 
 router = APIRouter()
 
 router.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 router.include_router(user_router, prefix="/users", tags=["Users"])
 router.include_router(blog_router, prefix="/blogs", tags=["Blogs"])
+router.include_router(admin_router, prefix="/admin", tags=["Admin"])
+router.include_router(feed_router, tags=["Feeds"])
+router.include_router(image_router, tags=["Images"])
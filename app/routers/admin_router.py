@@ -0,0 +1,52 @@
+from fastapi import Depends, HTTPException, Query, Request, status
+from fastapi_utils.cbv import cbv
+from fastapi_utils.inferring_router import InferringRouter
+
+from app.schemas import UserRead
+from config.dependencies import get_admin_user
+from database.session import slow_query_log
+
+admin_router = InferringRouter()
+
+
+@cbv(admin_router)
+class AdminRouter:
+    def __init__(
+        self, request: Request, admin_user: UserRead = Depends(get_admin_user)
+    ) -> None:
+        self.request = request
+
+    @admin_router.get("/concurrency")
+    def get_concurrency_stats(self):
+        """
+        Get the adaptive concurrency limiter state
+        """
+        return self.request.app.state.concurrency_limiter.stats()
+
+    @admin_router.get("/slow-queries")
+    def get_slow_queries(
+        self,
+        limit: int = Query(20, le=100),
+        order_by: str = Query("total_ms", regex="^(total_ms|max_ms|count)$"),
+    ):
+        """
+        Get the slowest statement shapes with their origin and query plan
+        """
+        if slow_query_log is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Slow query log is not enabled",
+            )
+        return slow_query_log.worst(limit, order_by)
+
+    @admin_router.get("/slow-queries/recent")
+    def get_recent_slow_queries(self, limit: int = Query(50, le=500)):
+        """
+        Get the most recent slow statements
+        """
+        if slow_query_log is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Slow query log is not enabled",
+            )
+        return slow_query_log.recent(limit)
@@ -10,7 +10,7 @@ from app.schemas.blog_schemas import (
     PostUpdate,
 )
 
-from app.services import TagService
+from app.services import TagService, TimelineService, TrendingService
 from app.services.blog_services import PostService, CommentService
 from app.schemas import (
     PostCreate,
@@ -19,9 +19,13 @@ from app.schemas import (
     TagUpdate,
     TagRead,
     TagReadWithPosts,
+    TrendingPostRead,
 )
 from app.schemas import UserRead
+from app.middlewares.view_counter import VIEW_HEADER
+from app.utils import trusted_response
 from config.dependencies import get_active_user, get_admin_user
+from config.settings import settings
 
 
 blog_router = InferringRouter()
@@ -48,14 +52,16 @@ class TagRouter:
         """
         Get all tags
         """
-        return self.tag_service.get_all(skip, limit, search)
+        return trusted_response(
+            TagRead, self.tag_service.get_all(skip, limit, search), many=True
+        )
 
     @blog_router.get("/tags/{slug}", response_model=TagReadWithPosts)
     def get_tags_by_slug(self, slug: str) -> TagRead:
         """
         Get a tag by slug
         """
-        return self.tag_service.get_by_slug(slug)
+        return trusted_response(TagReadWithPosts, self.tag_service.get_by_slug(slug))
 
     @blog_router.put("/tags/{slug}", response_model=TagRead)
     def update_tags(
@@ -73,6 +79,30 @@ class TagRouter:
         """
         return self.tag_service.delete(slug)
 
+    @blog_router.post("/tags/{slug}/follow")
+    def follow_tag(
+        self,
+        slug: str,
+        current_user: UserRead = Depends(get_active_user),
+        timeline_service: TimelineService = Depends(TimelineService),
+    ):
+        """
+        Follow a tag
+        """
+        return timeline_service.follow_tag(current_user.id, slug)
+
+    @blog_router.delete("/tags/{slug}/follow")
+    def unfollow_tag(
+        self,
+        slug: str,
+        current_user: UserRead = Depends(get_active_user),
+        timeline_service: TimelineService = Depends(TimelineService),
+    ):
+        """
+        Unfollow a tag
+        """
+        return timeline_service.unfollow_tag(current_user.id, slug)
+
 
 @cbv(blog_router)
 class PostRouter:
@@ -80,9 +110,11 @@ class PostRouter:
         self,
         post_service: PostService = Depends(PostService),
         comment_service: CommentService = Depends(CommentService),
+        trending_service: TrendingService = Depends(TrendingService),
     ) -> None:
         self.post_service = post_service
         self.comment_service = comment_service
+        self.trending_service = trending_service
 
     @blog_router.post("/posts", response_model=PostRead)
     def create_posts(
@@ -121,7 +153,9 @@ class PostRouter:
         """
         Get all posts
         """
-        return self.post_service.get_all(skip, limit, search)
+        return trusted_response(
+            PostRead, self.post_service.get_all(skip, limit, search), many=True
+        )
 
     @blog_router.get("/posts/featured", response_model=List[PostRead])
     def get_featured_posts(
@@ -132,14 +166,32 @@ class PostRouter:
         """
         Get all featured posts
         """
-        return self.post_service.get_featured(skip, limit)
+        return trusted_response(
+            PostRead, self.post_service.get_featured(skip, limit), many=True
+        )
+
+    @blog_router.get("/posts/trending", response_model=List[TrendingPostRead])
+    def get_trending_posts(
+        self,
+        skip: int = 0,
+        limit: int = Query(settings.TRENDING_SIZE, le=settings.TRENDING_SIZE),
+    ) -> List[TrendingPostRead]:
+        """
+        Get the posts with the most recent views and comments
+        """
+        return self.trending_service.get_trending(skip, limit)
 
     @blog_router.get("/posts/{slug}", response_model=PostReadWithTags)
     def get_post_by_slug(self, slug: str) -> PostReadWithTags:
         """
         Get a post by slug
         """
-        return self.post_service.get_by_slug(slug)
+        post = self.post_service.get_by_slug(slug)
+        response = trusted_response(PostReadWithTags, post)
+        # Only ViewCounterMiddleware removes it before the response is sent
+        if settings.VIEW_COUNTER_ENABLED:
+            response.headers[VIEW_HEADER] = str(post.id)
+        return response
 
     @blog_router.delete("/posts/{slug}")
     def delete_post(
@@ -186,7 +238,9 @@ class CommentRouter:
         """
         Get all comments
         """
-        return self.comment_service.get_all(skip, limit, search)
+        return trusted_response(
+            CommentRead, self.comment_service.get_all(skip, limit, search), many=True
+        )
 
     @blog_router.get("/comments/{id}", response_model=CommentRead)
     def get_comment_by_id(
@@ -195,7 +249,7 @@ class CommentRouter:
         """
         Get a comment by id
         """
-        return self.comment_service.get(id)
+        return trusted_response(CommentRead, self.comment_service.get(id))
 
     @blog_router.delete("/comments/{id}")
     def delete_comment(self, id: int, active_user: UserRead = Depends(get_active_user)):
@@ -0,0 +1,84 @@
+from fastapi import Depends, Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi_utils.cbv import cbv
+from fastapi_utils.inferring_router import InferringRouter
+
+from app.services.feed_services import FeedService
+from app.utils.feeds import artifact_response, feed_store
+from config.settings import settings
+
+
+feed_router = InferringRouter()
+
+
+@cbv(feed_router)
+class FeedRouter:
+    def __init__(self, feed_service: FeedService = Depends(FeedService)) -> None:
+        self.feed_service = feed_service
+
+    def feed_response(self, request: Request, format: str, tag_slug: str = None):
+        feed = self.feed_service.get_feed(tag_slug)
+        return artifact_response(
+            feed_store.artifact(feed, format), request.headers, settings.FEED_MAX_AGE
+        )
+
+    @feed_router.get("/feed.xml", response_class=Response)
+    def get_feed(self, request: Request):
+        """
+        RSS feed of the newest posts
+        """
+        return self.feed_response(request, "rss")
+
+    @feed_router.get("/atom.xml", response_class=Response)
+    def get_atom_feed(self, request: Request):
+        """
+        Atom feed of the newest posts
+        """
+        return self.feed_response(request, "atom")
+
+    @feed_router.get("/tags/{slug}/feed.xml", response_class=Response)
+    def get_tag_feed(self, request: Request, slug: str):
+        """
+        RSS feed of the newest posts with a tag
+        """
+        return self.feed_response(request, "rss", slug)
+
+    @feed_router.get("/tags/{slug}/atom.xml", response_class=Response)
+    def get_tag_atom_feed(self, request: Request, slug: str):
+        """
+        Atom feed of the newest posts with a tag
+        """
+        return self.feed_response(request, "atom", slug)
+
+    @feed_router.get("/sitemap.xml", response_class=Response)
+    def get_sitemap_index(self):
+        """
+        Sitemap index of the tag and post sitemaps
+        """
+        return Response(
+            self.feed_service.get_sitemap_index(),
+            media_type="application/xml",
+            headers={"Cache-Control": f"public, max-age={settings.FEED_MAX_AGE}"},
+        )
+
+    @feed_router.get("/sitemaps/tags.xml", response_class=StreamingResponse)
+    def get_tag_sitemap(self):
+        """
+        Sitemap of every tag
+        """
+        return StreamingResponse(
+            self.feed_service.get_tag_sitemap(),
+            media_type="application/xml",
+            headers={"Cache-Control": f"public, max-age={settings.SITEMAP_MAX_AGE}"},
+        )
+
+    @feed_router.get("/sitemaps/posts-{page}.xml", response_class=StreamingResponse)
+    def get_post_sitemap(self, page: int):
+        """
+        Sitemap of a range of published posts
+        """
+        return StreamingResponse(
+            self.feed_service.get_post_sitemap(page),
+            media_type="application/xml",
+            headers={"Cache-Control": f"public, max-age={settings.SITEMAP_MAX_AGE}"},
+        )
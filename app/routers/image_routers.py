@@ -0,0 +1,104 @@
+from fastapi import Depends, File, Path, Request, UploadFile
+from fastapi.responses import Response
+from fastapi_utils.cbv import cbv
+from fastapi_utils.inferring_router import InferringRouter
+
+from app.schemas import ImageRead, UploadCreate, UploadRead, UserRead
+from app.services import ImageService, UploadService
+from config.dependencies import get_active_user
+
+
+image_router = InferringRouter()
+
+# The body of an upload's PUT isn't a form or JSON, document it as raw bytes
+UPLOAD_BODY = {
+    "requestBody": {
+        "content": {
+            "application/octet-stream": {
+                "schema": {"type": "string", "format": "binary"}
+            }
+        },
+        "required": True,
+    }
+}
+
+
+# Before ImageRouter, so /images/uploads/{upload_id} isn't read as an image
+@cbv(image_router)
+class UploadRouter:
+    def __init__(self, upload_service: UploadService = Depends(UploadService)) -> None:
+        self.upload_service = upload_service
+
+    @image_router.post("/images/uploads", response_model=UploadRead)
+    def create_upload(
+        self, upload: UploadCreate, user: UserRead = Depends(get_active_user)
+    ) -> UploadRead:
+        """
+        Start a resumable image upload of `size` bytes
+        """
+        return self.upload_service.create(upload.size, user.id)
+
+    @image_router.get("/images/uploads/{upload_id}", response_model=UploadRead)
+    def get_upload(
+        self, upload_id: str, user: UserRead = Depends(get_active_user)
+    ) -> UploadRead:
+        """
+        Get the number of bytes an upload received, where to resume it
+        """
+        return self.upload_service.get(upload_id, user.id)
+
+    @image_router.put(
+        "/images/uploads/{upload_id}",
+        response_model=UploadRead,
+        openapi_extra=UPLOAD_BODY,
+    )
+    async def write_upload(
+        self,
+        upload_id: str,
+        request: Request,
+        user: UserRead = Depends(get_active_user),
+    ) -> UploadRead:
+        """
+        Send the bytes of an upload given by the `Content-Range` header, or
+        all the remaining ones without it. Returns the image once complete
+        """
+        return await self.upload_service.write(
+            upload_id,
+            user.id,
+            request.headers.get("content-range"),
+            request.headers.get("content-length"),
+            request.stream(),
+        )
+
+    @image_router.delete("/images/uploads/{upload_id}")
+    def cancel_upload(self, upload_id: str, user: UserRead = Depends(get_active_user)):
+        """
+        Cancel an upload
+        """
+        return self.upload_service.cancel(upload_id, user.id)
+
+
+@cbv(image_router)
+class ImageRouter:
+    def __init__(self, image_service: ImageService = Depends(ImageService)) -> None:
+        self.image_service = image_service
+
+    @image_router.post("/images", response_model=ImageRead)
+    def upload_image(
+        self,
+        file: UploadFile = File(...),
+        user: UserRead = Depends(get_active_user),
+    ) -> ImageRead:
+        """
+        Upload an image to use as a featured image or cover image, use a
+        resumable upload for large ones
+        """
+        return self.image_service.upload(file.file, user.id)
+
+    @image_router.get("/images/{hash}/{filename}", response_class=Response)
+    def get_image(self, filename: str, hash: str = Path(..., regex="^[0-9a-f]{64}$")):
+        """
+        Get an original as `original.{format}` or a derivative as
+        `{width}.webp` or `{width}.jpeg`
+        """
+        return self.image_service.get_file(hash, filename)
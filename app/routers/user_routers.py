@@ -1,12 +1,29 @@
 from typing import List, Optional
 
 from fastapi import BackgroundTasks, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse
 from fastapi_utils.cbv import cbv
 from fastapi_utils.inferring_router import InferringRouter
 
-from app.services import UserService
+from app.services import (
+    NotificationService,
+    PostService,
+    TimelineService,
+    UserService,
+)
+from app.utils import trusted_response
 from config.dependencies import get_active_user, get_admin_user
-from app.schemas import UserCreate, UserRead, UserUpdate
+from app.schemas import (
+    NotificationsRead,
+    PostRead,
+    PostStatus,
+    TimelineRead,
+    UnreadCountRead,
+    UserCreate,
+    UserProfileRead,
+    UserRead,
+    UserUpdate,
+)
 
 user_router = InferringRouter()
 
@@ -32,6 +49,82 @@ class UserRouter:
         """
         return current_user
 
+    @user_router.get("/me/posts", response_model=List[PostRead])
+    def get_current_user_posts(
+        self,
+        post_status: PostStatus = Query(PostStatus.all, alias="status"),
+        skip: int = 0,
+        limit: int = Query(100, le=100),
+        current_user: UserRead = Depends(get_active_user),
+        post_service: PostService = Depends(PostService),
+    ) -> List[PostRead]:
+        """
+        Get the current user's posts, drafts included
+        """
+        return trusted_response(
+            PostRead,
+            post_service.get_by_author(current_user.id, post_status, skip, limit),
+            many=True,
+        )
+
+    @user_router.get("/me/timeline", response_model=TimelineRead)
+    def get_current_user_timeline(
+        self,
+        cursor: Optional[int] = None,
+        limit: int = Query(20, le=100),
+        current_user: UserRead = Depends(get_active_user),
+        timeline_service: TimelineService = Depends(TimelineService),
+    ) -> TimelineRead:
+        """
+        Get the latest posts of the authors and tags the current user follows
+        """
+        return ORJSONResponse(
+            timeline_service.get_timeline(current_user.id, cursor, limit)
+        )
+
+    @user_router.get("/me/notifications", response_model=NotificationsRead)
+    def get_current_user_notifications(
+        self,
+        cursor: Optional[int] = None,
+        limit: int = Query(20, le=100),
+        unread: bool = False,
+        current_user: UserRead = Depends(get_active_user),
+        notification_service: NotificationService = Depends(NotificationService),
+    ) -> NotificationsRead:
+        """
+        Get the replies to the current user's comments and the comments on
+        their posts
+        """
+        return ORJSONResponse(
+            notification_service.get_notifications(
+                current_user.id, cursor, limit, unread
+            )
+        )
+
+    @user_router.get("/me/notifications/unread", response_model=UnreadCountRead)
+    def get_current_user_unread_count(
+        self,
+        current_user: UserRead = Depends(get_active_user),
+        notification_service: NotificationService = Depends(NotificationService),
+    ) -> UnreadCountRead:
+        """
+        Get the current user's number of unread notifications
+        """
+        return notification_service.count_unread(current_user.id)
+
+    @user_router.post("/me/notifications/read", response_model=UnreadCountRead)
+    def mark_current_user_notifications_read(
+        self,
+        until: Optional[int] = None,
+        current_user: UserRead = Depends(get_active_user),
+        notification_service: NotificationService = Depends(NotificationService),
+    ) -> UnreadCountRead:
+        """
+        Mark the current user's notifications up to `until`, or all of them,
+        as read
+        """
+        return notification_service.mark_read(current_user.id, until)
+
     @user_router.get("/", response_model=List[UserRead])
     def get_all_users(
         self,
@@ -63,6 +156,37 @@ class UserRouter:
             user_id, user, self.request, self.background_tasks
         )
 
+    @user_router.post("/{user_id}/follow")
+    def follow_user(
+        self,
+        user_id: int,
+        current_user: UserRead = Depends(get_active_user),
+        timeline_service: TimelineService = Depends(TimelineService),
+    ):
+        """
+        Follow an author
+        """
+        return timeline_service.follow_author(current_user.id, user_id)
+
+    @user_router.delete("/{user_id}/follow")
+    def unfollow_user(
+        self,
+        user_id: int,
+        current_user: UserRead = Depends(get_active_user),
+        timeline_service: TimelineService = Depends(TimelineService),
+    ):
+        """
+        Unfollow an author
+        """
+        return timeline_service.unfollow_author(current_user.id, user_id)
+
+    @user_router.get("/{username}/profile", response_model=UserProfileRead)
+    def get_user_profile(self, username: str):
+        """
+        Get an author's public profile
+        """
+        return ORJSONResponse(self.user_services.get_profile(username))
+
     # @user_router.get("/{username}", response_model=UserRead)
     # def get_user_by_username(self, username: str):
     #     """
@@ -4,11 +4,30 @@ from .blog_schemas import (
     PostCreate,
     PostUpdate,
     PostReadWithTags,
+    PostStatus,
+    RelatedPostRead,
+    TrendingPostRead,
     TagCreate,
     TagUpdate,
     TagRead,
     TagReadWithPosts,
     CommentRead,
     CommentCreate,
+    ImageRead,
+    UploadCreate,
+    UploadRead,
+)
+from .user_schemas import (
+    NotificationKind,
+    NotificationRead,
+    NotificationsRead,
+    ProfilePostRead,
+    ProfileTagRead,
+    TimelineRead,
+    UnreadCountRead,
+    UserCreate,
+    UserProfileRead,
+    UserRead,
+    UserReadWithPosts,
+    UserUpdate,
 )
-from .user_schemas import UserCreate, UserRead, UserReadWithPosts, UserUpdate
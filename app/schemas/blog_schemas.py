@@ -1,6 +1,7 @@
 from datetime import datetime
+from enum import Enum
 from pydantic import BaseModel
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 
 class TagBase(BaseModel):
@@ -97,6 +98,16 @@ class TagReadWithPosts(TagRead):
         }
 
 
+class PostStatus(str, Enum):
+    """
+    Publication status to filter posts by
+    """
+
+    all = "all"
+    draft = "draft"
+    published = "published"
+
+
 class PostBase(BaseModel):
     """
     Base class for Post model
@@ -228,12 +239,40 @@ class PostRead(PostBase):
         }
 
 
+class RelatedPostRead(BaseModel):
+    """
+    Model for reading a post related to another
+    """
+
+    id: int
+    title: str
+    slug: str
+    excerpt: Optional[str]
+    featured_image: Optional[str]
+    score: float
+
+    class Config:
+        orm_mode = True
+        schema_extra = {
+            "example": {
+                "id": 2,
+                "title": "Post 2",
+                "slug": "post-2",
+                "excerpt": "This is the second post",
+                "featured_image": "https://picsum.photos/id/2/200/300",
+                "score": 0.42,
+            }
+        }
+
+
 class PostReadWithTags(PostRead):
     """
     Model for reading a post with tags
     """
 
     tags: List["TagRead"]
+    views: int = 0
+    related: List[RelatedPostRead] = []
 
     class Config:
         orm_mode = True
@@ -257,6 +296,17 @@ class PostReadWithTags(PostRead):
                     "created_at": "2020-01-01T00:00:00",
                     "updated_at": "2020-01-01T00:00:00",
                 },
+                "views": 42,
+                "related": [
+                    {
+                        "id": 2,
+                        "title": "Post 2",
+                        "slug": "post-2",
+                        "excerpt": "This is the second post",
+                        "featured_image": "https://picsum.photos/id/2/200/300",
+                        "score": 0.42,
+                    }
+                ],
                 "tags": {
                     "id": 1,
                     "title": "programming",
@@ -272,6 +322,20 @@ class PostReadWithTags(PostRead):
         }
 
 
+class TrendingPostRead(PostRead):
+    """
+    Model for reading a trending post with its score
+    """
+
+    score: float
+
+    class Config:
+        orm_mode = True
+        schema_extra = {
+            "example": dict(PostRead.Config.schema_extra["example"], score=183.4)
+        }
+
+
 class CommentBase(BaseModel):
     """
     Base class for Comment model
@@ -356,9 +420,77 @@ class CommentRead(CommentBase):
         }
 
 
+class ImageRead(BaseModel):
+    """
+    Model for reading an uploaded image
+    """
+
+    hash: str
+    format: str
+    width: int
+    height: int
+    size: int
+    url: str
+    srcset: Dict[str, str]
+    processed: bool
+    created_at: datetime
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "hash": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+                "format": "png",
+                "width": 800,
+                "height": 600,
+                "size": 482113,
+                "url": "/images/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08/original.png",
+                "srcset": {
+                    "image/webp": "/images/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08/320.webp 320w, /images/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08/640.webp 640w, /images/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08/800.webp 800w",
+                    "image/jpeg": "/images/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08/320.jpeg 320w, /images/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08/640.jpeg 640w, /images/9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08/800.jpeg 800w",
+                },
+                "processed": True,
+                "created_at": "2020-01-01T00:00:00",
+            }
+        }
+
+
+class UploadCreate(BaseModel):
+    """
+    Model for starting a resumable upload
+    """
+
+    size: int
+
+    class Config:
+        schema_extra = {"example": {"size": 4821130}}
+
+
+class UploadRead(BaseModel):
+    """
+    Model for reading a resumable upload, with its image once complete
+    """
+
+    id: str
+    size: int
+    received: int
+    image: Optional[ImageRead] = None
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "id": "3f2b9c0e5a7d41e8b6c19d04f7a2e5c3",
+                "size": 4821130,
+                "received": 1048576,
+                "image": None,
+            }
+        }
+
+
 from .user_schemas import UserRead
 
+
 PostRead.update_forward_refs()
 TagReadWithPosts.update_forward_refs()
 PostReadWithTags.update_forward_refs()
+TrendingPostRead.update_forward_refs()
 CommentRead.update_forward_refs()
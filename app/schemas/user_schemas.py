@@ -1,4 +1,5 @@
 from datetime import datetime
+from enum import Enum
 from pydantic import BaseModel
 from typing import List, Optional, TYPE_CHECKING
 
@@ -108,6 +109,151 @@ class UserReadWithPosts(UserRead):
         }
 
 
+class ProfileTagRead(BaseModel):
+    """
+    Model for reading a tag of an author's posts
+    """
+
+    id: int
+    title: str
+    slug: str
+    posts: int
+
+
+class ProfilePostRead(BaseModel):
+    """
+    Model for reading a post listed on its author's profile
+    """
+
+    id: int
+    title: str
+    slug: str
+    excerpt: Optional[str]
+    featured_image: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+
+class UserProfileRead(BaseModel):
+    """
+    Model for reading an author's public profile
+    """
+
+    id: int
+    username: str
+    created_at: datetime
+    post_count: int
+    comments_received: int
+    views: int
+    top_tags: List[ProfileTagRead]
+    latest_posts: List[ProfilePostRead]
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "id": 1,
+                "username": "sheyzi",
+                "created_at": "2020-01-01T00:00:00",
+                "post_count": 12,
+                "comments_received": 48,
+                "views": 1024,
+                "top_tags": [
+                    {"id": 1, "title": "programming", "slug": "programming", "posts": 7}
+                ],
+                "latest_posts": [
+                    {
+                        "id": 1,
+                        "title": "Post 1",
+                        "slug": "post-1",
+                        "excerpt": "This is the first post",
+                        "featured_image": "https://picsum.photos/id/1/200/300",
+                        "created_at": "2020-01-01T00:00:00",
+                        "updated_at": "2020-01-01T00:00:00",
+                    }
+                ],
+            }
+        }
+
+
+class TimelineRead(BaseModel):
+    """
+    Model for reading a page of the home timeline, pass `next_cursor` as
+    `cursor` to read the next page
+    """
+
+    posts: List["PostRead"]
+    next_cursor: Optional[int] = None
+
+    class Config:
+        schema_extra = {"example": {"posts": [], "next_cursor": 1234}}
+
+
+class NotificationKind(str, Enum):
+    """
+    What a notification is about
+    """
+
+    reply = "reply"
+    comment = "comment"
+
+
+class NotificationRead(BaseModel):
+    """
+    Model for reading a notification of a reply to one of the user's comments
+    or of a comment on one of their posts
+    """
+
+    id: int
+    kind: NotificationKind
+    comment_id: int
+    comment_excerpt: str
+    post_id: int
+    post_title: str
+    post_slug: str
+    actor_id: int
+    actor_username: str
+    created_at: datetime
+    read_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+        schema_extra = {
+            "example": {
+                "id": 1,
+                "kind": "reply",
+                "comment_id": 12,
+                "comment_excerpt": "Thanks, that fixed it",
+                "post_id": 1,
+                "post_title": "Post 1",
+                "post_slug": "post-1",
+                "actor_id": 2,
+                "actor_username": "sheyzi",
+                "created_at": "2020-01-01T00:00:00",
+                "read_at": None,
+            }
+        }
+
+
+class NotificationsRead(BaseModel):
+    """
+    Model for reading a page of notifications, pass `next_cursor` as `cursor`
+    to read the next page
+    """
+
+    notifications: List[NotificationRead]
+    unread_count: int
+    next_cursor: Optional[int] = None
+
+
+class UnreadCountRead(BaseModel):
+    """
+    Model for reading the number of unread notifications
+    """
+
+    unread_count: int
+
+
 from .blog_schemas import PostRead
 
 UserReadWithPosts.update_forward_refs()
+TimelineRead.update_forward_refs()
@@ -1,3 +1,9 @@
 from .auth_services import AuthServices
 from .user_services import UserService
 from .blog_services import TagService, PostService
+from .feed_services import FeedService
+from .trending_services import TrendingService
+from .related_services import RelatedService
+from .timeline_services import TimelineService
+from .notification_services import NotificationService
+from .image_services import ImageService, UploadService
@@ -3,7 +3,7 @@ from typing import Optional, List
 from fastapi import Depends
 
 from app.repositories import TagRepository, PostRepository, CommentRepository
-from app.schemas import TagUpdate, TagCreate, PostCreate, PostUpdate
+from app.schemas import TagUpdate, TagCreate, PostCreate, PostUpdate, PostStatus
 from app.schemas.blog_schemas import CommentRead
 from database.models import Tag, Post
 
@@ -96,11 +96,29 @@ class PostService:
         :param search: Search term
         :return: List of posts
 
-        Returns all posts.
+        Returns all published posts.
         """
         query = self.post_repository.get_all(skip, limit, search)
         return query
 
+    def get_by_author(
+        self,
+        author_id: int,
+        status: PostStatus = PostStatus.all,
+        skip: Optional[int] = 0,
+        limit: Optional[int] = 100,
+    ) -> List[Post]:
+        """
+        :param author_id: ID of the author
+        :param status: Only drafts, only published posts, or all
+        :param skip: Number of items to skip
+        :param limit: Max number of items to return
+        :return: List of posts
+
+        Returns an author's posts, drafts included.
+        """
+        return self.post_repository.get_by_author(author_id, status, skip, limit)
+
     def get_by_slug(self, slug: str) -> Post:
         """
         :param slug: Slug of post to return
@@ -0,0 +1,90 @@
+from typing import Iterator, Optional
+
+from fastapi import Depends, HTTPException, status
+
+from app.repositories.feed_repository import FeedRepository
+from app.utils.feeds import Feed, feed_store, sitemap_index, sitemap_urlset
+from config.settings import settings
+
+
+class FeedService:
+    def __init__(
+        self, feed_repository: FeedRepository = Depends(FeedRepository)
+    ) -> None:
+        self.feed_repository = feed_repository
+
+    def get_feed(self, tag_slug: Optional[str] = None) -> Feed:
+        """
+        :param tag_slug: Slug of the tag, None for the whole site
+        :return: Feed of the newest published posts
+
+        Returns the feed held in memory, loading it on first use.
+        """
+        if tag_slug is None:
+            return feed_store.get(
+                None,
+                lambda size: (
+                    settings.PROJECT_TITLE,
+                    self.feed_repository.get_posts(limit=size),
+                ),
+            )
+
+        def load(size: int):
+            tag = self.feed_repository.get_tag_by_slug(tag_slug)
+            if tag is None:
+                return None
+            return (
+                f"{settings.PROJECT_TITLE}: {tag.title}",
+                self.feed_repository.get_posts(tag_id=tag.id, limit=size),
+            )
+
+        feed = feed_store.get(tag_slug, load)
+        if feed is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found"
+            )
+        return feed
+
+    def sitemap_pages(self) -> int:
+        """
+        :return: Number of post sitemaps
+
+        Each covers a range of SITEMAP_PAGE_SIZE post IDs, so pages keep their
+        URLs as posts are added.
+        """
+        max_id = self.feed_repository.get_max_post_id()
+        return -(-max_id // settings.SITEMAP_PAGE_SIZE)
+
+    def get_sitemap_index(self) -> str:
+        """
+        :return: Sitemap index of the tag sitemap and every post sitemap
+        """
+        site_url = feed_store.site_url
+        return sitemap_index(
+            [f"{site_url}/sitemaps/tags.xml"]
+            + [
+                f"{site_url}/sitemaps/posts-{page}.xml"
+                for page in range(1, self.sitemap_pages() + 1)
+            ]
+        )
+
+    def get_post_sitemap(self, page: int) -> Iterator[bytes]:
+        """
+        :param page: Number of the post sitemap, from 1
+        :return: Chunks of the sitemap of the published posts in the page
+        """
+        if page < 1 or page > self.sitemap_pages():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Sitemap not found"
+            )
+        size = settings.SITEMAP_PAGE_SIZE
+        rows = self.feed_repository.iter_published_posts(
+            (page - 1) * size + 1, page * size
+        )
+        return sitemap_urlset(rows, feed_store.post_url)
+
+    def get_tag_sitemap(self) -> Iterator[bytes]:
+        """
+        :return: Chunks of the sitemap of every tag
+        """
+        return sitemap_urlset(self.feed_repository.iter_tags(), feed_store.tag_url)
@@ -0,0 +1,383 @@
+import argparse
+import re
+import time
+from typing import AsyncIterator, BinaryIO, Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import ClientDisconnect
+
+from app.repositories.image_repository import ImageRepository, UploadRepository
+from app.utils.images import (
+    DERIVATIVE_FORMATS,
+    MEDIA_TYPES,
+    derivative_key,
+    derivative_widths,
+    image_pipeline,
+    image_storage,
+    original_key,
+    probe,
+)
+from app.utils.uploads import PartialUpload, new_upload_id, upload_store
+from config.settings import settings
+from database.models import Image
+from database.session import SessionLocal
+
+FILENAME = re.compile(r"^(original|[1-9][0-9]*)\.(jpeg|png|webp|gif)$")
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+def image_url(hash: str, name: str, format: str) -> str:
+    return f"{settings.IMAGE_URL}/{hash}/{name}.{format}"
+
+
+class ImageService:
+    def __init__(
+        self, image_repository: ImageRepository = Depends(ImageRepository)
+    ) -> None:
+        self.image_repository = image_repository
+
+    def upload(self, file: BinaryIO, uploader_id: int) -> dict:
+        """
+        :param file: Uploaded file
+        :param uploader_id: ID of the user uploading it
+        :return: The image with the URLs of its original and derivatives
+
+        Copies the file to a partial upload in chunks, hashing them, and
+        stores it.
+        """
+        upload_id = new_upload_id()
+        partial = upload_store.create(upload_id)
+        try:
+            for chunk in iter(lambda: file.read(settings.UPLOAD_CHUNK_SIZE), b""):
+                if partial.offset + len(chunk) > settings.IMAGE_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="Image is too large",
+                    )
+                partial.write(chunk)
+            return self.store(
+                partial.path, partial.digest(), partial.offset, uploader_id
+            )
+        finally:
+            partial.close()
+            upload_store.delete(upload_id)
+
+    def store(self, path: str, hash: str, size: int, uploader_id: int) -> dict:
+        """
+        :param path: Local file of the upload, moved to the image storage
+        :param hash: SHA-256 of the file
+        :param size: Bytes of the file
+        :param uploader_id: ID of the user uploading it
+        :return: The image with the URLs of its original and derivatives
+
+        Stores the original once per content and hands its resizing to the
+        image pipeline, the derivative URLs serve the original until then.
+        """
+        db_image = self.image_repository.get_by_hash_or_none(hash)
+        if db_image is None:
+            info = probe(path)
+            if info is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Image must be a JPEG, PNG, WebP or GIF",
+                )
+            if info.width * info.height > settings.IMAGE_MAX_PIXELS:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Image has too many pixels",
+                )
+            image_storage.move(original_key(hash, info.format), path)
+            db_image = self.image_repository.create(hash, info, size, uploader_id)
+        if db_image.processed_at is None:
+            image_id = db_image.id
+            image_pipeline.submit(
+                db_image.hash,
+                db_image.format,
+                lambda db: ImageRepository(db).mark_processed(image_id),
+                self.image_repository.db,
+            )
+        return self.read(db_image)
+
+    def read(self, image: Image) -> dict:
+        widths = derivative_widths(image.width, settings.IMAGE_WIDTHS)
+        return {
+            "hash": image.hash,
+            "format": image.format,
+            "width": image.width,
+            "height": image.height,
+            "size": image.size,
+            "url": image_url(image.hash, "original", image.format),
+            "srcset": {
+                MEDIA_TYPES[format]: ", ".join(
+                    f"{image_url(image.hash, str(width), format)} {width}w"
+                    for width in widths
+                )
+                for format in DERIVATIVE_FORMATS
+            },
+            "processed": image.processed_at is not None,
+            "created_at": image.created_at,
+        }
+
+    def get_file(self, hash: str, filename: str) -> Response:
+        """
+        :param hash: Hash of the original
+        :param filename: `original` or the width of a derivative, and the
+            format
+        :return: The file, cached for good as its URL names its content
+
+        Derivatives not rendered yet are served as the original, revalidated
+        on every request until they are. Widths that aren't in the image's
+        srcset are not found.
+        """
+        match = FILENAME.match(filename)
+        if match is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Image not found"
+            )
+        name, format = match.groups()
+        immutable = {
+            "Cache-Control": f"public, max-age={settings.IMAGE_MAX_AGE}, immutable"
+        }
+        if name == "original":
+            key = original_key(hash, format)
+            if image_storage.exists(key):
+                return image_storage.response(key, MEDIA_TYPES[format], immutable)
+        elif format in DERIVATIVE_FORMATS:
+            key = derivative_key(hash, int(name), format)
+            if image_storage.exists(key):
+                return image_storage.response(key, MEDIA_TYPES[format], immutable)
+            image = self.image_repository.get_by_hash_or_none(hash)
+            if image is not None and int(name) in derivative_widths(
+                image.width, settings.IMAGE_WIDTHS
+            ):
+                key = original_key(hash, image.format)
+                if image_storage.exists(key):
+                    return image_storage.response(
+                        key, MEDIA_TYPES[image.format], {"Cache-Control": "no-cache"}
+                    )
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Image not found"
+        )
+
+
+class UploadService:
+    """
+    Resumable uploads: an upload is created with its size, then its bytes
+    are sent with one or more PUT requests, each with the Content-Range it
+    covers. A request that was cut off keeps what arrived, the upload's
+    `received` is where the next one starts.
+    """
+
+    def __init__(
+        self,
+        upload_repository: UploadRepository = Depends(UploadRepository),
+        image_service: ImageService = Depends(ImageService),
+    ) -> None:
+        self.upload_repository = upload_repository
+        self.image_service = image_service
+
+    def create(self, size: int, user_id: int) -> dict:
+        if size < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Upload size must be positive",
+            )
+        if size > settings.IMAGE_MAX_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Image is too large",
+            )
+        upload_id = new_upload_id()
+        upload_store.create(upload_id).close()
+        self.upload_repository.create(upload_id, user_id, size)
+        return {"id": upload_id, "size": size, "received": 0, "image": None}
+
+    def get(self, upload_id: str, user_id: int) -> dict:
+        upload = self.get_upload(upload_id, user_id)
+        received = upload_store.size(upload_id)
+        if received is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found"
+            )
+        return {"id": upload.id, "size": upload.size, "received": received}
+
+    def cancel(self, upload_id: str, user_id: int) -> dict:
+        self.get_upload(upload_id, user_id)
+        upload_store.delete(upload_id)
+        self.upload_repository.delete([upload_id])
+        return {"message": "Upload cancelled"}
+
+    async def write(
+        self,
+        upload_id: str,
+        user_id: int,
+        content_range: Optional[str],
+        content_length: Optional[str],
+        body: AsyncIterator[bytes],
+    ) -> dict:
+        """
+        :param upload_id: ID of the upload
+        :param user_id: ID of the user uploading
+        :param content_range: Bytes of the upload in the body, the rest of
+            them if None
+        :param content_length: Length of the body, if known
+        :param body: Request body
+        :return: The upload, with its image once every byte was received
+
+        Writes the body to the upload's file as it is received, every
+        UPLOAD_CHUNK_SIZE bytes, and never reads past the range. Database and
+        disk work runs in the threadpool.
+        """
+        upload = await run_in_threadpool(self.get_upload, upload_id, user_id)
+        partial = await run_in_threadpool(self.open, upload_id)
+        try:
+            start, end = self.parse_range(content_range, upload.size, partial.offset)
+            if start != partial.offset:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Upload continues at byte {partial.offset}",
+                )
+            length = end - start + 1
+            if (
+                content_length
+                and content_length.isdigit()
+                and int(content_length) > length
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Request body is longer than its Content-Range",
+                )
+            buffer = bytearray()
+            try:
+                async for chunk in body:
+                    if partial.offset - start + len(buffer) + len(chunk) > length:
+                        await run_in_threadpool(partial.truncate, start)
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Request body is longer than its Content-Range",
+                        )
+                    buffer += chunk
+                    if len(buffer) >= settings.UPLOAD_CHUNK_SIZE:
+                        data, buffer = buffer, bytearray()
+                        await run_in_threadpool(partial.write, data)
+            except ClientDisconnect:
+                pass
+            if buffer:
+                await run_in_threadpool(partial.write, buffer)
+            if partial.offset < upload.size:
+                return {
+                    "id": upload.id,
+                    "size": upload.size,
+                    "received": partial.offset,
+                }
+            image = await run_in_threadpool(self.complete, upload, partial)
+            return {
+                "id": upload.id,
+                "size": upload.size,
+                "received": upload.size,
+                "image": image,
+            }
+        finally:
+            partial.close()
+
+    def complete(self, upload: Row, partial: PartialUpload) -> dict:
+        """
+        :return: The uploaded image
+
+        The upload is deleted whether its file is an image or not.
+        """
+        try:
+            return self.image_service.store(
+                partial.path, partial.digest(), partial.offset, upload.user_id
+            )
+        finally:
+            partial.close()
+            upload_store.delete(upload.id)
+            self.upload_repository.delete([upload.id])
+
+    def get_upload(self, upload_id: str, user_id: int) -> Row:
+        upload = self.upload_repository.get_or_none(upload_id)
+        if upload is None or upload.user_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found"
+            )
+        return upload
+
+    def open(self, upload_id: str) -> PartialUpload:
+        try:
+            partial = upload_store.open(upload_id)
+        except FileNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found"
+            )
+        if partial is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Upload is being written by another request",
+            )
+        return partial
+
+    def parse_range(
+        self, content_range: Optional[str], size: int, received: int
+    ) -> Tuple[int, int]:
+        """
+        :return: First and last byte of the range
+        """
+        if content_range is None:
+            return received, size - 1
+        match = CONTENT_RANGE.match(content_range)
+        if match is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Content-Range must be `bytes {first}-{last}/{size}`",
+            )
+        start, end = int(match.group(1)), int(match.group(2))
+        if match.group(3) not in ("*", str(size)) or not start <= end < size:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail=f"Content-Range must be within the {size} bytes of the upload",
+            )
+        return start, end
+
+
+def expire_uploads(
+    session_factory: sessionmaker = SessionLocal,
+    max_age: int = settings.UPLOAD_EXPIRE,
+) -> int:
+    """
+    :return: Number of uploads deleted for not being written to in `max_age`
+        seconds
+    """
+    expired = upload_store.expire(max_age)
+    with session_factory() as db:
+        UploadRepository(db).delete(expired)
+    return len(expired)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Deletes the resumable uploads abandoned on this host"
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        default=0,
+        help="Keep running, deleting abandoned uploads every this many seconds",
+    )
+    args = parser.parse_args()
+
+    while True:
+        count = expire_uploads()
+        if count:
+            print(f"Deleted {count} abandoned uploads")
+        if args.watch <= 0:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
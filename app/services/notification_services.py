@@ -0,0 +1,191 @@
+import argparse
+import time
+from itertools import groupby
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import Depends
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import sessionmaker
+
+from app.repositories.notification_repository import NotificationRepository
+from app.schemas import EmailSchema, NotificationRead
+from app.utils import get_serializer
+from config.mail import send_emails
+from config.settings import settings
+from database.session import SessionLocal
+
+DIGEST_TEMPLATE = "notification_digest.html"
+
+
+class NotificationService:
+    def __init__(
+        self,
+        notification_repository: NotificationRepository = Depends(
+            NotificationRepository
+        ),
+    ) -> None:
+        self.notification_repository = notification_repository
+
+    def get_notifications(
+        self, user_id: int, cursor: Optional[int], limit: int, unread: bool
+    ) -> dict:
+        """
+        :param user_id: ID of the user
+        :param cursor: `next_cursor` of the previous page, None for the first
+        :param limit: Max number of notifications to return
+        :param unread: Only unread notifications
+        :return: A page of the user's notifications, their unread count and
+            the cursor of the next page
+        """
+        notifications = self.notification_repository.get_by_user(
+            user_id, cursor, limit, unread
+        )
+        next_cursor = notifications[-1].id if len(notifications) == limit else None
+        return {
+            "notifications": get_serializer(NotificationRead).many(notifications),
+            "unread_count": self.notification_repository.count_unread(user_id),
+            "next_cursor": next_cursor,
+        }
+
+    def count_unread(self, user_id: int) -> dict:
+        return {"unread_count": self.notification_repository.count_unread(user_id)}
+
+    def mark_read(self, user_id: int, until: Optional[int]) -> dict:
+        """
+        :param user_id: ID of the user
+        :param until: Only notifications up to this ID, all of them if None
+        :return: The user's unread count afterwards
+        """
+        self.notification_repository.mark_read(user_id, until)
+        return self.count_unread(user_id)
+
+
+class DigestJob:
+    """
+    Emails each user with notifications that weren't emailed yet one digest
+    of the unread ones. Run it every digest window from a single process,
+    each run sends at most one email per user.
+
+    Notifications are marked as emailed once their digest is sent, or right
+    away for users who read them all or can't receive emails. Those of failed
+    emails go in the next run's digest.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        max_items: int = settings.NOTIFICATION_DIGEST_MAX_ITEMS,
+        batch_size: int = settings.NOTIFICATION_DIGEST_BATCH_SIZE,
+        concurrency: int = settings.NOTIFICATION_DIGEST_CONCURRENCY,
+        send: Callable[..., List[bool]] = send_emails,
+    ):
+        """
+        :param session_factory: Session factory of the database to read
+        :param max_items: Notifications listed per digest
+        :param batch_size: Users read and emailed at once
+        :param concurrency: Emails sent at once
+        :param send: Function sending the emails, see config.mail.send_emails
+        """
+        self.session_factory = session_factory
+        self.max_items = max_items
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.send = send
+
+    def run(self) -> int:
+        """
+        :return: Number of digests sent
+        """
+        sent = 0
+        with self.session_factory() as db:
+            repository = NotificationRepository(db)
+            # Notifications created during the run wait for the next one
+            until = repository.get_last_id()
+            after = 0
+            while True:
+                users = repository.get_digest_users(after, until, self.batch_size)
+                if not users:
+                    return sent
+                after = users[-1].id
+                notifications = {
+                    user_id: list(rows)
+                    for user_id, rows in groupby(
+                        repository.get_digest_notifications(
+                            [user.id for user in users], until
+                        ),
+                        key=lambda row: row.user_id,
+                    )
+                }
+                done, emails = [], []
+                for user in users:
+                    unread = notifications.get(user.id)
+                    if unread and user.is_active and user.is_verified:
+                        emails.append((user.id, self.digest(user, unread)))
+                    else:
+                        done.append(user.id)
+                if emails:
+                    results = self.send(
+                        [email for _, email in emails],
+                        DIGEST_TEMPLATE,
+                        self.concurrency,
+                    )
+                    for (user_id, _), ok in zip(emails, results):
+                        if ok:
+                            done.append(user_id)
+                            sent += 1
+                repository.mark_emailed(done, until)
+
+    def digest(self, user: Row, notifications: List[Row]) -> Tuple[str, EmailSchema]:
+        """
+        :param user: User the digest is for
+        :param notifications: The user's unread notifications, newest first
+        :return: Subject and recipients of the digest
+        """
+        shown = notifications[: self.max_items]
+        body = {
+            "username": user.username,
+            "count": len(notifications),
+            "more": len(notifications) - len(shown),
+            "notifications": [
+                {
+                    "kind": notification.kind,
+                    "actor_username": notification.actor_username,
+                    "post_title": notification.post_title,
+                    "comment_excerpt": notification.comment_excerpt,
+                    "link": settings.SITE_URL
+                    + settings.SITE_POST_PATH.format(slug=notification.post_slug),
+                }
+                for notification in shown
+            ],
+        }
+        subject = (
+            f"{settings.PROJECT_TITLE}: {len(notifications)} new replies and comments"
+        )
+        return subject, EmailSchema(emails=[user.email], body=body)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Emails users a digest of their unread notifications"
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        default=0,
+        help="Keep running, sending digests every this many seconds",
+    )
+    args = parser.parse_args()
+
+    job = DigestJob()
+    while True:
+        started = time.perf_counter()
+        count = job.run()
+        if count:
+            print(f"Sent {count} digests in {time.perf_counter() - started:.1f}s")
+        if args.watch <= 0:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Sequence
+
+from fastapi import Depends
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import sessionmaker
+
+from app.repositories.related_repository import RelatedRepository
+from app.utils.related import RelatedIndex
+from config.settings import settings
+from database.session import SessionLocal
+
+# Posts per query and per transaction
+CHUNK_SIZE = 1000
+# Overlap between incremental runs, covering clock differences between the
+# app servers and the database
+CLOCK_SKEW = timedelta(minutes=1)
+
+
+def chunked(items: Sequence[int], size: int = CHUNK_SIZE) -> Iterator[List[int]]:
+    for start in range(0, len(items), size):
+        yield list(items[start : start + size])
+
+
+class RelatedService:
+    def __init__(
+        self, related_repository: RelatedRepository = Depends(RelatedRepository)
+    ) -> None:
+        self.related_repository = related_repository
+
+    def get_related(self, post_id: int) -> List[Row]:
+        """
+        :param post_id: ID of the post
+        :return: The posts most similar to the post, best first
+        """
+        return self.related_repository.get_related(post_id, settings.RELATED_SIZE)
+
+
+class RelatedJob:
+    """
+    Computes the related posts of every published post, then keeps them up
+    to date as posts are created, changed and deleted.
+
+    An incremental run recomputes the changed posts, the posts they were
+    related to and the posts they are now similar enough to to be related
+    to. The vocabulary and document frequencies stay those of the last full
+    build.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        size: int = settings.RELATED_SIZE,
+        min_score: float = settings.RELATED_MIN_SCORE,
+        tag_weight: float = settings.RELATED_TAG_WEIGHT,
+        batch_size: int = settings.RELATED_BATCH_SIZE,
+    ):
+        """
+        :param session_factory: Session factory of the database to update
+        :param size: Number of related posts per post
+        :param min_score: Lowest similarity of a related post
+        :param tag_weight: Share of the similarity coming from tags
+        :param batch_size: Posts compared to all others per matrix product
+        """
+        self.session_factory = session_factory
+        self.size = size
+        self.min_score = min_score
+        self.batch_size = batch_size
+        self.index = RelatedIndex(tag_weight)
+        self.since: Optional[datetime] = None
+
+    def build(self) -> int:
+        """
+        :return: Number of posts whose related posts were written
+        """
+        start = datetime.utcnow()
+        with self.session_factory() as db:
+            repository = RelatedRepository(db)
+            post_tags = repository.get_post_tags()
+            self.index.fit(repository.iter_posts(), post_tags)
+            repository.delete_unpublished()
+            post_ids = list(self.index.rows)
+            self.write(repository, post_ids)
+        self.since = start - CLOCK_SKEW
+        return len(post_ids)
+
+    def refresh(self) -> int:
+        """
+        :return: Number of posts whose related posts were written
+
+        Applies the posts created, changed, unpublished or deleted since the
+        last run, building the index first if needed.
+        """
+        if self.since is None:
+            return self.build()
+        start = datetime.utcnow()
+        with self.session_factory() as db:
+            repository = RelatedRepository(db)
+            published = set(repository.get_published_ids())
+            removed = [
+                post_id for post_id in self.index.rows if post_id not in published
+            ]
+            changed = repository.get_changed_ids(self.since)
+            posts, post_tags = [], []
+            for chunk in chunked(changed):
+                posts.extend(repository.iter_posts(chunk))
+                post_tags.extend(repository.get_post_tags(chunk))
+
+            stale = set(self.index.referencing(changed + removed))
+            self.index.update(posts, post_tags, removed)
+            stale.update(changed)
+            stale.update(self.index.affected(changed, self.batch_size))
+            stale = sorted(post_id for post_id in stale if post_id in self.index.rows)
+            self.write(repository, stale)
+            if removed:
+                repository.delete_unpublished()
+        self.since = start - CLOCK_SKEW
+        return len(stale)
+
+    def write(self, repository: RelatedRepository, post_ids: List[int]):
+        for chunk in chunked(post_ids):
+            repository.replace(
+                self.index.neighbours(chunk, self.size, self.min_score, self.batch_size)
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Computes the related posts of every published post"
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        default=0,
+        help="Keep running, applying post changes every this many seconds",
+    )
+    parser.add_argument(
+        "--rebuild-hours",
+        type=float,
+        default=24,
+        help="Hours between full builds when watching",
+    )
+    args = parser.parse_args()
+
+    job = RelatedJob()
+    started = time.perf_counter()
+    count = job.build()
+    print(f"Built {count} posts in {time.perf_counter() - started:.1f}s")
+    built = time.monotonic()
+    while args.watch > 0:
+        time.sleep(args.watch)
+        started = time.perf_counter()
+        if time.monotonic() - built > args.rebuild_hours * 3600:
+            count = job.build()
+            built = time.monotonic()
+        else:
+            count = job.refresh()
+        if count:
+            print(f"Updated {count} posts in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from typing import Optional
+
+from fastapi import Depends, HTTPException, status
+
+from app.repositories import TagRepository, TimelineRepository, UserRepository
+from app.schemas import PostRead
+from app.utils import get_serializer
+from config.settings import settings
+from database.models import Tag
+
+
+class TimelineService:
+    def __init__(
+        self,
+        timeline_repository: TimelineRepository = Depends(TimelineRepository),
+        user_repository: UserRepository = Depends(UserRepository),
+        tag_repository: TagRepository = Depends(TagRepository),
+    ) -> None:
+        self.timeline_repository = timeline_repository
+        self.user_repository = user_repository
+        self.tag_repository = tag_repository
+
+    def get_timeline(self, user_id: int, cursor: Optional[int], limit: int) -> dict:
+        """
+        :param user_id: ID of the user
+        :param cursor: `next_cursor` of the previous page, None for the first
+        :param limit: Max number of posts to return
+        :return: A page of the user's timeline and the cursor of the next one
+        """
+        posts = self.timeline_repository.get_timeline(
+            user_id, cursor, limit, settings.TIMELINE_TAG_FANOUT_MAX_FOLLOWERS
+        )
+        return {
+            "posts": get_serializer(PostRead).many(posts),
+            "next_cursor": (
+                posts[-1].published_position if len(posts) == limit else None
+            ),
+        }
+
+    def follow_author(self, follower_id: int, author_id: int) -> dict:
+        """
+        :param follower_id: ID of the user following
+        :param author_id: ID of the author to follow
+
+        Follows an author, adding their latest posts to the timeline.
+        """
+        if follower_id == author_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="You can't follow yourself",
+            )
+        self.user_repository.get(author_id)
+        self.timeline_repository.follow_author(
+            follower_id, author_id, settings.TIMELINE_BACKFILL
+        )
+        return {"message": "Author followed"}
+
+    def unfollow_author(self, follower_id: int, author_id: int) -> dict:
+        """
+        :param follower_id: ID of the user following
+        :param author_id: ID of the author to unfollow
+
+        Unfollows an author, removing the posts the user no longer follows
+        from the timeline.
+        """
+        self.user_repository.get(author_id)
+        self.timeline_repository.unfollow_author(follower_id, author_id)
+        return {"message": "Author unfollowed"}
+
+    def follow_tag(self, follower_id: int, slug: str) -> dict:
+        """
+        :param follower_id: ID of the user following
+        :param slug: Slug of the tag to follow
+
+        Follows a tag, adding its latest posts to the timeline.
+        """
+        self.timeline_repository.follow_tag(
+            follower_id,
+            self.get_tag(slug).id,
+            settings.TIMELINE_BACKFILL,
+            settings.TIMELINE_TAG_FANOUT_MAX_FOLLOWERS,
+        )
+        return {"message": "Tag followed"}
+
+    def unfollow_tag(self, follower_id: int, slug: str) -> dict:
+        """
+        :param follower_id: ID of the user following
+        :param slug: Slug of the tag to unfollow
+
+        Unfollows a tag, removing the posts the user no longer follows from
+        the timeline.
+        """
+        self.timeline_repository.unfollow_tag(follower_id, self.get_tag(slug).id)
+        return {"message": "Tag unfollowed"}
+
+    def get_tag(self, slug: str) -> Tag:
+        tag = self.tag_repository.get_by_slug_or_none(slug)
+        if tag is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found"
+            )
+        return tag
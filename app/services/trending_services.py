@@ -0,0 +1,120 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import Depends
+from starlette.responses import Response
+
+from app.repositories.trending_repository import TrendingRepository
+from app.schemas import PostRead
+from app.utils import get_serializer
+from app.utils.trending import (
+    TrendingSnapshot,
+    activity_arrays,
+    score_posts,
+    trending_store,
+)
+from config.settings import settings
+from database.session import SessionLocal
+
+
+class TrendingService:
+    def __init__(
+        self,
+        trending_repository: TrendingRepository = Depends(TrendingRepository),
+    ) -> None:
+        self.trending_repository = trending_repository
+
+    def get_trending(self, skip: int = 0, limit: Optional[int] = None) -> Response:
+        """
+        :param skip: Number of items to skip
+        :param limit: Max number of items to return
+        :return: Response with the trending posts and their scores
+
+        Serves the snapshot computed by the trending job, without querying.
+        """
+        return trending_store.response(skip, limit)
+
+    def compute(self, now: Optional[datetime] = None) -> int:
+        """
+        :param now: Time the scores are computed for, the current time by default
+        :return: Number of trending posts written
+
+        Reads the view buckets and comments of the window in two queries,
+        scores every post with them at once and replaces the trending posts
+        with the best, then deletes the view buckets that left the window.
+        """
+        now = now or datetime.utcnow()
+        since = (now - timedelta(hours=settings.TRENDING_WINDOW_HOURS)).replace(
+            minute=0, second=0, microsecond=0
+        )
+        scores = score_posts(
+            [
+                # Views are counted in hourly buckets, dated at their middle
+                activity_arrays(
+                    self.trending_repository.get_view_buckets(since),
+                    settings.TRENDING_VIEW_WEIGHT,
+                    offset_hours=0.5,
+                ),
+                activity_arrays(
+                    self.trending_repository.get_comment_times(since),
+                    settings.TRENDING_COMMENT_WEIGHT,
+                ),
+            ],
+            now,
+            settings.TRENDING_HALF_LIFE_HOURS,
+            settings.TRENDING_SIZE,
+        )
+        self.trending_repository.replace_trending(scores, now)
+        self.trending_repository.prune_view_buckets(since)
+        return len(scores)
+
+    def load(self) -> TrendingSnapshot:
+        """
+        :return: Snapshot of the trending posts written by the last
+            computation, without those unpublished or deleted since
+        """
+        trending = self.trending_repository.get_trending()
+        posts = get_serializer(PostRead).many(
+            self.trending_repository.get_posts([row.post_id for row in trending])
+        )
+        scores = {row.post_id: row.score for row in trending}
+        for post in posts:
+            post["score"] = round(scores[post["id"]], 3)
+        computed_at = trending[0].computed_at if trending else datetime.utcnow()
+        return TrendingSnapshot(posts, computed_at)
+
+
+def load_trending() -> TrendingSnapshot:
+    """
+    :return: The current trending snapshot, loaded with its own session
+    """
+    with SessionLocal() as db:
+        return TrendingService(TrendingRepository(db)).load()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Computes the trending posts served by every worker"
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        default=0,
+        help="Keep running, computing the trending posts every this many seconds",
+    )
+    args = parser.parse_args()
+
+    while True:
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            count = TrendingService(TrendingRepository(db)).compute()
+        print(f"Scored {count} posts in {time.perf_counter() - started:.2f}s")
+        if args.watch <= 0:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
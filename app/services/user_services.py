@@ -1,10 +1,13 @@
 from typing import Optional
 
 from app.repositories import UserRepository
-from app.schemas.user_schemas import UserRead
+from app.schemas.user_schemas import ProfilePostRead, ProfileTagRead, UserRead
 from app.services import AuthServices
 from app.schemas import UserCreate
-from fastapi import BackgroundTasks, Depends, Request, status
+from app.utils import get_serializer
+from app.utils.profiles import profile_cache
+from config.settings import settings
+from fastapi import BackgroundTasks, Depends, HTTPException, Request, status
 
 
 class UserService:
@@ -50,6 +53,38 @@ class UserService:
         """
         return self.user_repositories.get_by_username(username)
 
+    def get_profile(self, username: str) -> dict:
+        """
+        :param username: Username of the author
+        :return: The author's public profile
+
+        Served from the profile cache, which writes to the author's posts and
+        the comments on them invalidate.
+        """
+        username = username.lower()
+        profile = profile_cache.get(username)
+        if profile is not None:
+            return profile
+
+        row = self.user_repositories.get_profile(username)
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
+        profile = dict(
+            row._mapping,
+            top_tags=get_serializer(ProfileTagRead).many(
+                self.user_repositories.get_top_tags(row.id, settings.PROFILE_TOP_TAGS)
+            ),
+            latest_posts=get_serializer(ProfilePostRead).many(
+                self.user_repositories.get_latest_posts(
+                    row.id, settings.PROFILE_LATEST_POSTS
+                )
+            ),
+        )
+        profile_cache.put(profile)
+        return profile
+
     def update_user(
         self,
         user_id: int,
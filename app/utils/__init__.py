@@ -1 +1,2 @@
 from .database_utils import sanitize_sqlalchemy_or_pydantic
+from .serializers import get_serializer, trusted_response
@@ -1,6 +1,6 @@
 from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
-from jose import jwt, JWTError
+from functools import lru_cache
+from jose import JWTError
 from datetime import datetime, timedelta
 
 from app.repositories import UserRepository, AuthRepository, auth_repository
@@ -8,24 +8,40 @@ from config.settings import settings
 from database.models.users import User
 
 
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """
+    :return: The CryptContext shared by every request
+
+    passlib and jose.jwt (which loads the cryptography backends) are imported
+    on first use to keep them out of worker boot time.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+@lru_cache(maxsize=None)
+def get_jwt():
+    from jose import jwt
+
+    return jwt
+
+
 class AuthUtils:
     def __init__(
         self,
         user_repository: UserRepository = Depends(UserRepository),
         auth_repository: AuthRepository = Depends(AuthRepository),
     ):
-        self.pwd_context = CryptContext(
-            schemes=["bcrypt"],
-            deprecated="auto",
-        )
         self.user_repository = user_repository
         self.auth_repository = auth_repository
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
 
     def get_password_hash(self, plain_password: str) -> str:
-        return self.pwd_context.hash(plain_password)
+        return get_pwd_context().hash(plain_password)
 
     def get_access_token(self, user: User) -> str:
         payload = {
@@ -36,7 +52,9 @@ class AuthUtils:
             "scope": "access",
         }
 
-        return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return get_jwt().encode(
+            payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        )
 
     def get_refresh_token(self, user: User) -> str:
         payload = {
@@ -47,11 +65,13 @@ class AuthUtils:
             "scope": "refresh",
         }
 
-        return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return get_jwt().encode(
+            payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        )
 
     def verify_access_token(self, token: str) -> User:
         try:
-            payload = jwt.decode(
+            payload = get_jwt().decode(
                 token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
             )
             if payload["scope"] != "access":
@@ -75,7 +95,7 @@ class AuthUtils:
             if self.auth_repository.get_used_token(token) is not None:
                 raise HTTPException(status_code=400, detail="Token already used")
 
-            payload = jwt.decode(
+            payload = get_jwt().decode(
                 token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
             )
             if payload["scope"] != "refresh":
@@ -101,7 +121,9 @@ class AuthUtils:
             "scope": "email_verification",
         }
 
-        return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return get_jwt().encode(
+            payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        )
 
     def encode_reset_password_token(self, user_id) -> str:
         payload = {
@@ -112,13 +134,15 @@ class AuthUtils:
             "scope": "reset_password",
         }
 
-        return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        return get_jwt().encode(
+            payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+        )
 
     def verify_email(self, token: str) -> User:
         try:
             if self.auth_repository.get_used_token(token) is not None:
                 raise HTTPException(status_code=400, detail="Token already used")
-            payload = jwt.decode(
+            payload = get_jwt().decode(
                 token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
             )
             if payload["scope"] != "email_verification":
@@ -139,7 +163,7 @@ class AuthUtils:
         try:
             if self.auth_repository.get_used_token(token) is not None:
                 raise HTTPException(status_code=400, detail="Token already used")
-            payload = jwt.decode(
+            payload = get_jwt().decode(
                 token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
             )
             if payload["scope"] != "reset_password":
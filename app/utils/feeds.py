@@ -0,0 +1,422 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from sqlalchemy.engine import Row
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+from app.middlewares.compression import (
+    compress,
+    negotiate_encoding,
+    supported_encodings,
+)
+from config.settings import settings
+
+FEED_FORMATS = {"rss": "application/rss+xml", "atom": "application/atom+xml"}
+FEED_FILES = {"rss": "feed.xml", "atom": "atom.xml"}
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+# Rows of FeedRepository.get_posts, a post and its tags
+FeedRows = List[Tuple[Row, List[Row]]]
+
+
+def utc(value: datetime) -> datetime:
+    # Timestamps are stored naive, in UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def w3c_datetime(value: datetime) -> str:
+    return utc(value).isoformat(timespec="seconds")
+
+
+class FeedEntry:
+    """
+    A post rendered once as an RSS item and as an Atom entry
+    """
+
+    __slots__ = ("post_id", "sort_key", "tag_slugs", "updated_at", "rss", "atom")
+
+    def __init__(self, row: Row, tags: List[Row], link: str):
+        title = escape(row.title or "")
+        summary = escape(row.excerpt or row.content or "")
+        author = escape(row.username)
+        published = utc(row.created_at)
+        self.post_id = row.id
+        self.sort_key = (row.created_at, row.id)
+        self.tag_slugs = {tag.slug for tag in tags}
+        self.updated_at = utc(row.updated_at or row.created_at)
+        self.rss = (
+            f"<item><title>{title}</title><link>{escape(link)}</link>"
+            f'<guid isPermaLink="true">{escape(link)}</guid>'
+            f"<pubDate>{format_datetime(published)}</pubDate>"
+            f"<dc:creator>{author}</dc:creator>"
+            + "".join(f"<category>{escape(tag.title)}</category>" for tag in tags)
+            + f"<description>{summary}</description></item>"
+        )
+        self.atom = (
+            f"<entry><title>{title}</title><link href={quoteattr(link)}/>"
+            f"<id>{escape(link)}</id>"
+            f"<published>{w3c_datetime(published)}</published>"
+            f"<updated>{w3c_datetime(self.updated_at)}</updated>"
+            f"<author><name>{author}</name></author>"
+            + "".join(
+                f"<category term={quoteattr(tag.slug)} label={quoteattr(tag.title)}/>"
+                for tag in tags
+            )
+            + f"<summary>{summary}</summary></entry>"
+        )
+
+
+class Artifact:
+    """
+    A rendered document with its ETag and compressed variants
+    """
+
+    __slots__ = ("media_type", "body", "etag", "variants")
+
+    def __init__(self, media_type: str, body: bytes, variants: Dict[str, bytes]):
+        self.media_type = media_type
+        self.body = body
+        self.etag = f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        self.variants = variants
+
+
+class Feed:
+    """
+    The newest published posts of the site or of a tag, newest first
+    """
+
+    __slots__ = (
+        "title",
+        "link",
+        "path",
+        "entries",
+        "truncated",
+        "expires",
+        "artifacts",
+    )
+
+    def __init__(
+        self,
+        title: str,
+        link: str,
+        path: str,
+        entries: List[FeedEntry],
+        truncated: bool,
+        expires: float,
+    ):
+        self.title = title
+        self.link = link
+        self.path = path
+        self.entries = entries
+        # Whether older posts exist than the ones held
+        self.truncated = truncated
+        self.expires = expires
+        self.artifacts: Dict[str, Artifact] = {}
+
+    def apply(self, post_id: int, entry: Optional[FeedEntry], size: int) -> bool:
+        """
+        :param post_id: ID of the saved or deleted post
+        :param entry: The post's new entry, None if it isn't in this feed anymore
+        :param size: Max number of entries
+        :return: False when the feed can't be updated and must be rebuilt
+
+        Removes the post's old entry and inserts the new one in order.
+        """
+        before = len(self.entries)
+        self.entries = [item for item in self.entries if item.post_id != post_id]
+        removed = len(self.entries) < before
+        if entry is not None and (
+            not self.truncated
+            or (self.entries and entry.sort_key >= self.entries[-1].sort_key)
+        ):
+            index = 0
+            while (
+                index < len(self.entries)
+                and self.entries[index].sort_key > entry.sort_key
+            ):
+                index += 1
+            self.entries.insert(index, entry)
+            if len(self.entries) > size:
+                self.entries.pop()
+                self.truncated = True
+        elif not removed:
+            return True
+        elif self.truncated and len(self.entries) < size:
+            # The next older post isn't held
+            return False
+        self.artifacts.clear()
+        return True
+
+
+class FeedStore:
+    """
+    Feeds of the newest published posts, kept in memory and updated in place
+    when a post is saved or deleted, so serving them never reads the posts
+    table. Each rendered document is kept with its compressed variants until
+    the feed changes.
+
+    Updates only reach the worker that made the change, other workers rebuild
+    their feeds once `ttl` expires.
+    """
+
+    def __init__(
+        self,
+        site_url: str,
+        post_path: str = "/blogs/posts/{slug}",
+        tag_path: str = "/blogs/tags/{slug}",
+        size: int = 50,
+        ttl: float = 300,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+    ):
+        """
+        :param site_url: Absolute URL of the site, without trailing slash
+        :param post_path: Path of a post's page, formatted with its slug
+        :param tag_path: Path of a tag's page, formatted with its slug
+        :param size: Number of posts in a feed
+        :param ttl: Seconds before a feed is rebuilt from the database
+        :param gzip_level: gzip compression level, 1 to 9
+        :param brotli_quality: Brotli quality, 0 to 11
+        """
+        self.site_url = site_url.rstrip("/")
+        self.post_path = post_path
+        self.tag_path = tag_path
+        self.size = size
+        self.ttl = ttl
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        # Keyed by tag slug, None for the feed of the whole site
+        self.feeds: Dict[Optional[str], Feed] = {}
+        self.generation = 0
+        self.builds = 0
+        self.updates = 0
+        self._lock = threading.Lock()
+
+    def post_url(self, slug: str) -> str:
+        return self.site_url + self.post_path.format(slug=slug)
+
+    def tag_url(self, slug: str) -> str:
+        return self.site_url + self.tag_path.format(slug=slug)
+
+    def entry(self, row: Row, tags: List[Row]) -> FeedEntry:
+        return FeedEntry(row, tags, self.post_url(row.slug))
+
+    def get(
+        self,
+        tag_slug: Optional[str],
+        load: Callable[[int], Optional[Tuple[str, FeedRows]]],
+    ) -> Optional[Feed]:
+        """
+        :param tag_slug: Slug of the tag, None for the whole site
+        :param load: Called with the feed size on a miss, returns the feed's
+            title and posts, or None if the tag doesn't exist
+        :return: The feed, or None if the tag doesn't exist
+        """
+        feed = self.feeds.get(tag_slug)
+        if feed is not None and feed.expires > time.monotonic():
+            return feed
+
+        generation = self.generation
+        loaded = load(self.size)
+        if loaded is None:
+            return None
+        title, rows = loaded
+        feed = Feed(
+            title=title,
+            link=self.site_url if tag_slug is None else self.tag_url(tag_slug),
+            path="" if tag_slug is None else f"/tags/{tag_slug}",
+            entries=[self.entry(row, tags) for row, tags in rows],
+            truncated=len(rows) >= self.size,
+            expires=time.monotonic() + self.ttl,
+        )
+        with self._lock:
+            self.builds += 1
+            # A post saved while loading may be missing, build again next time
+            if generation == self.generation:
+                self.feeds[tag_slug] = feed
+        return feed
+
+    def post_changed(self, post_id: int, load: Callable[[], FeedRows] = list):
+        """
+        :param post_id: ID of the post created, updated or deleted
+        :param load: Returns the post and its tags if it is published, only
+            called when feeds are held
+
+        Updates every feed held that contains or should contain the post.
+        """
+        with self._lock:
+            self.generation += 1
+            if not self.feeds:
+                return
+        rows = load()
+        entry = self.entry(*rows[0]) if rows else None
+        with self._lock:
+            self.generation += 1
+            self.updates += 1
+            for tag_slug, feed in list(self.feeds.items()):
+                listed = entry is not None and (
+                    tag_slug is None or tag_slug in entry.tag_slugs
+                )
+                if not feed.apply(post_id, entry if listed else None, self.size):
+                    del self.feeds[tag_slug]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.feeds.clear()
+
+    def artifact(self, feed: Feed, format: str) -> Artifact:
+        """
+        :param feed: Feed to render
+        :param format: "rss" or "atom"
+        :return: The rendered feed, compressed with every supported encoding
+        """
+        artifact = feed.artifacts.get(format)
+        if artifact is not None:
+            return artifact
+        # Updates replace the list rather than change it
+        entries = feed.entries
+        body = self.render(feed, entries, format).encode()
+        artifact = Artifact(
+            FEED_FORMATS[format],
+            body,
+            {
+                encoding: compress(body, encoding, self.gzip_level, self.brotli_quality)
+                for encoding in supported_encodings()
+            },
+        )
+        with self._lock:
+            # Unless the feed changed while rendering
+            if feed.entries is entries:
+                feed.artifacts[format] = artifact
+        return artifact
+
+    def render(self, feed: Feed, entries: List[FeedEntry], format: str) -> str:
+        updated = max(
+            (entry.updated_at for entry in entries),
+            default=datetime.now(timezone.utc),
+        )
+        title = escape(feed.title)
+        self_link = quoteattr(f"{self.site_url}{feed.path}/{FEED_FILES[format]}")
+        if format == "atom":
+            return (
+                XML_DECLARATION
+                + '<feed xmlns="http://www.w3.org/2005/Atom">'
+                + f"<title>{title}</title><id>{escape(feed.link)}</id>"
+                + f"<link href={quoteattr(feed.link)}/>"
+                + f'<link href={self_link} rel="self"/>'
+                + f"<updated>{w3c_datetime(updated)}</updated>"
+                + "".join(entry.atom for entry in entries)
+                + "</feed>"
+            )
+        return (
+            XML_DECLARATION
+            + '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"'
+            + ' xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>'
+            + f"<title>{title}</title><link>{escape(feed.link)}</link>"
+            + f"<description>{title}</description>"
+            + f'<atom:link href={self_link} rel="self" type="{FEED_FORMATS[format]}"/>'
+            + f"<lastBuildDate>{format_datetime(updated)}</lastBuildDate>"
+            + "".join(entry.rss for entry in entries)
+            + "</channel></rss>"
+        )
+
+    def stats(self) -> dict:
+        """
+        :return: Number and size of the feeds held, and how often they changed
+        """
+        artifacts = [
+            artifact
+            for feed in list(self.feeds.values())
+            for artifact in list(feed.artifacts.values())
+        ]
+        return {
+            "held": len(self.feeds),
+            "bytes": {
+                "raw": sum(len(artifact.body) for artifact in artifacts),
+                "compressed": sum(
+                    len(body)
+                    for artifact in artifacts
+                    for body in artifact.variants.values()
+                ),
+            },
+            "builds": self.builds,
+            "updates": self.updates,
+        }
+
+
+def artifact_response(artifact: Artifact, headers: Headers, max_age: int) -> Response:
+    """
+    :param artifact: Rendered document
+    :param headers: Request headers
+    :param max_age: Seconds clients and proxies may cache the document
+    :return: 304 if the client has this version, else the document in the
+        encoding the client prefers
+    """
+    response_headers = {
+        "ETag": artifact.etag,
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "Accept-Encoding",
+    }
+    if artifact.etag in headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=response_headers)
+    body = artifact.body
+    encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+    if encoding in artifact.variants:
+        body = artifact.variants[encoding]
+        response_headers["Content-Encoding"] = encoding
+    return Response(body, media_type=artifact.media_type, headers=response_headers)
+
+
+def sitemap_index(locations: Iterable[str]) -> str:
+    """
+    :param locations: Absolute URLs of the sitemaps
+    :return: Sitemap index document
+    """
+    return (
+        XML_DECLARATION
+        + f'<sitemapindex xmlns="{SITEMAP_NAMESPACE}">'
+        + "".join(f"<sitemap><loc>{escape(url)}</loc></sitemap>" for url in locations)
+        + "</sitemapindex>"
+    )
+
+
+def sitemap_urlset(
+    rows: Iterable[Row], url_for: Callable[[str], str], batch: int = 500
+) -> Iterator[bytes]:
+    """
+    :param rows: Rows with a slug and an updated_at
+    :param url_for: Returns the absolute URL of a slug
+    :param batch: Number of URLs per chunk
+    :return: Chunks of the sitemap document, as the rows are read
+    """
+    yield f'{XML_DECLARATION}<urlset xmlns="{SITEMAP_NAMESPACE}">'.encode()
+    chunk = []
+    for row in rows:
+        chunk.append(
+            f"<url><loc>{escape(url_for(row.slug))}</loc>"
+            f"<lastmod>{w3c_datetime(row.updated_at)}</lastmod></url>"
+        )
+        if len(chunk) >= batch:
+            yield "".join(chunk).encode()
+            chunk = []
+    chunk.append("</urlset>")
+    yield "".join(chunk).encode()
+
+
+feed_store = FeedStore(
+    site_url=settings.SITE_URL,
+    post_path=settings.SITE_POST_PATH,
+    tag_path=settings.SITE_TAG_PATH,
+    size=settings.FEED_SIZE,
+    ttl=settings.FEED_TTL,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
@@ -0,0 +1,365 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from io import BytesIO
+from typing import BinaryIO, Callable, Iterator, List, Optional, Sequence, Set
+
+from PIL import Image as PILImage
+from PIL import ImageOps
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+from config.settings import settings
+from database.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "gif": "image/gif",
+}
+# Derivatives are written in each of these, best compression first
+DERIVATIVE_FORMATS = ("webp", "jpeg")
+EXIF_ORIENTATION = 0x0112
+CHUNK_SIZE = 64 * 1024
+
+
+def original_key(hash: str, format: str) -> str:
+    return f"{hash}/original.{format}"
+
+
+def derivative_key(hash: str, width: int, format: str) -> str:
+    return f"{hash}/{width}.{format}"
+
+
+def derivative_widths(width: int, widths: Sequence[int]) -> List[int]:
+    """
+    :param width: Width of the original
+    :param widths: Configured derivative widths
+    :return: Widths of the image's derivatives, never wider than the original
+    """
+    return sorted({min(target, width) for target in widths})
+
+
+class ImageStorage(ABC):
+    """
+    Originals and derivatives by key. The pool's processes write with a
+    pickled copy, so implementations hold settings rather than connections.
+    """
+
+    @abstractmethod
+    def put(self, key: str, data: bytes):
+        ...
+
+    @abstractmethod
+    def move(self, key: str, path: str):
+        """
+        :param key: Key to store the file at
+        :param path: Local file, removed once stored
+        """
+        ...
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    def response(self, key: str, media_type: str, headers: dict) -> Response:
+        def chunks() -> Iterator[bytes]:
+            with self.open(key) as file:
+                for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                    yield chunk
+
+        return StreamingResponse(chunks(), media_type=media_type, headers=headers)
+
+
+class FileSystemStorage(ImageStorage):
+    def __init__(self, root: str):
+        """
+        :param root: Directory the keys are paths in
+        """
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key: str, data: bytes):
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Written aside and renamed, so a half-written file is never served
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def move(self, key: str, path: str):
+        destination = self.path(key)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            os.replace(path, destination)
+        except OSError:
+            # On another filesystem, copied aside and renamed as in put()
+            fd, temp_path = tempfile.mkstemp(
+                dir=os.path.dirname(destination), prefix="."
+            )
+            try:
+                with os.fdopen(fd, "wb") as file, open(path, "rb") as source:
+                    shutil.copyfileobj(source, file, CHUNK_SIZE)
+                os.replace(temp_path, destination)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            os.unlink(path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def response(self, key: str, media_type: str, headers: dict) -> Response:
+        return FileResponse(self.path(key), media_type=media_type, headers=headers)
+
+
+@dataclass
+class ImageInfo:
+    format: str
+    width: int
+    height: int
+
+
+def probe(path: str) -> Optional[ImageInfo]:
+    """
+    :param path: Uploaded file
+    :return: Format and displayed size of the image, None if it isn't one in
+        MEDIA_TYPES
+
+    Only reads the headers, the pixels are decoded by render_derivatives().
+    """
+    try:
+        with PILImage.open(path) as image:
+            format = (image.format or "").lower()
+            width, height = image.size
+            orientation = image.getexif().get(EXIF_ORIENTATION)
+    except (OSError, PILImage.DecompressionBombError):
+        return None
+    if format not in MEDIA_TYPES:
+        return None
+    # Orientations 5 to 8 are rotated a quarter turn
+    if orientation in (5, 6, 7, 8):
+        width, height = height, width
+    return ImageInfo(format, width, height)
+
+
+def render_derivatives(
+    storage: ImageStorage, hash: str, format: str, widths: Sequence[int], quality: int
+) -> int:
+    """
+    :param storage: Storage of the original and the derivatives
+    :param hash: Hash of the original
+    :param format: Format of the original
+    :param widths: Configured derivative widths
+    :param quality: WebP and JPEG quality
+    :return: Number of derivatives written
+
+    Runs in the pool's processes. The derivatives are upright, keep the
+    original's color profile and drop its other metadata.
+    """
+    with storage.open(original_key(hash, format)) as file:
+        with PILImage.open(file) as original:
+            icc_profile = original.info.get("icc_profile")
+            original_width = original.width
+            if original.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8):
+                original_width = original.height
+            # JPEGs are decoded straight at a fraction of their size when the
+            # largest derivative allows it
+            scale = min(1.0, max(widths) / original_width)
+            original.draft(
+                "RGB", (round(original.width * scale), round(original.height * scale))
+            )
+            image = ImageOps.exif_transpose(original)
+            image.load()
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    written = 0
+    for width in derivative_widths(original_width, widths):
+        resized = image
+        if width != image.width:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), PILImage.LANCZOS)
+        for derivative_format in DERIVATIVE_FORMATS:
+            output = resized
+            if derivative_format == "jpeg" and has_alpha:
+                output = PILImage.new("RGB", resized.size, (255, 255, 255))
+                output.paste(resized, mask=resized.getchannel("A"))
+            buffer = BytesIO()
+            output.save(
+                buffer,
+                derivative_format.upper(),
+                quality=quality,
+                optimize=True,
+                progressive=True,
+                icc_profile=icc_profile,
+            )
+            storage.put(
+                derivative_key(hash, width, derivative_format), buffer.getvalue()
+            )
+            written += 1
+    return written
+
+
+class ImagePipeline:
+    """
+    Renders the derivatives of uploaded images in a pool of processes, so
+    resizing neither holds the request threads' GIL nor delays the upload's
+    response. Until start() is called, images are rendered during the upload.
+
+    Images whose rendering failed, or was lost with the process, stay
+    unprocessed and are rendered again when uploaded again.
+    """
+
+    def __init__(
+        self,
+        storage: ImageStorage,
+        widths: Sequence[int],
+        quality: int = 80,
+        workers: int = 2,
+        session_factory: sessionmaker = SessionLocal,
+    ):
+        """
+        :param storage: Storage of the originals and the derivatives
+        :param widths: Derivative widths
+        :param quality: WebP and JPEG quality
+        :param workers: Processes of the pool
+        :param session_factory: Session factory of the callbacks run once an
+            image is rendered in the pool
+        """
+        self.storage = storage
+        self.widths = list(widths)
+        self.quality = quality
+        self.workers = workers
+        self.session_factory = session_factory
+        self.images = 0
+        self.derivatives = 0
+        self.failures = 0
+        self.last_render_ms = 0.0
+        self._rendering: Set[str] = set()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def submit(
+        self, hash: str, format: str, done: Callable[[Session], None], db: Session
+    ):
+        """
+        :param hash: Hash of the original
+        :param format: Format of the original
+        :param done: Marks the image as processed with the given session
+        :param db: Session to call `done` with when there is no pool
+        """
+        args = (self.storage, hash, format, self.widths, self.quality)
+        started = time.perf_counter()
+        if self._pool is None:
+            try:
+                written = render_derivatives(*args)
+            except Exception:
+                with self._lock:
+                    self.failures += 1
+                logger.exception("Could not render image derivatives")
+                return
+            done(db)
+            self._count(written, started)
+            return
+        with self._lock:
+            # Uploaded again while in the pool
+            if hash in self._rendering:
+                return
+            self._rendering.add(hash)
+        future = self._pool.submit(render_derivatives, *args)
+        future.add_done_callback(partial(self._done, hash, done, started))
+
+    def _done(
+        self,
+        hash: str,
+        done: Callable[[Session], None],
+        started: float,
+        future: Future,
+    ):
+        with self._lock:
+            self._rendering.discard(hash)
+        try:
+            written = future.result()
+            with self.session_factory() as db:
+                done(db)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            logger.exception("Could not render image derivatives")
+            return
+        self._count(written, started)
+
+    def _count(self, written: int, started: float):
+        with self._lock:
+            self.images += 1
+            self.derivatives += written
+            self.last_render_ms = (time.perf_counter() - started) * 1000
+
+    def start(self):
+        """
+        Starts the pool, call it in each worker process
+        """
+        if self._pool is None:
+            # Spawned rather than forked, the worker has threads running
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def stop(self):
+        """
+        Renders the submitted images and stops the pool
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        """
+        :return: Images rendered, pending and failed, and derivatives written
+        """
+        return {
+            "images": {
+                "done": self.images,
+                "pending": len(self._rendering),
+                "failed": self.failures,
+            },
+            "derivatives": self.derivatives,
+            "last_render_ms": self.last_render_ms,
+        }
+
+
+image_storage = FileSystemStorage(settings.IMAGE_STORAGE_DIR)
+image_pipeline = ImagePipeline(
+    image_storage,
+    settings.IMAGE_WIDTHS,
+    quality=settings.IMAGE_QUALITY,
+    workers=settings.IMAGE_WORKERS,
+)
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config.settings import settings
+
+
+class ProfileCache:
+    """
+    Author profiles by username, kept for `ttl` seconds or until the author's
+    posts, their comments or the author change. Invalidation only reaches
+    the worker handling the write, the TTL bounds staleness in the others.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 10000):
+        """
+        :param ttl: Seconds a profile is served for
+        :param max_entries: Number of profiles kept, least recently used first
+            out
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.usernames: Dict[int, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[dict]:
+        with self._lock:
+            entry = self.entries.get(username)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, profile: dict):
+        """
+        :param profile: Profile with the author's id and username
+        """
+        with self._lock:
+            self.entries[profile["username"]] = (
+                time.monotonic() + self.ttl,
+                profile,
+            )
+            self.entries.move_to_end(profile["username"])
+            self.usernames[profile["id"]] = profile["username"]
+            while len(self.entries) > self.max_entries:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.usernames.pop(evicted["id"], None)
+
+    def invalidate(self, author_id: int):
+        """
+        :param author_id: ID of the author whose profile changed
+        """
+        with self._lock:
+            username = self.usernames.pop(author_id, None)
+            if username is not None:
+                self.entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.usernames.clear()
+
+    def stats(self) -> dict:
+        """
+        :return: Profiles held, hits and misses
+        """
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+profile_cache = ProfileCache(
+    ttl=settings.PROFILE_CACHE_TTL, max_entries=settings.PROFILE_CACHE_MAX_ENTRIES
+)
@@ -0,0 +1,340 @@
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+TOKEN = re.compile(r"[a-z0-9]{2,}")
+STOP_WORDS = frozenset(
+    "about after all also an and any are as at be been but by can could do for "
+    "from had has have how if in into is it its just more most no not of on "
+    "one or other our out over so some such than that the their them then "
+    "there these they this to up was we were what when which who will with "
+    "would you your".split()
+)
+
+# Post ID, title, excerpt and content
+PostText = Tuple[int, Optional[str], Optional[str], Optional[str]]
+# Post ID and tag ID
+PostTag = Tuple[int, int]
+# Related post IDs and their scores, best first
+Neighbours = List[Tuple[int, float]]
+
+
+def tokenize(post: PostText) -> List[str]:
+    """
+    :param post: Post ID and text
+    :return: Terms of the post, its title counted twice
+    """
+    _, title, excerpt, content = post
+    terms = []
+    for text, repeat in ((title, 2), (excerpt, 1), (content, 1)):
+        if text:
+            tokens = [
+                token
+                for token in TOKEN.findall(text.lower())
+                if token not in STOP_WORDS
+            ]
+            terms.extend(tokens * repeat)
+    return terms
+
+
+def normalize(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """
+    :return: The matrix with rows scaled to unit length, empty rows left empty
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+class RelatedIndex:
+    """
+    Posts as sparse vectors: the TF-IDF weights of their terms next to their
+    tags spread over co-occurring tags. Rows have unit length, so the product
+    of two rows is the cosine similarity of the posts.
+
+    Posts are updated in place, scored with the vocabulary and document
+    frequencies of the last fit, until the next fit.
+    """
+
+    def __init__(
+        self,
+        tag_weight: float = 0.3,
+        max_df: float = 0.5,
+        min_tag_similarity: float = 0.2,
+    ):
+        """
+        :param tag_weight: Share of the similarity coming from tags, the rest
+            comes from the text
+        :param max_df: Terms in a larger share of the posts are ignored
+        :param min_tag_similarity: Tags co-occurring less are not spread to
+            each other
+        """
+        self.tag_weight = tag_weight
+        self.max_df = max_df
+        self.min_tag_similarity = min_tag_similarity
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.zeros(0)
+        self.tag_columns: Dict[int, int] = {}
+        self.tag_similarity = sparse.csr_matrix((0, 0))
+        self.post_ids = np.zeros(0, dtype=np.int64)
+        self.rows: Dict[int, int] = {}
+        self.matrix = sparse.csr_matrix((0, 0))
+        # Rows of each row's neighbours, -1 past the last one
+        self.related = np.full((0, 0), -1, dtype=np.int64)
+        # Score a post must beat to enter each row's neighbours
+        self.thresholds = np.zeros(0)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def fit(self, posts: Iterable[PostText], post_tags: Iterable[PostTag]):
+        """
+        :param posts: Text of every post
+        :param post_tags: Tags of every post
+
+        Builds the vocabulary, document frequencies and tag co-occurrences
+        from the posts, and vectorizes them.
+        """
+        vocabulary: Dict[str, int] = {}
+        post_ids = array("q")
+        indptr = array("q", [0])
+        indices = array("q")
+        counts = array("d")
+        for post in posts:
+            terms = np.fromiter(
+                (
+                    vocabulary.setdefault(term, len(vocabulary))
+                    for term in tokenize(post)
+                ),
+                dtype=np.int64,
+            )
+            columns, frequencies = np.unique(terms, return_counts=True)
+            post_ids.append(post[0])
+            indices.extend(columns.tolist())
+            counts.extend(frequencies.tolist())
+            indptr.append(len(indices))
+
+        documents = len(post_ids)
+        indices = np.array(indices, dtype=np.int64)
+        frequencies = np.bincount(indices, minlength=len(vocabulary))
+        self.vocabulary = vocabulary
+        self.idf = np.log((1 + documents) / (1 + frequencies)) + 1
+        # Terms most posts have tell little about a post but make every pair
+        # of posts similar, which densifies the products of neighbours()
+        self.idf[frequencies > self.max_df * documents] = 0
+        self.post_ids = np.array(post_ids, dtype=np.int64)
+        self.rows = {post_id: row for row, post_id in enumerate(self.post_ids)}
+        text = sparse.csr_matrix(
+            (
+                1 + np.log(np.array(counts, dtype=np.float64)),
+                indices,
+                np.array(indptr, dtype=np.int64),
+            ),
+            shape=(documents, len(vocabulary)),
+        )
+
+        post_tags = [(post_id, tag_id) for post_id, tag_id in post_tags]
+        self.tag_columns = {}
+        for _, tag_id in post_tags:
+            self.tag_columns.setdefault(tag_id, len(self.tag_columns))
+        tags = self.tag_matrix(post_tags, self.rows)
+        # Cosine similarity of tags by the posts they share
+        cooccurrence = (tags.T @ tags).tocsr()
+        scale = sparse.diags(1 / np.sqrt(np.maximum(cooccurrence.diagonal(), 1)))
+        similarity = (scale @ cooccurrence @ scale).tocsr()
+        similarity.data[similarity.data < self.min_tag_similarity] = 0
+        similarity.eliminate_zeros()
+        self.tag_similarity = similarity
+
+        self.matrix = self.combine(text, tags)
+        self.related = np.full((documents, 0), -1, dtype=np.int64)
+        self.thresholds = np.zeros(documents)
+
+    def tag_matrix(
+        self, post_tags: Iterable[PostTag], rows: Dict[int, int]
+    ) -> sparse.csr_matrix:
+        """
+        :return: Matrix of the posts in `rows` by the tags they have
+        """
+        pairs = [
+            (rows[post_id], self.tag_columns[tag_id])
+            for post_id, tag_id in post_tags
+            if post_id in rows and tag_id in self.tag_columns
+        ]
+        row_indices = [row for row, _ in pairs]
+        column_indices = [column for _, column in pairs]
+        return sparse.csr_matrix(
+            (np.ones(len(pairs)), (row_indices, column_indices)),
+            shape=(len(rows), len(self.tag_columns)),
+        )
+
+    def combine(
+        self, text: sparse.csr_matrix, tags: sparse.csr_matrix
+    ) -> sparse.csr_matrix:
+        """
+        :param text: Term counts of the posts
+        :param tags: Tags of the posts
+        :return: Unit length rows of weighted text and co-occurring tags
+        """
+        text = text.multiply(self.idf).tocsr()
+        text.eliminate_zeros()
+        text = normalize(text)
+        tags = normalize((tags @ self.tag_similarity).tocsr())
+        return sparse.hstack(
+            [text * np.sqrt(1 - self.tag_weight), tags * np.sqrt(self.tag_weight)],
+            format="csr",
+        )
+
+    def vectorize(
+        self, posts: List[PostText], post_tags: Iterable[PostTag]
+    ) -> sparse.csr_matrix:
+        """
+        :return: Rows of the posts, ignoring terms and tags unknown to the fit
+        """
+        rows = {post[0]: row for row, post in enumerate(posts)}
+        entries = {}
+        for row, post in enumerate(posts):
+            for term in tokenize(post):
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    entries[row, column] = entries.get((row, column), 0) + 1
+        text = sparse.csr_matrix(
+            (
+                1 + np.log(np.fromiter(entries.values(), dtype=np.float64)),
+                (
+                    [row for row, _ in entries],
+                    [column for _, column in entries],
+                ),
+            ),
+            shape=(len(posts), len(self.vocabulary)),
+        )
+        return self.combine(text, self.tag_matrix(post_tags, rows))
+
+    def update(
+        self,
+        posts: List[PostText],
+        post_tags: Iterable[PostTag],
+        removed: Iterable[int] = (),
+    ):
+        """
+        :param posts: Text of the posts created or changed
+        :param post_tags: Tags of these posts
+        :param removed: IDs of the posts deleted or unpublished
+
+        Replaces the rows of changed posts, appends new posts and empties the
+        rows of removed ones, keeping every other row in place.
+        """
+        vectors = self.vectorize(posts, post_tags)
+        replaced = [
+            (index, self.rows[post[0]])
+            for index, post in enumerate(posts)
+            if post[0] in self.rows
+        ]
+        appended = [
+            index for index, post in enumerate(posts) if post[0] not in self.rows
+        ]
+        emptied = [
+            self.rows.pop(post_id) for post_id in removed if post_id in self.rows
+        ]
+
+        size = self.matrix.shape[0]
+        keep = np.ones(size)
+        keep[[row for _, row in replaced] + emptied] = 0
+        placement = sparse.csr_matrix(
+            (
+                np.ones(len(replaced)),
+                ([row for _, row in replaced], [index for index, _ in replaced]),
+            ),
+            shape=(size, len(posts)),
+        )
+        matrix = sparse.diags(keep) @ self.matrix + placement @ vectors
+        self.matrix = sparse.vstack([matrix, vectors[appended]], format="csr")
+        for offset, index in enumerate(appended):
+            self.rows[posts[index][0]] = size + offset
+        self.post_ids = np.concatenate(
+            [self.post_ids, [posts[index][0] for index in appended]]
+        ).astype(np.int64)
+        self.related = np.vstack(
+            [self.related, np.full((len(appended), self.related.shape[1]), -1)]
+        )
+        self.related[emptied] = -1
+        self.thresholds = np.concatenate([self.thresholds, np.zeros(len(appended))])
+        self.thresholds[emptied] = np.inf
+
+    def neighbours(
+        self,
+        post_ids: Iterable[int],
+        size: int,
+        min_score: float = 0.0,
+        batch_size: int = 256,
+    ) -> Dict[int, Neighbours]:
+        """
+        :param post_ids: Posts to find the neighbours of
+        :param size: Number of neighbours per post
+        :param min_score: Lowest similarity of a neighbour
+        :param batch_size: Posts compared to all others per matrix product
+        :return: The most similar posts of each post, best first
+
+        Also records the neighbours and the score a post must beat to enter
+        them, see referencing() and affected().
+        """
+        if self.related.shape[1] != size:
+            self.related = np.full((len(self.post_ids), size), -1, dtype=np.int64)
+        rows = np.array(
+            [self.rows[post_id] for post_id in post_ids if post_id in self.rows]
+        )
+        transposed = self.matrix.T.tocsr()
+        result = {}
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start : start + batch_size]
+            scores = (self.matrix[batch] @ transposed).tocsr()
+            for index, row in enumerate(batch):
+                begin, end = scores.indptr[index], scores.indptr[index + 1]
+                columns = scores.indices[begin:end]
+                values = scores.data[begin:end]
+                candidates = (columns != row) & (values > min_score)
+                columns, values = columns[candidates], values[candidates]
+                if len(values) > size:
+                    best = np.argpartition(-values, size - 1)[:size]
+                    columns, values = columns[best], values[best]
+                order = np.argsort(-values, kind="stable")
+                self.related[row] = -1
+                self.related[row, : len(columns)] = columns[order]
+                result[int(self.post_ids[row])] = list(
+                    zip(self.post_ids[columns[order]].tolist(), values[order].tolist())
+                )
+                self.thresholds[row] = (
+                    values.min() if len(values) == size else min_score
+                )
+        return result
+
+    def affected(self, post_ids: Iterable[int], batch_size: int = 256) -> List[int]:
+        """
+        :param post_ids: Posts that changed
+        :return: Other posts the changed posts are now similar enough to, to
+            enter their neighbours
+        """
+        rows = np.array(
+            [self.rows[post_id] for post_id in post_ids if post_id in self.rows]
+        )
+        transposed = self.matrix.T.tocsr()
+        affected = set()
+        for start in range(0, len(rows), batch_size):
+            scores = (
+                self.matrix[rows[start : start + batch_size]] @ transposed
+            ).tocoo()
+            entering = scores.data > self.thresholds[scores.col]
+            affected.update(self.post_ids[np.unique(scores.col[entering])].tolist())
+        return sorted(affected - set(post_ids))
+
+    def referencing(self, post_ids: Iterable[int]) -> List[int]:
+        """
+        :param post_ids: Posts about to change or be removed
+        :return: Posts having any of them as neighbour
+        """
+        rows = [self.rows[post_id] for post_id in post_ids if post_id in self.rows]
+        referencing = np.isin(self.related, rows).any(axis=1)
+        return self.post_ids[referencing].tolist()
@@ -0,0 +1,109 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from database.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Writes a post to its followers' timelines with the given session, returning
+# the number of entries written
+FanoutTask = Callable[[Session], int]
+
+
+class TimelineFanout:
+    """
+    Writes published posts to their followers' timelines from a background
+    thread with its own session, so publishing doesn't wait for every
+    follower. Until start() is called, tasks run right away with the caller's
+    session.
+
+    Tasks left when stop() is called are run before it returns, those of a
+    killed process are lost.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal):
+        """
+        :param session_factory: Session factory of the background thread
+        """
+        self.session_factory = session_factory
+        self.posts = 0
+        self.entries = 0
+        self.failures = 0
+        self.last_fanout_ms = 0.0
+        self._tasks: "queue.Queue[Optional[FanoutTask]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, task: FanoutTask, db: Session):
+        """
+        :param task: Fan-out of a post
+        :param db: Session to run the task with when there is no background
+            thread
+        """
+        if self._worker is None:
+            self.run(task, db)
+        else:
+            self._tasks.put(task)
+
+    def run(self, task: FanoutTask, db: Session) -> int:
+        start = time.perf_counter()
+        try:
+            entries = task(db)
+        except Exception:
+            self.failures += 1
+            raise
+        self.posts += 1
+        self.entries += entries
+        self.last_fanout_ms = (time.perf_counter() - start) * 1000
+        return entries
+
+    def start(self):
+        """
+        Starts the fan-out thread, call it in each worker process
+        """
+        if self._worker is None:
+            self._worker = threading.Thread(
+                target=self._run, name="timeline-fanout", daemon=True
+            )
+            self._worker.start()
+
+    def stop(self):
+        """
+        Runs the queued tasks and stops the fan-out thread
+        """
+        if self._worker is not None:
+            self._tasks.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def _run(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            try:
+                with self.session_factory() as db:
+                    self.run(task, db)
+            except Exception:
+                logger.exception("Could not fan out a post to timelines")
+
+    def stats(self) -> dict:
+        """
+        :return: Posts fanned out, pending and failed, and entries written
+        """
+        return {
+            "posts": {
+                "done": self.posts,
+                "pending": self._tasks.qsize(),
+                "failed": self.failures,
+            },
+            "entries": self.entries,
+            "last_fanout_ms": self.last_fanout_ms,
+        }
+
+
+timeline_fanout = TimelineFanout()
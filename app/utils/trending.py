@@ -0,0 +1,240 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+from fastapi.responses import ORJSONResponse
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def seconds(value: datetime) -> float:
+    # Timestamps are stored naive, in UTC
+    return (value - EPOCH).total_seconds()
+
+
+def decay_scores(
+    post_ids: np.ndarray,
+    times: np.ndarray,
+    weights: np.ndarray,
+    now: datetime,
+    half_life_hours: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param post_ids: Post of each activity
+    :param times: Time of each activity, in seconds since the epoch
+    :param weights: Weight of each activity, such as a number of views
+    :param now: Time the scores are computed for
+    :param half_life_hours: Hours after which an activity counts half
+    :return: Post IDs and the sum of their decayed activity weights
+
+    Decays every activity at once and sums them per post with bincount,
+    without a Python loop over the activities.
+    """
+    ages = np.maximum(seconds(now) - times, 0) / 3600
+    decayed = weights * np.exp2(-ages / half_life_hours)
+    ids, inverse = np.unique(post_ids, return_inverse=True)
+    return ids, np.bincount(inverse, weights=decayed, minlength=len(ids))
+
+
+def top_scores(
+    ids: np.ndarray, scores: np.ndarray, size: int
+) -> List[Tuple[int, float]]:
+    """
+    :param ids: Post IDs
+    :param scores: Score of each post
+    :param size: Number of posts to return
+    :return: The best scored posts and their scores, best first
+
+    Ties are broken by post ID, newest first.
+    """
+    if size <= 0 or len(ids) == 0:
+        return []
+    if len(ids) > size:
+        best = np.argpartition(-scores, size - 1)[:size]
+        ids, scores = ids[best], scores[best]
+    order = np.lexsort((-ids, -scores))
+    return list(zip(ids[order].tolist(), scores[order].tolist()))
+
+
+class TrendingSnapshot:
+    """
+    Serialized trending posts, with the response body of the full list
+    encoded once
+    """
+
+    __slots__ = ("posts", "body", "computed_at", "load_ms")
+
+    def __init__(self, posts: List[dict], computed_at: datetime, load_ms: float = 0.0):
+        self.posts = posts
+        self.body = orjson.dumps(posts)
+        self.computed_at = computed_at
+        self.load_ms = load_ms
+
+
+class TrendingStore:
+    """
+    Holds the latest trending snapshot. Publishing swaps the reference, so
+    readers see either the old list or the new one, never a mix.
+    """
+
+    def __init__(self):
+        self.snapshot = TrendingSnapshot([], datetime.utcnow())
+        self._lock = threading.Lock()
+
+    def publish(self, snapshot: TrendingSnapshot):
+        with self._lock:
+            self.snapshot = snapshot
+
+    def discard(self, post_id: int):
+        """
+        :param post_id: ID of a post deleted or unpublished
+
+        Removes the post from this worker's snapshot right away, the other
+        workers drop it when they next reload theirs.
+        """
+        with self._lock:
+            snapshot = self.snapshot
+            if any(post["id"] == post_id for post in snapshot.posts):
+                self.snapshot = TrendingSnapshot(
+                    [post for post in snapshot.posts if post["id"] != post_id],
+                    snapshot.computed_at,
+                    snapshot.load_ms,
+                )
+
+    def response(self, skip: int = 0, limit: Optional[int] = None) -> Response:
+        """
+        :param skip: Number of posts to skip
+        :param limit: Max number of posts to return
+        :return: Response with the posts of the current snapshot
+        """
+        snapshot = self.snapshot
+        if skip == 0 and (limit is None or limit >= len(snapshot.posts)):
+            return Response(snapshot.body, media_type="application/json")
+        end = None if limit is None else skip + limit
+        return ORJSONResponse(snapshot.posts[skip:end])
+
+    def stats(self) -> dict:
+        """
+        :return: Size and age of the current snapshot
+        """
+        snapshot = self.snapshot
+        return {
+            "posts": len(snapshot.posts),
+            "age_seconds": (datetime.utcnow() - snapshot.computed_at).total_seconds(),
+            "load_ms": snapshot.load_ms,
+        }
+
+
+class TrendingJob:
+    """
+    Reloads the trending snapshot periodically from a background thread in
+    each worker, so requests never query it. The scores are computed once
+    for all workers by the trending job.
+    """
+
+    def __init__(
+        self,
+        store: TrendingStore,
+        load: Callable[[], TrendingSnapshot],
+        interval: float = 10.0,
+    ):
+        """
+        :param store: Store the snapshots are published to
+        :param load: Function loading a snapshot
+        :param interval: Seconds between runs
+        """
+        self.store = store
+        self.load = load
+        self.interval = interval
+        self.runs = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def run(self) -> TrendingSnapshot:
+        start = time.perf_counter()
+        snapshot = self.load()
+        snapshot.load_ms = (time.perf_counter() - start) * 1000
+        self.store.publish(snapshot)
+        self.runs += 1
+        return snapshot
+
+    def start(self):
+        """
+        Starts the thread, which loads a first snapshot right away
+        """
+        if self._worker is None:
+            self._stop.clear()
+            self._worker = threading.Thread(
+                target=self._run, name="trending", daemon=True
+            )
+            self._worker.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run()
+            except Exception:
+                self.failures += 1
+                logger.exception("Could not load trending posts")
+            self._stop.wait(self.interval)
+
+    def stats(self) -> dict:
+        return dict(self.store.stats(), runs={"ok": self.runs, "failed": self.failures})
+
+
+def activity_arrays(
+    rows: Sequence[Tuple], weight: float, offset_hours: float = 0.0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    :param rows: Post ID, time and, optionally, count of each activity
+    :param weight: Weight of one activity
+    :param offset_hours: Hours added to the times, e.g. to the middle of a bucket
+    :return: Post IDs, times and weights arrays for decay_scores
+    """
+    count = len(rows)
+    post_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    # Converting datetimes to datetime64 is several times slower
+    times = np.fromiter(
+        (seconds(row[1]) for row in rows), dtype=np.float64, count=count
+    )
+    times += offset_hours * 3600
+    weights = np.full(count, weight, dtype=np.float64)
+    if count and len(rows[0]) > 2:
+        weights *= np.fromiter((row[2] for row in rows), dtype=np.float64, count=count)
+    return post_ids, times, weights
+
+
+def score_posts(
+    activities: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+    now: datetime,
+    half_life_hours: float,
+    size: int,
+) -> Dict[int, float]:
+    """
+    :param activities: Arrays of activity_arrays, one per kind of activity
+    :param now: Time the scores are computed for
+    :param half_life_hours: Hours after which an activity counts half
+    :param size: Number of posts to return
+    :return: Scores of the best scored posts by post ID, best first
+    """
+    post_ids, times, weights = (np.concatenate(arrays) for arrays in zip(*activities))
+    ids, scores = decay_scores(post_ids, times, weights, now, half_life_hours)
+    return dict(top_scores(ids, scores, size))
+
+
+trending_store = TrendingStore()
@@ -0,0 +1,176 @@
+import fcntl
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from config.settings import settings
+
+READ_SIZE = 1024 * 1024
+
+
+def new_upload_id() -> str:
+    return secrets.token_hex(16)
+
+
+class PartialUpload:
+    """
+    An upload's file, opened for appending by one request at a time. Data is
+    hashed as it is written, so completing an upload doesn't read it again.
+    """
+
+    def __init__(self, store: "UploadStore", upload_id: str, file, offset: int):
+        self.store = store
+        self.upload_id = upload_id
+        self.file = file
+        self.offset = offset
+        self.hasher = store.take_hasher(upload_id, offset)
+
+    @property
+    def path(self) -> str:
+        return self.store.path(self.upload_id)
+
+    def write(self, data: bytes):
+        if self.hasher is None:
+            self.hasher = self.store.hash_file(self.file, self.offset)
+        self.file.seek(self.offset)
+        self.file.write(data)
+        self.hasher.update(data)
+        self.offset += len(data)
+
+    def truncate(self, offset: int):
+        """
+        :param offset: Bytes to keep, data written past it is dropped
+        """
+        self.file.truncate(offset)
+        self.offset = offset
+        self.hasher = None
+
+    def digest(self) -> str:
+        """
+        :return: SHA-256 of the data written so far
+        """
+        if self.hasher is None:
+            self.hasher = self.store.hash_file(self.file, self.offset)
+        return self.hasher.hexdigest()
+
+    def close(self):
+        if self.file.closed:
+            return
+        if self.hasher is not None:
+            self.store.keep_hasher(self.upload_id, self.offset, self.hasher)
+        self.file.close()
+
+
+class UploadStore:
+    """
+    Partial uploads in a local directory, one file per upload named by its
+    ID. A file is locked while a request writes to it, so concurrent requests
+    for an upload fail instead of interleaving, in any worker of the host.
+
+    Each worker keeps the hash state of the uploads it wrote to last, a
+    request for an upload another worker was writing hashes the file so far
+    from disk first.
+    """
+
+    def __init__(self, directory: str, max_hashers: int = 1000):
+        """
+        :param directory: Directory of the partial files
+        :param max_hashers: Number of uploads whose hash state is kept, least
+            recently written first out
+        """
+        self.directory = directory
+        self.max_hashers = max_hashers
+        self.hashers: "OrderedDict[str, Tuple[int, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, upload_id)
+
+    def create(self, upload_id: str) -> PartialUpload:
+        """
+        :return: The new upload's empty file, opened
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        return self._open(upload_id, "x+b")
+
+    def open(self, upload_id: str) -> Optional[PartialUpload]:
+        """
+        :return: The upload's file, None if a request is writing to it
+        :raises FileNotFoundError: If the upload has no file
+        """
+        return self._open(upload_id, "r+b")
+
+    def _open(self, upload_id: str, mode: str) -> Optional[PartialUpload]:
+        # Unbuffered, data is written in chunks already
+        file = open(self.path(upload_id), mode, buffering=0)
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            file.close()
+            return None
+        return PartialUpload(self, upload_id, file, os.fstat(file.fileno()).st_size)
+
+    def size(self, upload_id: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self.path(upload_id))
+        except FileNotFoundError:
+            return None
+
+    def delete(self, upload_id: str):
+        with self._lock:
+            self.hashers.pop(upload_id, None)
+        try:
+            os.unlink(self.path(upload_id))
+        except FileNotFoundError:
+            pass
+
+    def expire(self, max_age: float) -> List[str]:
+        """
+        :param max_age: Seconds since an upload was last written to
+        :return: IDs of the uploads whose files were deleted
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        expired = []
+        deadline = time.time() - max_age
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.stat().st_mtime < deadline:
+                    self.delete(entry.name)
+                    expired.append(entry.name)
+        return expired
+
+    def take_hasher(self, upload_id: str, offset: int):
+        with self._lock:
+            entry = self.hashers.pop(upload_id, None)
+        if entry is not None and entry[0] == offset:
+            return entry[1]
+        return None
+
+    def keep_hasher(self, upload_id: str, offset: int, hasher):
+        with self._lock:
+            self.hashers[upload_id] = (offset, hasher)
+            while len(self.hashers) > self.max_hashers:
+                self.hashers.popitem(last=False)
+
+    def hash_file(self, file, offset: int):
+        """
+        :return: SHA-256 state of the file's first `offset` bytes
+        """
+        hasher = hashlib.sha256()
+        file.seek(0)
+        remaining = offset
+        while remaining > 0:
+            data = file.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            hasher.update(data)
+            remaining -= len(data)
+        return hasher
+
+
+upload_store = UploadStore(settings.UPLOAD_DIR)
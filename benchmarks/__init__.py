@@ -0,0 +1,18 @@
+import os
+
+# Measure the application itself, not the protections in front of it. These are
+# set before config.settings is imported by any benchmark module.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "False")
+os.environ.setdefault("CONCURRENCY_LIMIT_ENABLED", "False")
+os.environ.setdefault("METRICS_ENABLED", "False")
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "False")
+os.environ.setdefault("COMPRESSION_ENABLED", "False")
+os.environ.setdefault("VIEW_COUNTER_ENABLED", "False")
+os.environ.setdefault("TRENDING_ENABLED", "False")
+os.environ.setdefault("TIMELINE_FANOUT_BACKGROUND", "False")
+os.environ.setdefault("IMAGE_WORKERS", "0")
+os.environ.setdefault("SQL_PROFILER_SAMPLE_RATE", "1")
+# The benchmarks bind their own engine and create its tables, keep the default
+# one off Postgres
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DB_CHECK_REVISION", "False")
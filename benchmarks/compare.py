@@ -0,0 +1,46 @@
+"""
+Compares two benchmark result files scenario by scenario.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput_rps", "queries_per_request"]
+
+
+def change(old: float, new: float) -> str:
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.candidate) as file:
+        candidate = json.load(file)
+
+    print(
+        f"{baseline['meta']['revision']} -> {candidate['meta']['revision']} "
+        f"({candidate['meta']['database']})"
+    )
+    for name, new in candidate["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        print(name)
+        for metric in METRICS:
+            print(
+                f"  {metric:22}{old[metric]:>12}{new[metric]:>12}"
+                f"{change(old[metric], new[metric]):>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
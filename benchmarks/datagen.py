@@ -0,0 +1,359 @@
+"""
+Generates a large synthetic blog dataset for scale testing.
+
+    python -m benchmarks.datagen --database-url postgresql://... --posts 1000000 \
+        --comments 5000000 --reset
+
+Rows are generated in chunks and streamed with COPY on Postgres, or with
+DBAPI executemany elsewhere, bypassing the ORM entirely. Tag popularity
+follows a Zipf distribution, comment counts per post are heavy tailed and
+replies form chains of configurable depth. The same seed always produces
+the same dataset.
+"""
+import argparse
+import csv
+import io
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from passlib.context import CryptContext
+from sqlalchemy import Table, func, select, text
+from sqlalchemy.engine import Engine
+
+from database.models import Base, Comment, Post, Tag, TagPost, User
+
+CHUNK_SIZE = 50_000
+PASSWORD = "benchmark-password"
+WORDS = (
+    "python fastapi postgres query index latency cache async thread worker "
+    "request response schema model session engine router service repository "
+    "token email tag post comment reply feed author draft publish slug"
+).split()
+
+
+@dataclass
+class Distribution:
+    tag_zipf: float = 1.1
+    tags_per_post: int = 3
+    post_popularity: float = 1.2
+    reply_rate: float = 0.4
+    chain_rate: float = 0.6
+    max_depth: int = 50
+    published_rate: float = 0.9
+    content_words: int = 120
+
+
+def chunked(rows: Iterable[tuple], size: int = CHUNK_SIZE) -> Iterator[List[tuple]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_rows(engine: Engine, table: Table, columns: Sequence[str], rows) -> int:
+    """
+    :param engine: Target engine
+    :param table: Table to write to
+    :param columns: Column names, in the order of the row tuples
+    :param rows: Iterable of row tuples
+    :return: Number of rows written
+
+    Streams rows into a table with COPY on Postgres and executemany elsewhere.
+    """
+    written = 0
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if engine.dialect.name == "postgresql":
+            copy = (
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+            )
+            for chunk in chunked(rows):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(chunk)
+                buffer.seek(0)
+                cursor.copy_expert(copy, buffer)
+                written += len(chunk)
+        else:
+            placeholder = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+            insert = (
+                f"INSERT INTO {table.name} ({', '.join(columns)}) "
+                f"VALUES ({', '.join([placeholder] * len(columns))})"
+            )
+            for chunk in chunked(rows):
+                cursor.executemany(insert, chunk)
+                written += len(chunk)
+        connection.commit()
+    finally:
+        connection.close()
+    return written
+
+
+def reset_sequences(engine: Engine):
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        for table in ("users", "tags", "posts", "comments"):
+            connection.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+                )
+            )
+
+
+def cumulative_weights(weights: Iterable[float]) -> List[float]:
+    return list(itertools.accumulate(weights))
+
+
+class DataGenerator:
+    """
+    Deterministic generator of users, tags, posts, tag links and comments
+    """
+
+    def __init__(
+        self,
+        users: int,
+        tags: int,
+        posts: int,
+        comments: int,
+        seed: int = 42,
+        distribution: Optional[Distribution] = None,
+    ):
+        self.users = users
+        self.tags = tags
+        self.posts = posts
+        self.comments = comments
+        self.seed = seed
+        self.distribution = distribution or Distribution()
+        self.start = datetime(2020, 1, 1)
+        self.span_minutes = 3 * 365 * 24 * 60
+        self._post_times: Optional[List[str]] = None
+
+    def rng(self, name: str) -> random.Random:
+        # Independent streams per table keep each table stable when another
+        # table's size changes
+        return random.Random(f"{self.seed}-{name}")
+
+    def user_rows(self) -> Iterator[tuple]:
+        password = CryptContext(schemes=["bcrypt"]).hash(PASSWORD)
+        for i in range(1, self.users + 1):
+            yield (i, f"user{i}", f"user{i}@example.com", password, True, True, i == 1)
+
+    def tag_rows(self) -> Iterator[tuple]:
+        for i in range(1, self.tags + 1):
+            yield (i, f"tag {i}", f"tag-{i}", f"Tag {i}", str(self.start))
+
+    def post_times(self) -> List[str]:
+        # Posts are spread evenly over the time span in id order; formatted
+        # once because comments reuse their post's timestamp
+        if self._post_times is None:
+            step = timedelta(minutes=self.span_minutes / max(self.posts, 1))
+            self._post_times = [
+                str(self.start + step * i) for i in range(self.posts + 1)
+            ]
+        return self._post_times
+
+    def post_rows(self) -> Iterator[tuple]:
+        rng = self.rng("posts")
+        random, users = rng.random, self.users
+        published_rate = self.distribution.published_rate
+        # A pool of bodies keeps text generation out of the per row cost
+        contents = [
+            " ".join(rng.choices(WORDS, k=self.distribution.content_words))
+            for _ in range(1024)
+        ]
+        times = self.post_times()
+        for i in range(1, self.posts + 1):
+            content = contents[int(random() * 1024)]
+            published = random() < published_rate
+            yield (
+                i,
+                f"Post {i}",
+                f"post-{i}",
+                f"Excerpt of post {i}",
+                content,
+                published,
+                # Published in id order
+                i if published else None,
+                random() < 0.02,
+                int(random() * users) + 1,
+                times[i],
+                times[i],
+            )
+
+    def tag_post_rows(self) -> Iterator[tuple]:
+        rng = self.rng("tag_post")
+        tag_ids = range(1, self.tags + 1)
+        weights = cumulative_weights(
+            1 / rank**self.distribution.tag_zipf for rank in tag_ids
+        )
+        per_post = min(self.distribution.tags_per_post, self.tags)
+        for post_id in range(1, self.posts + 1):
+            picked = set(rng.choices(tag_ids, cum_weights=weights, k=per_post))
+            for tag_id in sorted(picked):
+                yield (tag_id, post_id)
+
+    def comment_rows(self) -> Iterator[tuple]:
+        rng = self.rng("comments")
+        random, users = rng.random, self.users
+        distribution = self.distribution
+        post_ids = range(1, self.posts + 1)
+        # Pareto popularity per post gives heavy tailed comment counts
+        weights = cumulative_weights(
+            rng.paretovariate(distribution.post_popularity) for _ in post_ids
+        )
+        times = self.post_times()
+        # Last comments per post as (id, depth), enough to build reply chains
+        recent = {}
+        comment_id = 0
+        for chunk_start in range(0, self.comments, CHUNK_SIZE):
+            size = min(CHUNK_SIZE, self.comments - chunk_start)
+            for post_id in rng.choices(post_ids, cum_weights=weights, k=size):
+                comment_id += 1
+                thread = recent.get(post_id)
+                parent_id, depth = None, 0
+                if thread and random() < distribution.reply_rate:
+                    if random() < distribution.chain_rate:
+                        parent_id, parent_depth = thread[-1]
+                    else:
+                        parent_id, parent_depth = thread[int(random() * len(thread))]
+                    depth = parent_depth + 1
+                    if depth > distribution.max_depth:
+                        parent_id, depth = None, 0
+                if thread is None:
+                    thread = recent[post_id] = []
+                thread.append((comment_id, depth))
+                if len(thread) > 20:
+                    del thread[0]
+                yield (
+                    comment_id,
+                    post_id,
+                    int(random() * users) + 1,
+                    parent_id,
+                    f"Comment {comment_id}",
+                    times[post_id],
+                    times[post_id],
+                )
+
+    def write(self, engine: Engine, log=print):
+        """
+        :param engine: Engine of an empty database with the schema created
+        :param log: Function called with a progress line per table
+        :return: Total number of rows written
+        """
+        tables = [
+            (
+                User.__table__,
+                ("id", "username", "email", "password")
+                + ("is_active", "is_verified", "is_admin"),
+                self.user_rows(),
+            ),
+            (
+                Tag.__table__,
+                ("id", "title", "slug", "excerpt", "created_at"),
+                self.tag_rows(),
+            ),
+            (
+                Post.__table__,
+                ("id", "title", "slug", "excerpt", "content", "is_published")
+                + ("published_position", "is_featured", "author_id")
+                + ("created_at", "updated_at"),
+                self.post_rows(),
+            ),
+            (TagPost, ("tag_id", "post_id"), self.tag_post_rows()),
+            (
+                Comment.__table__,
+                ("id", "post_id", "author_id", "parent_id", "content")
+                + ("created_at", "updated_at"),
+                self.comment_rows(),
+            ),
+        ]
+        total = 0
+        for table, columns, rows in tables:
+            start = time.perf_counter()
+            written = write_rows(engine, table, columns, rows)
+            elapsed = time.perf_counter() - start
+            total += written
+            log(
+                f"{table.name:10} {written:>10} rows in {elapsed:7.2f}s "
+                f"({written / max(elapsed, 1e-9):,.0f} rows/s)"
+            )
+        reset_sequences(engine)
+        return total
+
+
+def main():
+    from benchmarks.harness import create_bench_engine
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/bench.db")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--tags", type=int, default=1_000)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--comments", type=int, default=5_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tag-zipf", type=float, default=Distribution.tag_zipf)
+    parser.add_argument("--tags-per-post", type=int, default=Distribution.tags_per_post)
+    parser.add_argument(
+        "--post-popularity",
+        type=float,
+        default=Distribution.post_popularity,
+        help="Pareto shape of comments per post, lower is more skewed",
+    )
+    parser.add_argument("--reply-rate", type=float, default=Distribution.reply_rate)
+    parser.add_argument(
+        "--chain-rate",
+        type=float,
+        default=Distribution.chain_rate,
+        help="Share of replies answering the latest comment, building deep chains",
+    )
+    parser.add_argument("--max-depth", type=int, default=Distribution.max_depth)
+    parser.add_argument("--content-words", type=int, default=Distribution.content_words)
+    parser.add_argument(
+        "--reset", action="store_true", help="Drop and recreate all tables first"
+    )
+    args = parser.parse_args()
+
+    engine = create_bench_engine(args.database_url)
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        if connection.execute(
+            select(func.count()).select_from(Post.__table__)
+        ).scalar():
+            parser.error("The database already contains posts, pass --reset")
+
+    generator = DataGenerator(
+        args.users,
+        args.tags,
+        args.posts,
+        args.comments,
+        args.seed,
+        Distribution(
+            tag_zipf=args.tag_zipf,
+            tags_per_post=args.tags_per_post,
+            post_popularity=args.post_popularity,
+            reply_rate=args.reply_rate,
+            chain_rate=args.chain_rate,
+            max_depth=args.max_depth,
+            content_words=args.content_words,
+        ),
+    )
+    start = time.perf_counter()
+    total = generator.write(engine)
+    elapsed = time.perf_counter() - start
+    print(
+        f"total      {total:>10} rows in {elapsed:7.2f}s ({total / elapsed:,.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
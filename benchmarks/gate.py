@@ -0,0 +1,188 @@
+"""
+Fails when endpoints or repositories issue more SQL statements than budgeted,
+or when repository micro-benchmarks regress against the stored baseline.
+
+    python -m benchmarks.gate
+    python -m benchmarks.gate --update-baseline
+
+Query counts are deterministic for the seeded dataset and are checked on
+every run. Timings depend on the machine, so they are only compared when a
+baseline recorded on the same machine exists.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.repositories import (
+    AuthRepository,
+    CommentRepository,
+    PostRepository,
+    TagRepository,
+    UserRepository,
+)
+from app.schemas import PostStatus
+from app.utils.auth_utils import AuthUtils
+from benchmarks.datagen import PASSWORD
+from benchmarks.harness import (
+    SERVER_TIMING_QUERIES,
+    create_bench_app,
+    create_bench_engine,
+)
+from benchmarks.seed import SCALES, seed
+from database.profiler import count_queries
+from database.session import create_session_factory
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "budgets.json")
+
+
+def repository_operations(token: str) -> Dict[str, Callable[[Session], object]]:
+    def post_repository(db: Session) -> PostRepository:
+        return PostRepository(db=db, tag_repository=TagRepository(db=db))
+
+    def auth_utils(db: Session) -> AuthUtils:
+        return AuthUtils(
+            user_repository=UserRepository(db=db),
+            auth_repository=AuthRepository(db=db),
+        )
+
+    return {
+        "PostRepository.get_all": lambda db: post_repository(db).get_all(limit=100),
+        "PostRepository.get_by_slug": lambda db: post_repository(db).get_by_slug(
+            "post-1"
+        ),
+        "PostRepository.get_by_author": lambda db: post_repository(db).get_by_author(
+            1, PostStatus.draft
+        ),
+        "TagRepository.get_by_slug": lambda db: TagRepository(db=db).get_by_slug(
+            "tag-1"
+        ),
+        "CommentRepository.get_by_post_id": lambda db: CommentRepository(
+            db=db, post_repository=post_repository(db)
+        ).get_by_post_id(1),
+        "AuthUtils.verify_access_token": lambda db: auth_utils(db).verify_access_token(
+            token
+        ),
+    }
+
+
+def time_operation(SessionLocal, operation, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        # A fresh session per run so the identity map doesn't hide hydration
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            operation(db)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/gate.db")
+    parser.add_argument(
+        "--baseline", default=os.path.join("benchmarks", "baseline.json")
+    )
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.3,
+        help="Allowed slowdown over the baseline, 0.3 is 30%%",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=1.0,
+        help="Slowdowns smaller than this are noise, whatever the ratio",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(BUDGETS_PATH) as file:
+        budgets = json.load(file)
+
+    engine = create_bench_engine(args.database_url)
+    seed(engine, SCALES[budgets["scale"]], budgets["seed"])
+    SessionLocal = create_session_factory(engine)
+    app = create_bench_app(engine)
+    client = TestClient(app)
+    token = client.post(
+        "/auth/login", json={"username": "user1", "password": PASSWORD}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    failures = []
+
+    def check(name: str, count: int, budget: int):
+        status = "ok"
+        if count > budget:
+            status = "FAIL"
+            failures.append(f"{name}: {count} queries, budget is {budget}")
+        elif count < budget:
+            status = "ok (budget can be lowered)"
+        print(f"  {name:40}{count:>4} / {budget:<4}{status}")
+
+    print("Queries per endpoint")
+    for endpoint, budget in budgets["endpoints"].items():
+        method, _, path = endpoint.partition(" ")
+        body = None
+        if method == "POST" and path == "/blogs/comments":
+            body = {"content": "Budget check", "post_id": 1}
+        response = client.request(method, path, json=body, headers=headers)
+        if response.status_code >= 400:
+            failures.append(f"{endpoint}: HTTP {response.status_code}")
+            continue
+        match = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+        check(endpoint, int(match.group(1)) if match else 0, budget)
+
+    operations = repository_operations(token)
+    print("Queries per repository call")
+    for name, budget in budgets["repositories"].items():
+        with SessionLocal() as db, count_queries() as profile:
+            operations[name](db)
+        check(name, profile.count, budget)
+
+    timings = {
+        name: time_operation(SessionLocal, operation, args.repeat)
+        for name, operation in operations.items()
+    }
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(timings, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        print("Median time per repository call")
+        for name, seconds in timings.items():
+            reference = baseline.get(name)
+            if reference is None:
+                continue
+            change = (seconds - reference) / reference
+            status = "ok"
+            if (
+                change > args.tolerance
+                and (seconds - reference) * 1000 > args.min_delta_ms
+            ):
+                status = "FAIL"
+                failures.append(
+                    f"{name}: {seconds * 1000:.2f}ms, baseline {reference * 1000:.2f}ms"
+                )
+            print(f"  {name:40}{seconds * 1000:>9.2f}ms {change:+7.1%}  {status}")
+    else:
+        print(f"No baseline at {args.baseline}, run with --update-baseline")
+
+    if failures:
+        print("\n".join(["", "Regressions:"] + failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
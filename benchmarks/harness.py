@@ -0,0 +1,176 @@
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from benchmarks.datagen import PASSWORD
+from database.models import Post, Tag
+from database.session import create_db_engine, create_session_factory, get_db
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def create_bench_engine(database_url: str) -> Engine:
+    """
+    :param database_url: SQLAlchemy URL of the benchmark database
+    :return: Engine with the SQL profiler installed
+    """
+    return create_db_engine(database_url)
+
+
+def create_bench_app(engine: Engine) -> FastAPI:
+    """
+    :param engine: Engine of the benchmark database
+    :return: The application with its sessions bound to `engine`
+    """
+    from main import app
+
+    SessionLocal = create_session_factory(engine)
+
+    def get_bench_db():
+        with SessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_bench_db
+    # The profiler reports every request, keep N+1 warnings out of the output
+    logging.getLogger("app.middlewares.sql_profiler").setLevel(logging.ERROR)
+    return app
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: Callable[[random.Random, dict], str]
+    body: Optional[Callable[[random.Random, dict], dict]] = None
+    authenticated: bool = False
+
+
+SCENARIOS = [
+    Scenario("list_posts", "GET", lambda rng, ctx: "/blogs/posts?limit=100"),
+    Scenario(
+        "get_post",
+        "GET",
+        lambda rng, ctx: f"/blogs/posts/{rng.choice(ctx['post_slugs'])}",
+    ),
+    Scenario(
+        "get_tag",
+        "GET",
+        lambda rng, ctx: f"/blogs/tags/{rng.choice(ctx['tag_slugs'])}",
+    ),
+    Scenario(
+        "login",
+        "POST",
+        lambda rng, ctx: "/auth/login",
+        body=lambda rng, ctx: {"username": "user1", "password": PASSWORD},
+    ),
+    Scenario(
+        "create_comment",
+        "POST",
+        lambda rng, ctx: "/blogs/comments",
+        body=lambda rng, ctx: {
+            "content": "Benchmark comment",
+            "post_id": rng.choice(ctx["post_ids"]),
+        },
+        authenticated=True,
+    ),
+]
+
+
+def load_context(engine: Engine, app: FastAPI) -> dict:
+    """
+    :return: Slugs and ids the scenarios pick from, and an access token
+    """
+    with engine.connect() as connection:
+        posts = connection.execute(select(Post.id, Post.slug)).all()
+        tag_slugs = connection.execute(select(Tag.slug)).scalars().all()
+    response = TestClient(app).post(
+        "/auth/login", json={"username": "user1", "password": PASSWORD}
+    )
+    response.raise_for_status()
+    return {
+        "post_ids": [post.id for post in posts],
+        "post_slugs": [post.slug for post in posts],
+        "tag_slugs": tag_slugs,
+        "token": response.json()["access_token"],
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(q / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def run_scenario(
+    app: FastAPI,
+    scenario: Scenario,
+    context: dict,
+    requests: int,
+    concurrency: int = 1,
+    warmup: int = 10,
+    seed: int = 42,
+) -> Dict[str, float]:
+    """
+    :param app: Application under test
+    :param scenario: Scenario to run
+    :param context: Values returned by load_context
+    :param requests: Number of measured requests
+    :param concurrency: Number of client threads
+    :param warmup: Number of unmeasured requests sent first
+    :param seed: Random seed for the request sequence
+    :return: Latency percentiles, throughput and queries per request
+    """
+    local = threading.local()
+    headers = {}
+    if scenario.authenticated:
+        headers["Authorization"] = f"Bearer {context['token']}"
+
+    def send(rng: random.Random):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = TestClient(app)
+        body = scenario.body(rng, context) if scenario.body else None
+        start = time.perf_counter()
+        response = client.request(
+            scenario.method, scenario.path(rng, context), json=body, headers=headers
+        )
+        latency = time.perf_counter() - start
+        match = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+        queries = int(match.group(1)) if match else 0
+        return latency, queries, response.status_code >= 400
+
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        send(rng)
+
+    rngs = [random.Random(seed + i) for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, rngs))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency * 1000 for latency, _, _ in results)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": sum(1 for _, _, failed in results if failed),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "queries_per_request": round(
+            sum(queries for _, queries, _ in results) / requests, 2
+        ),
+    }
@@ -0,0 +1,111 @@
+"""
+Compares ORM hydration with the Core read path of the get_all methods.
+
+    python -m benchmarks.hydration --scale medium --limit 100
+
+For posts, tags and users the same page is loaded as identity-mapped ORM
+instances (eager loading relations as before) and through the repositories'
+Core selects into rows and slotted objects. Reports median load time and
+the memory retained per row while the session is open.
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+from sqlalchemy import desc
+from sqlalchemy.orm import Session
+
+from app.repositories import PostRepository, TagRepository, UserRepository
+from app.repositories.blog_repository import attach_comment_children, post_relations
+from benchmarks.harness import create_bench_engine
+from benchmarks.seed import SCALES, seed
+from database.models import Post, Tag, User
+from database.session import create_session_factory
+
+
+def cases(limit: int) -> Tuple[Tuple[str, Callable, Callable], ...]:
+    def orm_posts(db: Session):
+        return attach_comment_children(
+            db.query(Post)
+            .options(*post_relations())
+            .order_by(desc(Post.updated_at))
+            .limit(limit)
+            .all()
+        )
+
+    def core_posts(db: Session):
+        return PostRepository(db=db, tag_repository=TagRepository(db=db)).get_all(
+            limit=limit
+        )
+
+    return (
+        ("PostRepository.get_all", orm_posts, core_posts),
+        (
+            "TagRepository.get_all",
+            lambda db: db.query(Tag).order_by(desc(Tag.created_at)).limit(limit).all(),
+            lambda db: TagRepository(db=db).get_all(limit=limit),
+        ),
+        (
+            "UserRepository.get_all",
+            lambda db: db.query(User).limit(limit).all(),
+            lambda db: UserRepository(db=db).get_all(limit=limit),
+        ),
+    )
+
+
+def measure_time(SessionLocal, load: Callable, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            load(db)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def measure_memory(SessionLocal, load: Callable) -> Tuple[int, int]:
+    """
+    :return: Number of rows and bytes retained by them and the session
+    """
+    with SessionLocal() as db:
+        load(db)  # Warms up statement caches so they aren't counted
+    with SessionLocal() as db:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        rows = load(db)
+        retained = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        return len(rows), retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/bench.db")
+    parser.add_argument("--scale", choices=SCALES, default="medium")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_bench_engine(args.database_url)
+    seed(engine, SCALES[args.scale])
+    SessionLocal = create_session_factory(engine)
+
+    print(
+        f"{'method':26}{'rows':>6}{'orm ms':>10}{'core ms':>10}"
+        f"{'orm B/row':>12}{'core B/row':>12}"
+    )
+    for name, orm, core in cases(args.limit):
+        rows, orm_bytes = measure_memory(SessionLocal, orm)
+        _, core_bytes = measure_memory(SessionLocal, core)
+        orm_time = measure_time(SessionLocal, orm, args.repeat)
+        core_time = measure_time(SessionLocal, core, args.repeat)
+        print(
+            f"{name:26}{rows:>6}{orm_time * 1000:>10.2f}{core_time * 1000:>10.2f}"
+            f"{orm_bytes // max(rows, 1):>12}{core_bytes // max(rows, 1):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
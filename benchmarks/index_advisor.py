@@ -0,0 +1,272 @@
+"""
+Suggests missing indexes from the statistics of a local Postgres instance.
+
+    python -m benchmarks.index_advisor --database-url postgresql://localhost/bench --reset
+    python -m benchmarks.run --database-url postgresql://localhost/bench
+    python -m benchmarks.index_advisor --database-url postgresql://localhost/bench
+
+Reads the statements on the blog tables from pg_stat_statements and the
+columns they filter, join or sort on. Columns that don't lead any index are
+suggested as CREATE INDEX CONCURRENTLY statements, ranked by the time spent
+in the statements using them, next to the sequential scans of their table
+from pg_stat_user_tables. Indexes that were never scanned are listed too.
+
+pg_stat_statements must be listed in shared_preload_libraries and created
+in the database with CREATE EXTENSION pg_stat_statements.
+"""
+import argparse
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import Boolean, create_engine, inspect, text
+from sqlalchemy.engine import Connection
+
+from database.models import Base
+
+COLUMN = r"\b([a-z_][a-z0-9_]*)\.([a-z_][a-z0-9_]*)\b"
+# Column on the left of a comparison, or on the right of one
+COMPARED = re.compile(
+    COLUMN + r"\s*(?:=|<>|!=|<=|>=|<|>|IN\b|IS\b|BETWEEN\b)", re.IGNORECASE
+)
+COMPARED_TO = re.compile(r"(?:=|<=|>=|<|>)\s*" + COLUMN, re.IGNORECASE)
+ORDER_BY = re.compile(r"\bORDER BY\s+" + COLUMN, re.IGNORECASE)
+ALIAS = re.compile(
+    r"\b(?:FROM|JOIN)\s+([a-z_][a-z0-9_]*)\s+AS\s+([a-z_][a-z0-9_]*)", re.IGNORECASE
+)
+
+
+@dataclass
+class Candidate:
+    table: str
+    column: str
+    kinds: Set[str] = field(default_factory=set)
+    calls: int = 0
+    total_ms: float = 0.0
+    statement: str = ""
+    statement_ms: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"ix_{self.table}_{self.column}"
+
+    def ddl(self) -> str:
+        return (
+            f"CREATE INDEX CONCURRENTLY {self.name} "
+            f"ON {self.table} ({self.column});"
+        )
+
+
+def statement_columns(
+    statement: str, tables: Dict[str, Set[str]]
+) -> Dict[Tuple[str, str], str]:
+    """
+    :param statement: Normalized SQL from pg_stat_statements
+    :param tables: Column names by table name
+    :return: How each table column is used, "filter" or "sort"
+
+    Aliases such as the users_1 of joined loads are resolved to their table.
+    """
+    aliases = {
+        alias.lower(): table.lower() for table, alias in ALIAS.findall(statement)
+    }
+    used = {}
+    for pattern, kind in (
+        (COMPARED, "filter"),
+        (COMPARED_TO, "filter"),
+        (ORDER_BY, "sort"),
+    ):
+        for table, column in pattern.findall(statement):
+            table = aliases.get(table.lower(), table.lower())
+            column = column.lower()
+            if column in tables.get(table, ()):
+                used.setdefault((table, column), kind)
+    return used
+
+
+def leading_columns(
+    connection: Connection, tables: Iterable[str]
+) -> Set[Tuple[str, str]]:
+    """
+    :return: Table columns that lead an index, primary key or unique constraint
+    """
+    inspector = inspect(connection)
+    covered = set()
+    for table in tables:
+        key = inspector.get_pk_constraint(table)["constrained_columns"]
+        indexes = inspector.get_indexes(table) + inspector.get_unique_constraints(table)
+        for columns in [key] + [index["column_names"] for index in indexes]:
+            if columns and columns[0]:
+                covered.add((table, columns[0]))
+    return covered
+
+
+def read_statements(connection: Connection, limit: int) -> List[dict]:
+    # The timing columns were renamed in Postgres 13
+    names = set(
+        connection.execute(
+            text(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_name = 'pg_stat_statements'"
+            )
+        ).scalars()
+    )
+    total = "total_exec_time" if "total_exec_time" in names else "total_time"
+    return [
+        dict(row._mapping)
+        for row in connection.execute(
+            text(
+                f"SELECT query, calls, {total} AS total_ms, rows "
+                "FROM pg_stat_statements "
+                "WHERE dbid = (SELECT oid FROM pg_database "
+                "WHERE datname = current_database()) "
+                f"ORDER BY {total} DESC LIMIT :limit"
+            ),
+            {"limit": limit},
+        )
+    ]
+
+
+def read_table_stats(connection: Connection) -> Dict[str, dict]:
+    return {
+        row.relname: dict(row._mapping)
+        for row in connection.execute(
+            text(
+                "SELECT relname, seq_scan, seq_tup_read, idx_scan, n_live_tup "
+                "FROM pg_stat_user_tables"
+            )
+        )
+    }
+
+
+def read_unused_indexes(connection: Connection, tables: Iterable[str]) -> List[dict]:
+    return [
+        dict(row._mapping)
+        for row in connection.execute(
+            text(
+                "SELECT s.relname, s.indexrelname, "
+                "pg_relation_size(s.indexrelid) AS bytes "
+                "FROM pg_stat_user_indexes s "
+                "JOIN pg_index i ON i.indexrelid = s.indexrelid "
+                "WHERE s.idx_scan = 0 AND NOT i.indisunique AND NOT i.indisprimary "
+                "ORDER BY bytes DESC"
+            )
+        )
+        if row.relname in tables
+    ]
+
+
+def advise(
+    statements: List[dict],
+    tables: Dict[str, Set[str]],
+    covered: Set[Tuple[str, str]],
+) -> List[Candidate]:
+    """
+    :param statements: Rows of pg_stat_statements
+    :param tables: Column names by table name
+    :param covered: Table columns already leading an index
+    :return: Columns worth indexing, most expensive first
+    """
+    candidates: Dict[Tuple[str, str], Candidate] = {}
+    for statement in statements:
+        query = statement["query"]
+        if query.lstrip().upper().startswith(("CREATE", "ALTER", "DROP", "EXPLAIN")):
+            continue
+        for key, kind in statement_columns(query, tables).items():
+            if key in covered:
+                continue
+            candidate = candidates.setdefault(key, Candidate(*key))
+            candidate.kinds.add(kind)
+            candidate.calls += statement["calls"]
+            candidate.total_ms += statement["total_ms"]
+            if statement["total_ms"] > candidate.statement_ms:
+                candidate.statement = " ".join(query.split())
+                candidate.statement_ms = statement["total_ms"]
+    return sorted(candidates.values(), key=lambda item: -item.total_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument(
+        "--statements", type=int, default=500, help="Heaviest statements to read"
+    )
+    parser.add_argument(
+        "--min-rows",
+        type=int,
+        default=1000,
+        help="Skip tables smaller than this, scanning them is cheap",
+    )
+    parser.add_argument(
+        "--reset", action="store_true", help="Reset the statistics and exit"
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        parser.error("The advisor reads Postgres statistics, pass a postgresql:// URL")
+    # Booleans are too unselective for a plain index, see partial indexes
+    tables = {
+        name: {
+            column.name
+            for column in table.columns
+            if not isinstance(column.type, Boolean)
+        }
+        for name, table in Base.metadata.tables.items()
+    }
+
+    with engine.connect() as connection:
+        if not connection.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+        ).first():
+            sys.exit(
+                "pg_stat_statements isn't installed, add it to "
+                "shared_preload_libraries and run CREATE EXTENSION pg_stat_statements"
+            )
+        if args.reset:
+            connection.execute(text("SELECT pg_stat_statements_reset()"))
+            connection.execute(text("SELECT pg_stat_reset()"))
+            print("Statistics reset, run a workload then the advisor again")
+            return
+
+        statements = read_statements(connection, args.statements)
+        table_stats = read_table_stats(connection)
+        covered = leading_columns(connection, [t for t in tables if t in table_stats])
+        unused = read_unused_indexes(connection, tables)
+
+    candidates = [
+        candidate
+        for candidate in advise(statements, tables, covered)
+        if table_stats.get(candidate.table, {}).get("n_live_tup", 0) >= args.min_rows
+    ]
+    print(
+        f"{len(statements)} statements, {len(candidates)} unindexed columns "
+        f"in tables of at least {args.min_rows} rows\n"
+    )
+    print(
+        f"{'column':28}{'used for':14}{'calls':>10}{'total ms':>12}"
+        f"{'seq scans':>11}{'rows':>12}"
+    )
+    for candidate in candidates:
+        stats = table_stats[candidate.table]
+        print(
+            f"{candidate.table + '.' + candidate.column:28}"
+            f"{', '.join(sorted(candidate.kinds)):14}{candidate.calls:>10}"
+            f"{candidate.total_ms:>12.1f}{stats['seq_scan']:>11}"
+            f"{stats['n_live_tup']:>12}"
+        )
+        print(f"    {candidate.ddl()}")
+        print(f"    e.g. {candidate.statement[:160]}")
+
+    if unused:
+        print("\nIndexes never scanned since the last reset:")
+        for index in unused:
+            print(
+                f"    {index['relname']}.{index['indexrelname']} "
+                f"({index['bytes'] // 1024} KB)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures the per request overhead of PrometheusMiddleware.
+
+    python -m benchmarks.metrics_overhead --requests 200000
+"""
+import argparse
+import asyncio
+import time
+
+from app.middlewares.metrics import PrometheusMiddleware
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b'{"ok":true}'})
+
+
+async def app(scope, receive, send):
+    # Mimic the router storing the matched endpoint in the scope
+    scope["endpoint"] = endpoint
+    await endpoint(scope, receive, send)
+
+
+class FakeApp:
+    routes = []
+
+
+async def run(asgi_app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        scope = {"type": "http", "method": "GET", "path": "/", "app": FakeApp}
+        await asgi_app(scope, receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200_000)
+    args = parser.parse_args()
+
+    baseline = asyncio.run(run(app, args.requests))
+    instrumented = asyncio.run(run(PrometheusMiddleware(app), args.requests))
+    print(f"baseline:     {baseline * 1e6:8.2f} us/request")
+    print(f"instrumented: {instrumented * 1e6:8.2f} us/request")
+    print(f"overhead:     {(instrumented - baseline) * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Runs the end-to-end benchmark scenarios and saves the results as JSON.
+
+    python -m benchmarks.run --scale small --requests 200 --concurrency 4
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+from dataclasses import asdict
+from datetime import datetime
+
+from benchmarks.harness import (
+    SCENARIOS,
+    create_bench_app,
+    create_bench_engine,
+    load_context,
+    run_scenario,
+)
+from benchmarks.seed import SCALES, seed
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/bench.db")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--no-seed", action="store_true", help="Reuse the existing dataset"
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=[scenario.name for scenario in SCENARIOS],
+        default=[scenario.name for scenario in SCENARIOS],
+    )
+    parser.add_argument("--output-dir", default="benchmarks/results")
+    args = parser.parse_args()
+
+    engine = create_bench_engine(args.database_url)
+    if not args.no_seed:
+        seed(engine, SCALES[args.scale], args.seed)
+    app = create_bench_app(engine)
+    context = load_context(engine, app)
+
+    revision = git_revision()
+    results = {
+        "meta": {
+            "revision": revision,
+            "time": datetime.utcnow().isoformat(),
+            "database": engine.dialect.name,
+            "scale": asdict(SCALES[args.scale]),
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "scenarios": {},
+    }
+    print(
+        f"{'scenario':16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+        f"{'queries':>10}{'errors':>8}"
+    )
+    for scenario in SCENARIOS:
+        if scenario.name not in args.scenarios:
+            continue
+        stats = run_scenario(
+            app, scenario, context, args.requests, args.concurrency, seed=args.seed
+        )
+        results["scenarios"][scenario.name] = stats
+        print(
+            f"{scenario.name:16}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+            f"{stats['p99_ms']:>10}{stats['throughput_rps']:>10}"
+            f"{stats['queries_per_request']:>10}{stats['errors']:>8}"
+        )
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    path = os.path.join(args.output_dir, f"{timestamp}-{revision}.json")
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Seeds a benchmark database with users, tags, posts and comments.
+
+    python -m benchmarks.seed --database-url sqlite:///benchmarks/bench.db --scale small
+"""
+import argparse
+from dataclasses import asdict, dataclass
+
+from sqlalchemy.engine import Engine
+
+from benchmarks.datagen import PASSWORD, DataGenerator
+from database.models import Base
+
+
+@dataclass
+class Scale:
+    users: int
+    tags: int
+    posts: int
+    comments: int
+
+
+SCALES = {
+    "small": Scale(users=50, tags=20, posts=500, comments=2_000),
+    "medium": Scale(users=500, tags=100, posts=10_000, comments=50_000),
+    "large": Scale(users=5_000, tags=500, posts=100_000, comments=1_000_000),
+}
+
+
+def seed(engine: Engine, scale: Scale, seed: int = 42):
+    """
+    :param engine: Engine of the benchmark database, its tables are recreated
+    :param scale: Number of rows to create per model
+    :param seed: Random seed, the same seed always produces the same dataset
+
+    Recreates the schema and fills it with a deterministic dataset. Every
+    user is active and verified and shares the password PASSWORD.
+    """
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    generator = DataGenerator(
+        scale.users, scale.tags, scale.posts, scale.comments, seed
+    )
+    generator.write(engine, log=lambda line: None)
+
+
+def main():
+    from benchmarks.harness import create_bench_engine
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/bench.db")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    scale = SCALES[args.scale]
+    seed(create_bench_engine(args.database_url), scale, args.seed)
+    print(f"Seeded {args.database_url}: {asdict(scale)}")
+
+
+if __name__ == "__main__":
+    main()
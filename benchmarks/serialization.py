@@ -0,0 +1,116 @@
+"""
+Compares pydantic response_model serialization with the trusted serializers.
+
+    python -m benchmarks.serialization --repeat 50
+
+For every endpoint the same ORM objects are turned into response bytes the
+way FastAPI does with response_model (validation, jsonable_encoder and the
+stdlib json encoder) and with trusted_response (attribute reads and orjson).
+Both outputs are checked to decode to the same JSON.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Callable, List, Tuple
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy.orm import Session
+
+from app.repositories import CommentRepository, PostRepository, TagRepository
+from app.schemas import (
+    CommentRead,
+    PostRead,
+    PostReadWithTags,
+    TagRead,
+    TagReadWithPosts,
+)
+from app.utils import trusted_response
+from benchmarks.harness import create_bench_engine
+from benchmarks.seed import SCALES, seed
+from database.session import create_session_factory
+
+
+def endpoints(db: Session) -> List[Tuple[str, type, object, bool]]:
+    tag_repository = TagRepository(db=db)
+    post_repository = PostRepository(db=db, tag_repository=tag_repository)
+    comment_repository = CommentRepository(db=db, post_repository=post_repository)
+    return [
+        ("GET /blogs/posts", PostRead, post_repository.get_all(limit=100), True),
+        (
+            "GET /blogs/posts/{slug}",
+            PostReadWithTags,
+            post_repository.get_by_slug("post-1"),
+            False,
+        ),
+        ("GET /blogs/tags", TagRead, tag_repository.get_all(limit=100), True),
+        (
+            "GET /blogs/tags/{slug}",
+            TagReadWithPosts,
+            tag_repository.get_by_slug("tag-1"),
+            False,
+        ),
+        (
+            "GET /blogs/comments",
+            CommentRead,
+            comment_repository.get_all(limit=100),
+            True,
+        ),
+    ]
+
+
+def pydantic_body(schema: type, obj, many: bool) -> bytes:
+    field = create_response_field(
+        name=f"Response_{schema.__name__}", type_=List[schema] if many else schema
+    )
+    content = asyncio.run(
+        serialize_response(field=field, response_content=obj, is_coroutine=True)
+    )
+    return JSONResponse(content).body
+
+
+def trusted_body(schema: type, obj, many: bool) -> bytes:
+    return trusted_response(schema, obj, many=many).body
+
+
+def measure(function: Callable[[], bytes], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/bench.db")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_bench_engine(args.database_url)
+    seed(engine, SCALES[args.scale])
+    print(
+        f"{'endpoint':28}{'bytes':>10}{'pydantic ms':>14}{'trusted ms':>12}{'speedup':>9}"
+    )
+    with create_session_factory(engine)() as db:
+        for name, schema, obj, many in endpoints(db):
+            # Also loads any lazy attributes so both paths see the same objects
+            expected = json.loads(pydantic_body(schema, obj, many))
+            body = trusted_body(schema, obj, many)
+            if json.loads(body) != expected:
+                raise SystemExit(f"{name}: trusted output differs from pydantic")
+            slow = measure(lambda: pydantic_body(schema, obj, many), args.repeat)
+            fast = measure(lambda: trusted_body(schema, obj, many), args.repeat)
+            print(
+                f"{name:28}{len(body):>10}{slow * 1000:>14.2f}{fast * 1000:>12.2f}"
+                f"{slow / fast:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Measures the memory of concurrent resumable image uploads.
+
+    python -m benchmarks.uploads --uploads 100 --size 8
+
+Each upload sends --size MiB with one PUT, in 64 KiB messages as a server
+receives them, to the application in this process. Reports the peak of the
+memory Python allocated while the uploads ran, per upload and against the
+bytes sent, and the throughput. For comparison, it then sends the same
+bodies to an endpoint reading the whole body, the pattern streaming
+replaces. Uploads are a small JPEG padded to their size, so completing
+them costs little next to receiving them.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from typing import Callable, List
+
+from fastapi.testclient import TestClient
+from PIL import Image
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.utils.images import image_storage
+from app.utils.uploads import upload_store
+from benchmarks.datagen import PASSWORD
+from benchmarks.harness import create_bench_app, create_bench_engine
+from benchmarks.seed import SCALES, seed
+
+MESSAGE_SIZE = 64 * 1024
+MIB = 1024 * 1024
+
+
+def upload_body(index: int, size: int) -> Callable[[int], bytes]:
+    """
+    :param index: Makes each upload a different image
+    :param size: Bytes of the upload
+    :return: Returns the body's next message from an offset, without holding
+        the body
+    """
+    buffer = BytesIO()
+    Image.new("RGB", (64, 64), (index % 256, 80, 160)).save(buffer, "JPEG")
+    # Decoders stop at the end of the JPEG, the padding only makes it larger
+    head = buffer.getvalue() + index.to_bytes(4, "big")
+
+    def message(offset: int) -> bytes:
+        end = min(offset + MESSAGE_SIZE, size)
+        if offset >= len(head):
+            return bytes(end - offset)
+        return head[offset:end] + bytes(max(0, end - len(head)))
+
+    return message
+
+
+async def put(app, path: str, headers: List[tuple], size: int, body) -> int:
+    """
+    :return: Status of the response
+    """
+    offset = 0
+    status = 0
+
+    async def receive():
+        nonlocal offset
+        # Lets the other uploads run, as a socket read would
+        await asyncio.sleep(0)
+        data = body(offset)
+        offset += len(data)
+        return {"type": "http.request", "body": data, "more_body": offset < size}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "PUT",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 50000),
+        "root_path": "",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": headers + [(b"content-length", str(size).encode())],
+    }
+    await app(scope, receive, send)
+    return status
+
+
+async def buffered_app(scope, receive, send):
+    body = await Request(scope, receive).body()
+    await Response(str(len(body)))(scope, receive, send)
+
+
+def measure(run) -> tuple:
+    """
+    :return: Result of `run`, peak bytes allocated above those allocated
+        before and seconds taken
+    """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak - before, elapsed
+
+
+def report(name: str, peak: int, elapsed: float, uploads: int, size: int):
+    total = uploads * size
+    print(
+        f"{name:10} peak {peak / MIB:8.1f} MiB  "
+        f"{peak / uploads / 1024:8.0f} KiB per upload  "
+        f"{peak / total:6.1%} of the bytes sent  "
+        f"{total / MIB / elapsed:7.0f} MiB/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/uploads.db")
+    parser.add_argument("--uploads", type=int, default=100)
+    parser.add_argument("--size", type=float, default=8, help="MiB per upload")
+    args = parser.parse_args()
+    size = int(args.size * MIB)
+
+    engine = create_bench_engine(args.database_url)
+    seed(engine, SCALES["small"])
+    app = create_bench_app(engine)
+    client = TestClient(app)
+    token = client.post(
+        "/auth/login", json={"username": "user1", "password": PASSWORD}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with tempfile.TemporaryDirectory() as directory:
+        upload_store.directory = os.path.join(directory, "uploads")
+        image_storage.root = os.path.join(directory, "images")
+        upload_ids = [
+            client.post("/images/uploads", json={"size": size}, headers=headers).json()[
+                "id"
+            ]
+            for _ in range(args.uploads)
+        ]
+        bodies = [upload_body(index, size) for index in range(args.uploads)]
+        auth = [(b"authorization", f"Bearer {token}".encode())]
+
+        async def streamed():
+            return await asyncio.gather(
+                *(
+                    put(app, f"/images/uploads/{upload_id}", auth, size, body)
+                    for upload_id, body in zip(upload_ids, bodies)
+                )
+            )
+
+        async def buffered():
+            return await asyncio.gather(
+                *(put(buffered_app, "/", [], size, body) for body in bodies)
+            )
+
+        print(f"{args.uploads} concurrent uploads of {args.size:g} MiB")
+        statuses, peak, elapsed = measure(lambda: asyncio.run(streamed()))
+        report("streamed", peak, elapsed, args.uploads, size)
+        failed = sum(status != 200 for status in statuses)
+        _, peak, elapsed = measure(lambda: asyncio.run(buffered()))
+        report("buffered", peak, elapsed, args.uploads, size)
+
+    if failed:
+        print(f"{failed} uploads failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
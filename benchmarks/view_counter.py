@@ -0,0 +1,153 @@
+"""
+Drives the post view counter at a target rate and checks no view is lost.
+
+    python -m benchmarks.view_counter --rate 10000 --seconds 10 --threads 8
+
+Threads record views of Zipf distributed posts at the target rate while the
+counter flushes them to post_stats in the background. Reports the achieved
+rate, the latency of recording a view and the flushes, then stops the
+counter and compares the views in post_stats with the views recorded. For
+comparison, it first measures one upsert per view, the write pattern the
+counter replaces.
+"""
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+from typing import List
+
+from sqlalchemy import func, select
+
+from app.middlewares.view_counter import ViewCounter, upsert_views
+from benchmarks.harness import create_bench_engine
+from benchmarks.seed import SCALES, seed
+from database.models import Post, PostStats
+
+
+def direct_rate(engine, post_ids: List[int], seconds: float) -> float:
+    """
+    :return: Views per second written with one upsert transaction each
+    """
+    rng = random.Random(1)
+    views = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        with engine.begin() as connection:
+            upsert_views(connection, {rng.choice(post_ids): 1})
+        views += 1
+    return views / (time.perf_counter() - start)
+
+
+def drive(
+    counter: ViewCounter,
+    post_ids: List[int],
+    weights: List[float],
+    rate: float,
+    seconds: float,
+    thread: int,
+    threads: int,
+    latencies: List[float],
+) -> int:
+    rng = random.Random(thread)
+    tick = 0.01
+    per_tick = rate * tick / threads
+    carry = 0.0
+    views = 0
+    start = time.perf_counter()
+    next_tick = start
+    while next_tick - start < seconds:
+        carry += per_tick
+        batch = rng.choices(post_ids, weights, k=int(carry))
+        carry -= len(batch)
+        for post_id in batch:
+            began = time.perf_counter()
+            counter.increment(post_id)
+            latencies.append(time.perf_counter() - began)
+        views += len(batch)
+        next_tick += tick
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    return views
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/bench.db")
+    parser.add_argument("--scale", choices=SCALES, default="medium")
+    parser.add_argument("--rate", type=float, default=10_000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--direct-seconds", type=float, default=2)
+    args = parser.parse_args()
+
+    engine = create_bench_engine(args.database_url)
+    seed(engine, SCALES[args.scale])
+    with engine.connect() as connection:
+        post_ids = list(connection.execute(select(Post.id)).scalars())
+    weights = [1 / rank**args.zipf for rank in range(1, len(post_ids) + 1)]
+
+    if args.direct_seconds > 0:
+        print(
+            f"one upsert per view: "
+            f"{direct_rate(engine, post_ids, args.direct_seconds):,.0f} views/s"
+        )
+        with engine.begin() as connection:
+            connection.execute(PostStats.__table__.delete())
+
+    counter = ViewCounter(engine, flush_interval=args.flush_interval)
+    counter.start()
+    latencies: List[List[float]] = [[] for _ in range(args.threads)]
+    counts = [0] * args.threads
+
+    def run(thread: int):
+        counts[thread] = drive(
+            counter,
+            post_ids,
+            weights,
+            args.rate,
+            args.seconds,
+            thread,
+            args.threads,
+            latencies[thread],
+        )
+
+    workers = [
+        threading.Thread(target=run, args=(thread,)) for thread in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    flushes = counter.flushes
+    counter.stop()
+
+    recorded = sum(counts)
+    with engine.connect() as connection:
+        stored = connection.execute(select(func.sum(PostStats.views))).scalar() or 0
+    samples = sorted(latency for thread in latencies for latency in thread)
+    print(
+        f"aggregated: {recorded / elapsed:,.0f} views/s "
+        f"(target {args.rate:,.0f}), {recorded:,} views over {elapsed:.1f}s"
+    )
+    print(
+        f"increment latency: p50 {statistics.median(samples) * 1e6:.1f}us "
+        f"p99 {samples[int(len(samples) * 0.99)] * 1e6:.1f}us"
+    )
+    print(f"flushes: {flushes} during the run, last took {counter.last_flush_ms:.1f}ms")
+    print(f"stored {stored:,} of {recorded:,} views")
+    if stored != recorded:
+        sys.exit("Views were lost")
+    if recorded / elapsed < args.rate * 0.95:
+        sys.exit("Target rate not reached")
+
+
+if __name__ == "__main__":
+    main()
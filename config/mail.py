@@ -1,22 +1,71 @@
+import asyncio
+import logging
 import os
+import threading
+from functools import lru_cache
+from typing import List, Tuple
 from fastapi import BackgroundTasks
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
 
 from config.settings import settings
 from app.schemas import EmailSchema
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.EMAIL_USERNAME,
-    MAIL_PASSWORD=settings.EMAIL_PASSWORD,
-    MAIL_SERVER=settings.EMAIL_SERVER,
-    MAIL_PORT=settings.EMAIL_PORT,
-    MAIL_FROM=settings.EMAIL_FROM,
-    MAIL_FROM_NAME=settings.PROJECT_TITLE,
-    TEMPLATE_FOLDER=os.path.join(os.getcwd(), "app/email_templates"),
-    MAIL_TLS=True,
-    MAIL_SSL=False,
-    USE_CREDENTIALS=True,
-)
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_mail():
+    """
+    :return: The FastMail client
+
+    fastapi-mail pulls in aioredis and the email validators, so it is imported
+    on the first email sent rather than on every worker boot.
+    """
+    from fastapi_mail import FastMail, ConnectionConfig
+
+    conf = ConnectionConfig(
+        MAIL_USERNAME=settings.EMAIL_USERNAME,
+        MAIL_PASSWORD=settings.EMAIL_PASSWORD,
+        MAIL_SERVER=settings.EMAIL_SERVER,
+        MAIL_PORT=settings.EMAIL_PORT,
+        MAIL_FROM=settings.EMAIL_FROM,
+        MAIL_FROM_NAME=settings.PROJECT_TITLE,
+        TEMPLATE_FOLDER=os.path.join(os.getcwd(), "app/email_templates"),
+        MAIL_TLS=True,
+        MAIL_SSL=False,
+        USE_CREDENTIALS=True,
+    )
+    return FastMail(config=conf)
+
+
+email_queue = {"pending": 0, "sent": 0, "failed": 0}
+email_queue_lock = threading.Lock()
+
+
+def queue_stats() -> dict:
+    """
+    :return: Number of pending, sent and failed emails
+
+    Returns the state of the background email queue.
+    """
+    with email_queue_lock:
+        return dict(email_queue)
+
+
+def _count_email(key: str, amount: int = 1):
+    with email_queue_lock:
+        email_queue[key] += amount
+
+
+async def _send_message(fm, message, template_name: str):
+    try:
+        await fm.send_message(message, template_name=template_name)
+    except Exception:
+        _count_email("failed")
+        raise
+    else:
+        _count_email("sent")
+    finally:
+        _count_email("pending", -1)
 
 
 def send_email(
@@ -25,9 +74,50 @@ def send_email(
     email: EmailSchema,
     template_name: str,
 ):
+    from fastapi_mail import MessageSchema
+
     message = MessageSchema(
         subject=subject, recipients=email.emails, template_body=email.body
     )
 
-    fm = FastMail(config=conf)
-    background_tasks.add_task(fm.send_message, message, template_name=template_name)
+    fm = get_mail()
+    _count_email("pending")
+    background_tasks.add_task(_send_message, fm, message, template_name)
+
+
+def send_emails(
+    emails: List[Tuple[str, EmailSchema]], template_name: str, concurrency: int = 10
+) -> List[bool]:
+    """
+    :param emails: Subject and recipients of each email
+    :param template_name: Template rendered with each email's body
+    :param concurrency: Emails sent at once
+    :return: Whether each email was sent
+
+    Sends emails outside of a request, e.g. from a job, and waits for them.
+    """
+    from fastapi_mail import MessageSchema
+
+    fm = get_mail()
+
+    async def send_all() -> List[bool]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send(subject: str, email: EmailSchema) -> bool:
+            message = MessageSchema(
+                subject=subject, recipients=email.emails, template_body=email.body
+            )
+            async with semaphore:
+                try:
+                    await _send_message(fm, message, template_name)
+                except Exception:
+                    logger.exception("Could not send %s", template_name)
+                    return False
+                return True
+
+        return await asyncio.gather(
+            *(send(subject, email) for subject, email in emails)
+        )
+
+    _count_email("pending", len(emails))
+    return asyncio.run(send_all())
@@ -0,0 +1,132 @@
+import logging
+import os
+import resource
+import sys
+
+from gunicorn.app.base import BaseApplication
+from gunicorn.arbiter import Arbiter
+from uvicorn.server import Server
+from uvicorn.workers import UvicornWorker
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def private_memory_mb() -> float:
+    """
+    :return: Memory used by this process alone in MiB
+
+    Workers share the pages of the preloaded app with the master until they
+    write to them, so resident size would overstate what a worker owns.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as file:
+            private_kb = sum(
+                int(line.split()[1])
+                for line in file
+                if line.startswith(("Private_Clean:", "Private_Dirty:"))
+            )
+        return private_kb / 1024
+    except (OSError, ValueError):
+        # Peak resident size where /proc is unavailable, enough to catch leaks
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+class Worker(UvicornWorker):
+    """
+    Uvicorn worker that also exits once it uses more than SERVER_MAX_MEMORY_MB,
+    the master then replaces it with a fresh fork of the preloaded app
+    """
+
+    # uvloop and httptools when installed, asyncio and h11 otherwise
+    CONFIG_KWARGS = {"loop": "auto", "http": "auto"}
+
+    server = None
+
+    async def _serve(self):
+        self.config.app = self.wsgi
+        self.server = Server(config=self.config)
+        await self.server.serve(sockets=self.sockets)
+        if not self.server.started:
+            sys.exit(Arbiter.WORKER_BOOT_ERROR)
+
+    async def callback_notify(self):
+        # Called by the server every `timeout / 2` seconds
+        self.notify()
+        limit = settings.SERVER_MAX_MEMORY_MB
+        if limit and self.server is not None and not self.server.should_exit:
+            used = private_memory_mb()
+            if used > limit:
+                logger.warning(
+                    "Worker %s uses %.0f MiB (limit %s MiB), recycling",
+                    self.pid,
+                    used,
+                    limit,
+                )
+                self.server.should_exit = True
+
+
+def post_fork(server, worker):
+    # Connections opened while preloading must not be shared across processes
+    from database.session import engine
+
+    engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+class Application(BaseApplication):
+    """
+    Gunicorn master running `Worker` processes forked from a preloaded app
+    """
+
+    def __init__(self, app_path: str, options: dict):
+        self.app_path = app_path
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from gunicorn.util import import_app
+
+        return import_app(self.app_path)
+
+
+def run(app_path: str, host: str, port: int, workers: int):
+    """
+    :param app_path: Application to serve, e.g. "main:app"
+    :param host: Interface to bind
+    :param port: Port to bind
+    :param workers: Number of worker processes
+
+    Serves the app with a gunicorn master and uvicorn workers. The app is
+    imported once before forking so workers share its memory pages, and
+    workers are recycled after SERVER_MAX_REQUESTS requests (with jitter so
+    they don't restart together) or SERVER_MAX_MEMORY_MB. On SIGTERM workers
+    stop accepting connections and get SERVER_GRACEFUL_TIMEOUT seconds to
+    finish in-flight requests.
+    """
+    options = {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "config.server.Worker",
+        "preload_app": True,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "timeout": settings.SERVER_TIMEOUT,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "keepalive": settings.SERVER_KEEPALIVE,
+        "post_fork": post_fork,
+        "child_exit": child_exit,
+    }
+    Application(app_path, options).run()
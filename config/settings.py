@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 
 from decouple import config
 from pydantic import BaseModel
@@ -12,15 +12,21 @@ class Settings(BaseModel):
     )
     PROJECT_VERSION: str = "0.0.1"
 
-    # Database settings
+    # Database settings, DATABASE_URL takes precedence over the DB_* parts
+    # and accepts any SQLAlchemy URL, e.g. sqlite:///steptzi.db or sqlite://
+    DATABASE_URL: str = config("DATABASE_URL", default=None)
     DB_HOST: str = config("DB_HOST", default="localhost")
     DB_PORT: int = config("DB_PORT", default=5432, cast=int)
-    DB_USER: str = config("DB_USER")
-    DB_PASSWORD: str = config("DB_PASSWORD")
-    DB_NAME: str = config("DB_NAME")
-    DB_URI: str = (
+    DB_USER: str = config("DB_USER", default=None)
+    DB_PASSWORD: str = config("DB_PASSWORD", default=None)
+    DB_NAME: str = config("DB_NAME", default=None)
+    DB_URI: str = DATABASE_URL or (
         f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     )
+    # On startup, fail unless migrations are applied; creating the tables
+    # instead is meant for throwaway SQLite databases
+    DB_CHECK_REVISION: bool = config("DB_CHECK_REVISION", default=True, cast=bool)
+    DB_CREATE_TABLES: bool = config("DB_CREATE_TABLES", default=False, cast=bool)
 
     # Security settings
     SECRET_KEY: str = config("SECRET_KEY")
@@ -56,5 +62,211 @@ class Settings(BaseModel):
 
     FRONTEND_URL: str = config("FRONTEND_URL", default=None)
 
+    # Server settings, SERVER_WORKERS=0 starts one worker per CPU and
+    # SERVER_MAX_MEMORY_MB=0 disables memory based recycling
+    SERVER_WORKERS: int = config("SERVER_WORKERS", default=0, cast=int)
+    SERVER_MAX_REQUESTS: int = config("SERVER_MAX_REQUESTS", default=10000, cast=int)
+    SERVER_MAX_REQUESTS_JITTER: int = config(
+        "SERVER_MAX_REQUESTS_JITTER", default=1000, cast=int
+    )
+    SERVER_MAX_MEMORY_MB: int = config("SERVER_MAX_MEMORY_MB", default=0, cast=int)
+    SERVER_TIMEOUT: int = config("SERVER_TIMEOUT", default=60, cast=int)
+    SERVER_GRACEFUL_TIMEOUT: int = config(
+        "SERVER_GRACEFUL_TIMEOUT", default=30, cast=int
+    )
+    SERVER_KEEPALIVE: int = config("SERVER_KEEPALIVE", default=5, cast=int)
+
+    # Rate limit settings
+    RATE_LIMIT_ENABLED: bool = config("RATE_LIMIT_ENABLED", default=True, cast=bool)
+    RATE_LIMIT_BACKEND: str = config("RATE_LIMIT_BACKEND", default="memory")
+    RATE_LIMIT_REDIS_URL: str = config("RATE_LIMIT_REDIS_URL", default=None)
+    # Only behind proxies that append the client address to X-Forwarded-For,
+    # RATE_LIMIT_FORWARDED_HOPS of them
+    RATE_LIMIT_TRUST_FORWARDED: bool = config(
+        "RATE_LIMIT_TRUST_FORWARDED", default=False, cast=bool
+    )
+    RATE_LIMIT_FORWARDED_HOPS: int = config(
+        "RATE_LIMIT_FORWARDED_HOPS", default=1, cast=int
+    )
+    RATE_LIMITS: Dict[str, str] = {
+        "POST /auth/login": "10/minute",
+        "POST /auth/register": "5/hour",
+        "GET /auth/reset-password": "5/hour",
+        "POST /auth/reset-password/confirm": "10/hour",
+        "GET /auth/email-verify": "5/hour",
+        "POST /blogs/posts": "30/hour",
+        "POST /blogs/comments": "60/hour",
+    }
+
+    # Compression settings, responses below the minimum size are sent as is
+    COMPRESSION_ENABLED: bool = config("COMPRESSION_ENABLED", default=True, cast=bool)
+    COMPRESSION_MINIMUM_SIZE: int = config(
+        "COMPRESSION_MINIMUM_SIZE", default=500, cast=int
+    )
+    COMPRESSION_GZIP_LEVEL: int = config("COMPRESSION_GZIP_LEVEL", default=6, cast=int)
+    COMPRESSION_BROTLI_QUALITY: int = config(
+        "COMPRESSION_BROTLI_QUALITY", default=5, cast=int
+    )
+
+    # Response cache settings, anonymous GET requests to these routes are
+    # cached per worker until a write under /blogs or the TTL expires
+    RESPONSE_CACHE_ENABLED: bool = config(
+        "RESPONSE_CACHE_ENABLED", default=True, cast=bool
+    )
+    RESPONSE_CACHE_TTL: int = config("RESPONSE_CACHE_TTL", default=10, cast=int)
+    RESPONSE_CACHE_MAX_ENTRIES: int = config(
+        "RESPONSE_CACHE_MAX_ENTRIES", default=1000, cast=int
+    )
+    RESPONSE_CACHE_ROUTES: List[str] = [
+        "GET /blogs/posts",
+        "GET /blogs/posts/featured",
+        "GET /blogs/posts/{slug}",
+        "GET /blogs/tags",
+        "GET /blogs/tags/{slug}",
+    ]
+
+    # View counter settings, views are written to post_stats in batches
+    VIEW_COUNTER_ENABLED: bool = config("VIEW_COUNTER_ENABLED", default=True, cast=bool)
+    VIEW_COUNTER_FLUSH_INTERVAL: float = config(
+        "VIEW_COUNTER_FLUSH_INTERVAL", default=5.0, cast=float
+    )
+    VIEW_COUNTER_MAX_PENDING: int = config(
+        "VIEW_COUNTER_MAX_PENDING", default=10000, cast=int
+    )
+
+    # Trending posts, scored from the views and comments of the last
+    # TRENDING_WINDOW_HOURS, each counting half after TRENDING_HALF_LIFE_HOURS,
+    # by the trending job. Workers reload its results every TRENDING_INTERVAL
+    TRENDING_ENABLED: bool = config("TRENDING_ENABLED", default=True, cast=bool)
+    TRENDING_INTERVAL: float = config("TRENDING_INTERVAL", default=10.0, cast=float)
+    TRENDING_SIZE: int = config("TRENDING_SIZE", default=100, cast=int)
+    TRENDING_WINDOW_HOURS: int = config("TRENDING_WINDOW_HOURS", default=72, cast=int)
+    TRENDING_HALF_LIFE_HOURS: float = config(
+        "TRENDING_HALF_LIFE_HOURS", default=12.0, cast=float
+    )
+    TRENDING_VIEW_WEIGHT: float = config(
+        "TRENDING_VIEW_WEIGHT", default=1.0, cast=float
+    )
+    TRENDING_COMMENT_WEIGHT: float = config(
+        "TRENDING_COMMENT_WEIGHT", default=10.0, cast=float
+    )
+
+    # Author profiles, cached per worker until the author writes or the TTL
+    PROFILE_TOP_TAGS: int = config("PROFILE_TOP_TAGS", default=5, cast=int)
+    PROFILE_LATEST_POSTS: int = config("PROFILE_LATEST_POSTS", default=5, cast=int)
+    PROFILE_CACHE_TTL: float = config("PROFILE_CACHE_TTL", default=60.0, cast=float)
+    PROFILE_CACHE_MAX_ENTRIES: int = config(
+        "PROFILE_CACHE_MAX_ENTRIES", default=10000, cast=int
+    )
+
+    # Related posts, computed by app.services.related_services from the posts'
+    # TF-IDF vectors and tags, RELATED_TAG_WEIGHT being the share of the tags
+    RELATED_SIZE: int = config("RELATED_SIZE", default=5, cast=int)
+    RELATED_MIN_SCORE: float = config("RELATED_MIN_SCORE", default=0.1, cast=float)
+    RELATED_TAG_WEIGHT: float = config("RELATED_TAG_WEIGHT", default=0.3, cast=float)
+    RELATED_BATCH_SIZE: int = config("RELATED_BATCH_SIZE", default=256, cast=int)
+
+    # Home timelines, new posts are written to their followers' timelines by a
+    # background thread per worker, TIMELINE_FANOUT_BACKGROUND=False writes
+    # them during the request. Posts of tags with more followers than
+    # TIMELINE_TAG_FANOUT_MAX_FOLLOWERS are pulled from the tag on reads instead
+    TIMELINE_FANOUT_BACKGROUND: bool = config(
+        "TIMELINE_FANOUT_BACKGROUND", default=True, cast=bool
+    )
+    TIMELINE_FANOUT_BATCH_SIZE: int = config(
+        "TIMELINE_FANOUT_BATCH_SIZE", default=1000, cast=int
+    )
+    TIMELINE_TAG_FANOUT_MAX_FOLLOWERS: int = config(
+        "TIMELINE_TAG_FANOUT_MAX_FOLLOWERS", default=10000, cast=int
+    )
+    # Recent posts of an author or tag added to a timeline when following it
+    TIMELINE_BACKFILL: int = config("TIMELINE_BACKFILL", default=50, cast=int)
+
+    # Notifications of replies and comments, emailed as one digest per user by
+    # each run of app.services.notification_services, listing the latest
+    # NOTIFICATION_DIGEST_MAX_ITEMS unread ones
+    NOTIFICATION_DIGEST_MAX_ITEMS: int = config(
+        "NOTIFICATION_DIGEST_MAX_ITEMS", default=10, cast=int
+    )
+    NOTIFICATION_DIGEST_BATCH_SIZE: int = config(
+        "NOTIFICATION_DIGEST_BATCH_SIZE", default=500, cast=int
+    )
+    NOTIFICATION_DIGEST_CONCURRENCY: int = config(
+        "NOTIFICATION_DIGEST_CONCURRENCY", default=10, cast=int
+    )
+
+    # Uploaded images, kept under IMAGE_STORAGE_DIR and linked from IMAGE_URL,
+    # which can be a CDN or a web server serving the directory. Each image is
+    # resized to IMAGE_WIDTHS in WebP and JPEG by a pool of IMAGE_WORKERS
+    # processes per application worker, or during the upload when it is 0
+    IMAGE_STORAGE_DIR: str = config("IMAGE_STORAGE_DIR", default="media/images")
+    IMAGE_URL: str = config("IMAGE_URL", default="/images")
+    IMAGE_WIDTHS: List[int] = [320, 640, 1024, 1600]
+    IMAGE_QUALITY: int = config("IMAGE_QUALITY", default=80, cast=int)
+    IMAGE_WORKERS: int = config("IMAGE_WORKERS", default=2, cast=int)
+    IMAGE_MAX_BYTES: int = config("IMAGE_MAX_BYTES", default=10485760, cast=int)
+    IMAGE_MAX_PIXELS: int = config("IMAGE_MAX_PIXELS", default=40000000, cast=int)
+    # Originals and derivatives are named by their content, so they never
+    # change at a URL
+    IMAGE_MAX_AGE: int = config("IMAGE_MAX_AGE", default=31536000, cast=int)
+    # Resumable uploads are streamed to UPLOAD_DIR, on the same filesystem as
+    # IMAGE_STORAGE_DIR so completing one is a rename, UPLOAD_CHUNK_SIZE bytes
+    # at a time. Those not written to for UPLOAD_EXPIRE seconds are deleted by
+    # app.services.image_services
+    UPLOAD_DIR: str = config("UPLOAD_DIR", default="media/uploads")
+    UPLOAD_CHUNK_SIZE: int = config("UPLOAD_CHUNK_SIZE", default=262144, cast=int)
+    UPLOAD_EXPIRE: int = config("UPLOAD_EXPIRE", default=86400, cast=int)
+
+    # Feed and sitemap settings, links are SITE_URL followed by the page paths
+    SITE_URL: str = config("SITE_URL", default="http://localhost:8000")
+    SITE_POST_PATH: str = config("SITE_POST_PATH", default="/blogs/posts/{slug}")
+    SITE_TAG_PATH: str = config("SITE_TAG_PATH", default="/blogs/tags/{slug}")
+    FEED_SIZE: int = config("FEED_SIZE", default=50, cast=int)
+    FEED_TTL: int = config("FEED_TTL", default=300, cast=int)
+    FEED_MAX_AGE: int = config("FEED_MAX_AGE", default=300, cast=int)
+    SITEMAP_PAGE_SIZE: int = config("SITEMAP_PAGE_SIZE", default=10000, cast=int)
+    SITEMAP_MAX_AGE: int = config("SITEMAP_MAX_AGE", default=3600, cast=int)
+
+    # Metrics settings
+    METRICS_ENABLED: bool = config("METRICS_ENABLED", default=True, cast=bool)
+
+    # SQL profiler settings
+    SQL_PROFILER_SAMPLE_RATE: float = config(
+        "SQL_PROFILER_SAMPLE_RATE", default=0.0, cast=float
+    )
+    SQL_PROFILER_N_PLUS_ONE_THRESHOLD: int = config(
+        "SQL_PROFILER_N_PLUS_ONE_THRESHOLD", default=5, cast=int
+    )
+
+    # Slow query log settings
+    SLOW_QUERY_LOG_ENABLED: bool = config(
+        "SLOW_QUERY_LOG_ENABLED", default=False, cast=bool
+    )
+    SLOW_QUERY_THRESHOLD_MS: int = config(
+        "SLOW_QUERY_THRESHOLD_MS", default=200, cast=int
+    )
+    SLOW_QUERY_EXPLAIN: bool = config("SLOW_QUERY_EXPLAIN", default=True, cast=bool)
+    SLOW_QUERY_LOG_FILE: str = config("SLOW_QUERY_LOG_FILE", default=None)
+
+    # Concurrency limit settings
+    CONCURRENCY_LIMIT_ENABLED: bool = config(
+        "CONCURRENCY_LIMIT_ENABLED", default=True, cast=bool
+    )
+    CONCURRENCY_INITIAL_LIMIT: int = config(
+        "CONCURRENCY_INITIAL_LIMIT", default=20, cast=int
+    )
+    CONCURRENCY_MIN_LIMIT: int = config("CONCURRENCY_MIN_LIMIT", default=4, cast=int)
+    CONCURRENCY_MAX_LIMIT: int = config("CONCURRENCY_MAX_LIMIT", default=200, cast=int)
+    CONCURRENCY_EXPENSIVE_SHARE: float = config(
+        "CONCURRENCY_EXPENSIVE_SHARE", default=0.75, cast=float
+    )
+    CONCURRENCY_EXPENSIVE_ROUTES: List[str] = [
+        "GET /blogs/posts",
+        "GET /blogs/posts/featured",
+        "GET /blogs/posts/{slug}",
+        "GET /blogs/tags/{slug}",
+        "GET /blogs/comments",
+    ]
+
 
 settings = Settings()
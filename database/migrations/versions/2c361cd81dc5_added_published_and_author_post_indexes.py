@@ -0,0 +1,82 @@
+"""Added published and author post indexes
+
+Revision ID: 2c361cd81dc5
+Revises: 6450dd7f4b52
+Create Date: 2026-10-19 11:03:27.918245
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c361cd81dc5'
+down_revision = '6450dd7f4b52'
+branch_labels = None
+depends_on = None
+
+
+def existing_indexes(table):
+    """
+    Valid indexes of the table. A failed CREATE INDEX CONCURRENTLY leaves an
+    invalid index behind, it is dropped so the migration can be run again.
+    """
+    if context.is_offline_mode():
+        return set()
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        invalid = bind.execute(
+            sa.text(
+                "SELECT c.relname FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "JOIN pg_class t ON t.oid = i.indrelid "
+                "WHERE t.relname = :table AND NOT i.indisvalid"
+            ),
+            {'table': table},
+        ).scalars().all()
+        for name in invalid:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    return {index['name'] for index in sa.inspect(bind).get_indexes(table)}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        existing = existing_indexes('posts')
+        if 'ix_posts_published_updated_at_id' not in existing:
+            op.create_index(
+                'ix_posts_published_updated_at_id',
+                'posts',
+                ['updated_at', 'id'],
+                postgresql_where=sa.text('is_published'),
+                sqlite_where=sa.text('is_published = 1'),
+                postgresql_concurrently=True,
+            )
+        if 'ix_posts_author_id_updated_at' not in existing:
+            op.create_index(
+                'ix_posts_author_id_updated_at',
+                'posts',
+                ['author_id', 'updated_at'],
+                postgresql_concurrently=True,
+            )
+        # Lookups by author are served by the new index
+        if context.is_offline_mode() or 'ix_posts_author_id' in existing:
+            op.drop_index(
+                'ix_posts_author_id', table_name='posts', postgresql_concurrently=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_posts_author_id', 'posts', ['author_id'], postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_posts_author_id_updated_at',
+            table_name='posts',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_posts_published_updated_at_id',
+            table_name='posts',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,64 @@
+"""Added secondary indexes
+
+Revision ID: 6450dd7f4b52
+Revises: a7bf69c256ad
+Create Date: 2026-10-19 10:12:41.402318
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6450dd7f4b52'
+down_revision = 'a7bf69c256ad'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_posts_updated_at', 'posts', ['updated_at']),
+    ('ix_posts_author_id', 'posts', ['author_id']),
+    ('ix_comments_post_id', 'comments', ['post_id']),
+    ('ix_comments_parent_id', 'comments', ['parent_id']),
+    ('ix_comments_created_at', 'comments', ['created_at']),
+    ('ix_tags_created_at', 'tags', ['created_at']),
+    ('ix_tag_post_post_id_tag_id', 'tag_post', ['post_id', 'tag_id']),
+]
+
+
+def existing_indexes(table):
+    """
+    Valid indexes of the table. A failed CREATE INDEX CONCURRENTLY leaves an
+    invalid index behind, it is dropped so the migration can be run again.
+    """
+    if context.is_offline_mode():
+        return set()
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        invalid = bind.execute(
+            sa.text(
+                "SELECT c.relname FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "JOIN pg_class t ON t.oid = i.indrelid "
+                "WHERE t.relname = :table AND NOT i.indisvalid"
+            ),
+            {'table': table},
+        ).scalars().all()
+        for name in invalid:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    return {index['name'] for index in sa.inspect(bind).get_indexes(table)}
+
+
+def upgrade():
+    # CONCURRENTLY builds without blocking writes but can't run in a
+    # transaction, so each statement is committed on its own
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if name not in existing_indexes(table):
+                op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -1,4 +1,16 @@
 from database.session import Base
 from .users import User
 from .auth import UsedTokens
-from .blog import Post, Tag, TagPost, Comment
+from .blog import (
+    Post,
+    PostRelated,
+    PostStats,
+    PostViewsHourly,
+    Tag,
+    TagPost,
+    TrendingPost,
+    Comment,
+)
+from .notifications import Notification
+from .timelines import AuthorFollow, TagFollow, TimelineEntry
+from .images import Image, Upload
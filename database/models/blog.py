@@ -1,17 +1,22 @@
 import random
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     String,
     Integer,
     DateTime,
+    Float,
     ForeignKey,
+    Index,
     Table,
     Text,
     event,
     func,
+    select,
+    text,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import column_property, relationship
 from slugify import slugify
 
 from database.session import Base
@@ -26,6 +31,8 @@ TagPost = Table(
     Base.metadata,
     Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
     Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True),
+    # The primary key only serves lookups by tag
+    Index("ix_tag_post_post_id_tag_id", "post_id", "tag_id"),
 )
 
 
@@ -37,7 +44,10 @@ class Tag(Base):
     excerpt = Column(String(500), nullable=True, default=None)
     description = Column(Text, nullable=True, default=None)
     cover_image = Column(String(500), nullable=True, default=None)
-    created_at = Column(DateTime, server_default=func.now())
+    # Kept by follows and unfollows, decides whether the tag's posts are
+    # fanned out to timelines or pulled when reading them
+    follower_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, server_default=func.now(), index=True)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     posts = relationship("Post", secondary=TagPost, back_populates="tags")
@@ -61,13 +71,32 @@ class Post(Base):
     featured_image = Column(String(500), nullable=True, default=None)
     is_featured = Column(Boolean, default=False)
     is_published = Column(Boolean, default=False)
+    # One above the highest when the post is published, in the same
+    # transaction, retried when a concurrent publication took the value.
+    # Orders timelines by publication rather than creation
+    published_position = Column(BigInteger, nullable=True, unique=True, index=True)
     author_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    updated_at = Column(
+        DateTime, server_default=func.now(), onupdate=func.now(), index=True
+    )
 
     author = relationship("User", backref="posts")
     tags = relationship("Tag", secondary=TagPost, back_populates="posts")
 
+    __table_args__ = (
+        # Public listings, which only show published posts
+        Index(
+            "ix_posts_published_updated_at_id",
+            "updated_at",
+            "id",
+            postgresql_where=text("is_published"),
+            sqlite_where=text("is_published = 1"),
+        ),
+        # Authors' own posts, drafts included
+        Index("ix_posts_author_id_updated_at", "author_id", "updated_at"),
+    )
+
     @staticmethod
     def generate_slug(target, value, oldvalue, initiator):
         if value and (not target.slug):
@@ -80,12 +109,14 @@ class Post(Base):
 class Comment(Base):
     __tablename__ = "comments"
     id = Column(Integer, primary_key=True)
-    post_id = Column(Integer, ForeignKey("posts.id"))
+    post_id = Column(Integer, ForeignKey("posts.id"), index=True)
     author_id = Column(Integer, ForeignKey("users.id"))
-    parent_id = Column(Integer, ForeignKey("comments.id", ondelete="CASCADE"))
+    parent_id = Column(
+        Integer, ForeignKey("comments.id", ondelete="CASCADE"), index=True
+    )
     content = Column(Text)
 
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, server_default=func.now(), index=True)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     post = relationship("Post", backref="comments")
@@ -96,5 +127,78 @@ class Comment(Base):
         return f"<Comment(content='{self.content}')>"
 
 
+class PostStats(Base):
+    __tablename__ = "post_stats"
+    post_id = Column(
+        Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Written in batches by the view counter, not on every read
+    views = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<PostStats(post_id={self.post_id}, views={self.views})>"
+
+
+class PostViewsHourly(Base):
+    __tablename__ = "post_views_hourly"
+    post_id = Column(
+        Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Start of the hour, UTC
+    hour = Column(DateTime, primary_key=True, index=True)
+    views = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<PostViewsHourly(post_id={self.post_id}, hour={self.hour})>"
+
+
+class PostRelated(Base):
+    __tablename__ = "post_related"
+    post_id = Column(
+        Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True
+    )
+    related_post_id = Column(
+        Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Cosine similarity of the posts' text and tags
+    score = Column(Float, nullable=False)
+    computed_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        # Deleting a post cascades to the rows listing it as related
+        Index("ix_post_related_related_post_id", "related_post_id"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<PostRelated(post_id={self.post_id}, "
+            f"related_post_id={self.related_post_id})>"
+        )
+
+
+class TrendingPost(Base):
+    __tablename__ = "trending_posts"
+    post_id = Column(
+        Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Decayed weight of the post's views and comments, all rows are replaced
+    # by each run of the trending job
+    score = Column(Float, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<TrendingPost(post_id={self.post_id}, score={self.score})>"
+
+
+# Deferred so only the queries that show it pay for the subquery
+Post.views = column_property(
+    func.coalesce(
+        select(PostStats.views).where(PostStats.post_id == Post.id).scalar_subquery(),
+        0,
+    ),
+    deferred=True,
+)
+
 event.listen(Tag.title, "set", Tag.generate_slug)
 event.listen(Post.title, "set", Post.generate_slug)
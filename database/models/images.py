@@ -0,0 +1,37 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, func
+
+from database.session import Base
+
+
+class Image(Base):
+    __tablename__ = "images"
+    id = Column(Integer, primary_key=True)
+    # SHA-256 of the original, which names it and its derivatives in storage
+    hash = Column(String(64), unique=True, index=True, nullable=False)
+    uploader_id = Column(
+        Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    # Pillow format of the original, lowercased: jpeg, png, webp or gif
+    format = Column(String(10), nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    # Set once the derivatives are written, until then the original is served
+    processed_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<Image(hash='{self.hash}', {self.width}x{self.height})>"
+
+
+class Upload(Base):
+    __tablename__ = "uploads"
+    # Names the file under UPLOAD_DIR the upload's data is written to
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    # Bytes announced when the upload was created
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<Upload(id='{self.id}', size={self.size})>"
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, func, text
+
+from database.session import Base
+
+
+class Notification(Base):
+    __tablename__ = "notifications"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    comment_id = Column(
+        Integer, ForeignKey("comments.id", ondelete="CASCADE"), index=True
+    )
+    # "reply" to one of the user's comments or "comment" on one of their posts
+    kind = Column(String(20), nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    read_at = Column(DateTime, nullable=True)
+    # Set once the notification went out in a digest email, or was skipped
+    emailed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Users' notifications, newest first
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+        # Unread counts
+        Index(
+            "ix_notifications_user_id_unread",
+            "user_id",
+            postgresql_where=text("read_at IS NULL"),
+            sqlite_where=text("read_at IS NULL"),
+        ),
+        # Notifications waiting for the next digest
+        Index(
+            "ix_notifications_user_id_id_pending_email",
+            "user_id",
+            "id",
+            postgresql_where=text("emailed_at IS NULL"),
+            sqlite_where=text("emailed_at IS NULL"),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<Notification(user_id={self.user_id}, kind='{self.kind}')>"
@@ -0,0 +1,67 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, func
+
+from database.session import Base
+
+
+class AuthorFollow(Base):
+    __tablename__ = "author_follows"
+    follower_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    author_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        # Fan-out reads an author's followers in follower ID order
+        Index("ix_author_follows_author_id_follower_id", "author_id", "follower_id"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<AuthorFollow(follower_id={self.follower_id}, "
+            f"author_id={self.author_id})>"
+        )
+
+
+class TagFollow(Base):
+    __tablename__ = "tag_follows"
+    follower_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    tag_id = Column(
+        Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True
+    )
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        # Fan-out reads a tag's followers in follower ID order
+        Index("ix_tag_follows_tag_id_follower_id", "tag_id", "follower_id"),
+    )
+
+    def __repr__(self):
+        return f"<TagFollow(follower_id={self.follower_id}, tag_id={self.tag_id})>"
+
+
+class TimelineEntry(Base):
+    __tablename__ = "timeline_entries"
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    post_id = Column(
+        Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True
+    )
+    # The post's published_position when it was published
+    position = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        # Timelines are read latest published first with a range scan
+        Index("ix_timeline_entries_user_id_position", "user_id", "position"),
+        # Unpublishing and deleting a post remove it from every timeline
+        Index("ix_timeline_entries_post_id", "post_id"),
+    )
+
+    def __repr__(self):
+        return f"<TimelineEntry(user_id={self.user_id}, post_id={self.post_id})>"
@@ -0,0 +1,131 @@
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+IN_LIST = re.compile(
+    r"\(\s*(?:%\(\w+\)s|\?|:\w+)(?:\s*,\s*(?:%\(\w+\)s|\?|:\w+))*\s*\)"
+)
+PLACEHOLDER = re.compile(r"%\(\w+\)s|:\w+|\?")
+NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+STRING = re.compile(r"'(?:[^']|'')*'")
+WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_statement(statement: str) -> str:
+    """
+    :param statement: SQL statement as sent to the driver
+    :return: Statement shape with literals, placeholders and IN lists collapsed
+    """
+    statement = STRING.sub("?", statement)
+    statement = IN_LIST.sub("(?)", statement)
+    statement = PLACEHOLDER.sub("?", statement)
+    statement = NUMBER.sub("?", statement)
+    return WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryProfile:
+    """
+    SQL statements executed while serving one request
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Dict[str, List] = {}
+
+    def record(self, statement: str, duration: float):
+        """
+        :param statement: SQL statement as sent to the driver
+        :param duration: Execution time in seconds
+        """
+        self.count += 1
+        self.duration += duration
+        shape = normalize_statement(statement)
+        entry = self.statements.get(shape)
+        if entry is None:
+            self.statements[shape] = [1, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int, float]]:
+        """
+        :param threshold: Number of executions above which a shape is reported
+        :return: List of (shape, count, duration) for likely N+1 patterns
+        """
+        return sorted(
+            (
+                (shape, count, duration)
+                for shape, (count, duration) in self.statements.items()
+                if count > threshold
+            ),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def start_profile() -> QueryProfile:
+    """
+    :return: New profile that collects the statements of the current context
+
+    Profiles are plain mutable objects, so statements executed in the
+    threadpool (which runs with a copy of the request context) are recorded too.
+    """
+    profile = QueryProfile()
+    current_profile.set(profile)
+    return profile
+
+
+@contextmanager
+def count_queries():
+    """
+    Profiles the statements executed inside the block.
+
+        with count_queries() as profile:
+            repository.get_all()
+        assert profile.count <= 4
+    """
+    profile = QueryProfile()
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+
+
+def install_profiler(engine: Engine):
+    """
+    :param engine: Engine to instrument
+
+    Times every cursor execution while a profile is active.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if current_profile.get() is not None:
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        profile = current_profile.get()
+        if profile is not None and conn.info.get("query_start"):
+            duration = time.perf_counter() - conn.info["query_start"].pop()
+            profile.record(statement, duration)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
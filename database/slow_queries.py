@@ -0,0 +1,241 @@
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from database.profiler import normalize_statement
+
+logger = logging.getLogger(__name__)
+
+REPOSITORIES_DIR = os.path.join("app", "repositories")
+
+
+def find_origin() -> Optional[str]:
+    """
+    :return: "Class.method" of the innermost repository frame on the stack
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        if REPOSITORIES_DIR in frame.f_code.co_filename:
+            owner = frame.f_locals.get("self")
+            name = frame.f_code.co_name
+            return f"{type(owner).__name__}.{name}" if owner is not None else name
+        frame = frame.f_back
+    return None
+
+
+def format_parameters(parameters, max_length: int = 100):
+    if isinstance(parameters, dict):
+        return {key: repr(value)[:max_length] for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [repr(value)[:max_length] for value in parameters]
+    return repr(parameters)[:max_length]
+
+
+class SlowQueryLog:
+    """
+    Records statements slower than a threshold together with their origin and
+    query plan.
+
+    Recent entries are kept in a bounded ring and aggregated per statement
+    shape; with a file configured they are also appended as JSON lines to a
+    size rotated log. Plans are captured on a background thread, at most once
+    per shape every `explain_interval` seconds, so neither the request nor the
+    database pays for a plan on every slow execution.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 200,
+        explain: bool = True,
+        explain_interval: float = 600,
+        max_entries: int = 500,
+        max_shapes: int = 1000,
+        log_file: Optional[str] = None,
+        log_max_bytes: int = 10 * 1024 * 1024,
+        log_backup_count: int = 5,
+    ):
+        """
+        :param threshold_ms: Duration above which a statement is recorded
+        :param explain: Capture the query plan of slow SELECT statements
+        :param explain_interval: Seconds before the same shape is explained again
+        :param max_entries: Number of recent slow executions kept in memory
+        :param max_shapes: Number of statement shapes aggregated in memory
+        :param log_file: Path of the JSON lines file, None to keep memory only
+        :param log_max_bytes: Size at which the log file is rotated
+        :param log_backup_count: Number of rotated log files kept
+        """
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.max_shapes = max_shapes
+        self.entries = deque(maxlen=max_entries)
+        self.shapes: Dict[str, dict] = {}
+        self.engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self._explained_at: Dict[str, float] = {}
+        self._explain_queue = queue.Queue(maxsize=100)
+        self._worker: Optional[threading.Thread] = None
+
+        self.file_logger = None
+        if log_file:
+            self.file_logger = logging.getLogger(f"{__name__}.file")
+            self.file_logger.propagate = False
+            self.file_logger.setLevel(logging.INFO)
+            self.file_logger.addHandler(
+                RotatingFileHandler(
+                    log_file, maxBytes=log_max_bytes, backupCount=log_backup_count
+                )
+            )
+
+    def install(self, engine: Engine):
+        """
+        :param engine: Engine to watch
+        """
+        self.engine = engine
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+            conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+            starts = conn.info.get("slow_query_start")
+            if not starts:
+                return
+            duration = time.perf_counter() - starts.pop()
+            if duration >= self.threshold and not statement.startswith("EXPLAIN"):
+                self.record(statement, parameters, duration, find_origin())
+
+        @event.listens_for(engine, "handle_error")
+        def handle_error(exception_context):
+            conn = exception_context.connection
+            if conn is not None and conn.info.get("slow_query_start"):
+                conn.info["slow_query_start"].pop()
+
+    def record(
+        self, statement: str, parameters, duration: float, origin: Optional[str]
+    ):
+        """
+        :param statement: SQL statement as sent to the driver
+        :param parameters: Statement parameters
+        :param duration: Execution time in seconds
+        :param origin: Repository method that issued the statement
+        """
+        shape = normalize_statement(statement)
+        entry = {
+            "time": datetime.utcnow().isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "statement": shape,
+            "parameters": format_parameters(parameters),
+            "origin": origin,
+        }
+        with self._lock:
+            self.entries.append(entry)
+            stats = self.shapes.get(shape)
+            if stats is None:
+                if len(self.shapes) >= self.max_shapes:
+                    self._evict_cheapest()
+                stats = self.shapes[shape] = {
+                    "statement": shape,
+                    "origins": [],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "plan": None,
+                }
+            stats["count"] += 1
+            stats["total_ms"] += entry["duration_ms"]
+            stats["max_ms"] = max(stats["max_ms"], entry["duration_ms"])
+            stats["last_parameters"] = entry["parameters"]
+            if origin and origin not in stats["origins"]:
+                stats["origins"].append(origin)
+        if self.file_logger is not None:
+            self.file_logger.info(json.dumps(entry))
+        if self.explain and self.engine is not None:
+            self._schedule_explain(shape, statement, parameters)
+
+    def worst(self, limit: int = 20, order_by: str = "total_ms") -> List[dict]:
+        """
+        :param limit: Number of statement shapes to return
+        :param order_by: One of "total_ms", "max_ms" or "count"
+        :return: Aggregated statement shapes, worst first
+        """
+        with self._lock:
+            shapes = [dict(stats) for stats in self.shapes.values()]
+        for stats in shapes:
+            stats["avg_ms"] = round(stats["total_ms"] / stats["count"], 3)
+            stats["total_ms"] = round(stats["total_ms"], 3)
+        shapes.sort(key=lambda stats: stats[order_by], reverse=True)
+        return shapes[:limit]
+
+    def recent(self, limit: int = 50) -> List[dict]:
+        """
+        :param limit: Number of entries to return
+        :return: Most recent slow executions, newest first
+        """
+        with self._lock:
+            return list(self.entries)[-limit:][::-1]
+
+    def _evict_cheapest(self):
+        cheapest = min(self.shapes, key=lambda shape: self.shapes[shape]["total_ms"])
+        del self.shapes[cheapest]
+        self._explained_at.pop(cheapest, None)
+
+    def _schedule_explain(self, shape: str, statement: str, parameters):
+        if not statement.lstrip()[:6].upper() == "SELECT":
+            # EXPLAIN ANALYZE executes the statement, never run it for writes
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(shape, -self.explain_interval) < (
+                self.explain_interval
+            ):
+                return
+            self._explained_at[shape] = now
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._explain_worker, name="slow-query-explain", daemon=True
+                )
+                self._worker.start()
+        try:
+            self._explain_queue.put_nowait((shape, statement, parameters))
+        except queue.Full:
+            pass
+
+    def _explain_worker(self):
+        while True:
+            shape, statement, parameters = self._explain_queue.get()
+            try:
+                plan = self._explain(statement, parameters)
+            except Exception:
+                logger.exception("Could not explain slow query: %s", shape)
+                continue
+            with self._lock:
+                if shape in self.shapes:
+                    self.shapes[shape]["plan"] = plan
+
+    def _explain(self, statement: str, parameters) -> str:
+        if self.engine.dialect.name == "postgresql":
+            prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+        else:
+            prefix = "EXPLAIN QUERY PLAN "
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+            connection.rollback()
+        finally:
+            connection.close()
+        return "\n".join(" ".join(str(column) for column in row) for row in rows)
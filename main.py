@@ -1,12 +1,33 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
 from fastapi.routing import APIRoute
 
+from config.mail import queue_stats
 from config.settings import settings
-from database.session import init_db
-from database.models import *
+from database.session import check_revision, engine, init_db, pool_stats
 from app.routers import router
+from app.services.trending_services import load_trending
+from app.utils.feeds import feed_store
+from app.utils.images import image_pipeline
+from app.utils.profiles import profile_cache
+from app.utils.timelines import timeline_fanout
+from app.utils.trending import TrendingJob, trending_store
+from app.middlewares import (
+    AdaptiveConcurrencyLimiter,
+    CompressionMiddleware,
+    ConcurrencyLimitMiddleware,
+    PrometheusMiddleware,
+    RateLimitMiddleware,
+    ResponseCache,
+    ResponseCacheMiddleware,
+    SQLProfilerMiddleware,
+    ViewCounter,
+    ViewCounterMiddleware,
+    create_rate_limit_backend,
+    metrics_response,
+    register_stats,
+)
 
 
 def custom_generate_unique_id(route: APIRoute):
@@ -17,9 +38,81 @@ app = FastAPI(
     title=settings.PROJECT_TITLE,
     description=settings.PROJECT_DESCRIPTION,
     version=settings.PROJECT_VERSION,
-    generate_unique_id_function=custom_generate_unique_id
+    generate_unique_id_function=custom_generate_unique_id,
+    default_response_class=ORJSONResponse,
+)
+
+if settings.SQL_PROFILER_SAMPLE_RATE > 0:
+    app.add_middleware(
+        SQLProfilerMiddleware,
+        sample_rate=settings.SQL_PROFILER_SAMPLE_RATE,
+        n_plus_one_threshold=settings.SQL_PROFILER_N_PLUS_ONE_THRESHOLD,
+    )
+
+app.state.concurrency_limiter = AdaptiveConcurrencyLimiter(
+    initial_limit=settings.CONCURRENCY_INITIAL_LIMIT,
+    min_limit=settings.CONCURRENCY_MIN_LIMIT,
+    max_limit=settings.CONCURRENCY_MAX_LIMIT,
+    expensive_share=settings.CONCURRENCY_EXPENSIVE_SHARE,
 )
 
+if settings.CONCURRENCY_LIMIT_ENABLED:
+    app.add_middleware(
+        ConcurrencyLimitMiddleware,
+        limiter=app.state.concurrency_limiter,
+        expensive_routes=settings.CONCURRENCY_EXPENSIVE_ROUTES,
+    )
+
+# Cache hits skip the concurrency limiter and are served precompressed, so the
+# compression middleware only handles misses and uncached routes
+app.state.response_cache = ResponseCache(
+    ttl=settings.RESPONSE_CACHE_TTL,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
+if settings.RESPONSE_CACHE_ENABLED:
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        cache=app.state.response_cache,
+        routes=settings.RESPONSE_CACHE_ROUTES,
+    )
+
+# Outside the response cache so cached post views are counted
+app.state.view_counter = ViewCounter(
+    engine,
+    flush_interval=settings.VIEW_COUNTER_FLUSH_INTERVAL,
+    max_pending=settings.VIEW_COUNTER_MAX_PENDING,
+)
+
+if settings.VIEW_COUNTER_ENABLED:
+    app.add_middleware(ViewCounterMiddleware, counter=app.state.view_counter)
+
+app.state.trending_job = TrendingJob(
+    trending_store, load_trending, interval=settings.TRENDING_INTERVAL
+)
+
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        limits=settings.RATE_LIMITS,
+        backend=create_rate_limit_backend(
+            settings.RATE_LIMIT_BACKEND, settings.RATE_LIMIT_REDIS_URL
+        ),
+        trust_forwarded=settings.RATE_LIMIT_TRUST_FORWARDED,
+        forwarded_hops=settings.RATE_LIMIT_FORWARDED_HOPS,
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -28,14 +121,63 @@ app.add_middleware(
     allow_headers=settings.CORS_HEADERS,
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(PrometheusMiddleware)
+    register_stats("db_pool", "Database connection pool", pool_stats)
+    register_stats("email_queue", "Background email queue", queue_stats)
+    register_stats(
+        "concurrency_limiter",
+        "Adaptive concurrency limiter",
+        app.state.concurrency_limiter.stats,
+    )
+    register_stats("response_cache", "Response cache", app.state.response_cache.stats)
+    register_stats("feeds", "RSS and Atom feeds", feed_store.stats)
+    register_stats("profile_cache", "Author profiles", profile_cache.stats)
+    register_stats("view_counter", "Post view counter", app.state.view_counter.stats)
+    register_stats("trending", "Trending posts", app.state.trending_job.stats)
+    register_stats("timeline_fanout", "Timeline fan-out", timeline_fanout.stats)
+    register_stats("image_pipeline", "Image derivatives", image_pipeline.stats)
+
 app.include_router(router)
 
 
 @app.on_event("startup")
 def startup():
-    init_db()
+    if settings.DB_CREATE_TABLES:
+        init_db()
+    elif settings.DB_CHECK_REVISION:
+        check_revision()
+    if settings.VIEW_COUNTER_ENABLED:
+        app.state.view_counter.start()
+    if settings.TRENDING_ENABLED:
+        app.state.trending_job.start()
+    if settings.TIMELINE_FANOUT_BACKGROUND:
+        timeline_fanout.start()
+    if settings.IMAGE_WORKERS > 0:
+        image_pipeline.start()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    # Runs once in-flight requests have drained
+    if settings.IMAGE_WORKERS > 0:
+        image_pipeline.stop()
+    if settings.TIMELINE_FANOUT_BACKGROUND:
+        timeline_fanout.stop()
+    if settings.TRENDING_ENABLED:
+        app.state.trending_job.stop()
+    if settings.VIEW_COUNTER_ENABLED:
+        app.state.view_counter.stop()
+    engine.dispose()
 
 
 @app.get("/", include_in_schema=False, tags=["root"])
 def root():
     return RedirectResponse(url="/docs")
+
+
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False, tags=["root"])
+    def metrics():
+        return metrics_response()
@@ -0,0 +1,124 @@
+"""
+Runs the API server.
+
+    python serve.py --host 0.0.0.0 --port 8000 --workers 4
+    python serve.py --reload
+    python serve.py --profile-startup
+
+By default a gunicorn master forks SERVER_WORKERS uvicorn workers from a
+preloaded app, see config.server. --reload runs a single uvicorn process
+that restarts on code changes. --profile-startup imports the app in a
+fresh interpreter with -X importtime, runs its startup handlers and
+reports where the cold start time goes.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+PROFILE_SCRIPT = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+asyncio.run(main.app.router.startup())
+ready = time.perf_counter()
+print(json.dumps({"import": imported - start, "startup": ready - imported}))
+"""
+
+
+def profile_startup(top: int = 15):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        errors = [
+            line
+            for line in result.stderr.splitlines()
+            if not line.startswith("import time:")
+        ]
+        sys.exit("\n".join(errors))
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+    packages = defaultdict(int)
+    first_party = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        packages[module.split(".")[0]] += int(self_us)
+        if module.split(".")[0] in ("app", "config", "database"):
+            first_party.append((int(cumulative_us), len(indent), module))
+
+    print(f"{'import main':40}{timings['import'] * 1000:>10.1f} ms")
+    print(f"{'startup handlers':40}{timings['startup'] * 1000:>10.1f} ms")
+    print(f"\nSelf import time by top-level package (top {top})")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:38}{self_us / 1000:>10.1f} ms")
+    print(f"\nCumulative import time of first-party modules (top {top})")
+    for cumulative_us, _, module in sorted(first_party, reverse=True)[:top]:
+        print(f"  {module:38}{cumulative_us / 1000:>10.1f} ms")
+
+
+def use_prometheus_multiprocess():
+    # Must happen before prometheus_client is imported by the preloaded app,
+    # each worker then writes its samples to files in this directory
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+    else:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(
+            prefix="steptzi-metrics-"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument(
+        "--workers", type=int, help="Defaults to SERVER_WORKERS, or one per CPU"
+    )
+    parser.add_argument(
+        "--reload", action="store_true", help="Single process, restarts on changes"
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Report the import and startup time breakdown, then exit",
+    )
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        profile_startup()
+        return
+
+    if args.reload:
+        import uvicorn
+
+        uvicorn.run("main:app", host=args.host, port=args.port, reload=True)
+        return
+
+    from config import server
+    from config.settings import settings
+
+    workers = args.workers or settings.SERVER_WORKERS or os.cpu_count() or 1
+    if workers > 1 and settings.METRICS_ENABLED:
+        use_prometheus_multiprocess()
+    server.run("main:app", args.host, args.port, workers)
+
+
+if __name__ == "__main__":
+    main()